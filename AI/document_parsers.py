@@ -0,0 +1,125 @@
+"""
+Синхронные парсеры документов. Выполняются в пуле процессов DocumentProcessor,
+поэтому модуль не тянет тяжёлых зависимостей приложения (chonkie, БД).
+"""
+import resource
+import traceback
+from PyPDF2 import PdfReader
+import docx
+import pdfplumber
+
+# PaddleOCR создаётся один раз на процесс пула
+ocr_engine = None
+
+
+def init_parser_process(memory_limit_mb: int) -> None:
+    """Инициализатор процесса пула: ограничение адресного пространства (RLIMIT_AS)"""
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def get_ocr_engine():
+    global ocr_engine
+    if ocr_engine is None:
+        try:
+            from paddleocr import PaddleOCR
+            ocr_engine = PaddleOCR(
+                use_angle_cls=True,
+                lang='ru',
+            )
+        except Exception as e:
+            print(f"Failed to initialize PaddleOCR: {str(e)}")
+            traceback.print_exc()
+            ocr_engine = False
+    return ocr_engine
+
+
+def parse_pdf(file_path: str) -> str:
+    """Извлечение текста из PDF с правильной кодировкой"""
+    text = ""
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            for i, page in enumerate(pdf.pages, 1):
+                page_text = page.extract_text()
+                if page_text:
+                    text += f"=== Страница {i} ===\n{page_text}\n\n"
+
+        print(f"✅ Used pdfplumber for extraction")
+
+    except ImportError:
+        print(f"⚠️ pdfplumber not installed, using PyPDF2")
+        try:
+            reader = PdfReader(file_path)
+            for i, page in enumerate(reader.pages, 1):
+                page_text = page.extract_text()
+                if page_text:
+                    text += f"=== Страница {i} ===\n{page_text}\n\n"
+        except Exception as e:
+            print(f"❌ PyPDF2 extraction error: {str(e)}")
+
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"❌ PDF extraction error: {str(e)}")
+
+    return text.strip()
+
+
+def parse_docx(file_path: str) -> str:
+    """Извлечение текста из DOCX"""
+    text = ""
+    try:
+        doc = docx.Document(file_path)
+        for paragraph in doc.paragraphs:
+            text += paragraph.text + "\n"
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"❌ DOCX extraction error: {str(e)}")
+
+    return text.strip()
+
+
+def parse_txt(file_path: str) -> str:
+    """Чтение текстового файла"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"❌ TXT reading error: {str(e)}")
+        return ""
+
+
+def parse_image(file_path: str) -> str:
+    """
+        OCR для изображений с PaddleOCR
+        TODO: НЕ РАБОТАЕТ С РУ ТЕКСТОМ, КАКАЯ ТО ЖИЖА
+    """
+    engine = get_ocr_engine()
+    if engine:
+        try:
+            print(f"   🚀 Running PaddleOCR...")
+            result = engine.ocr(file_path)
+
+            if result and result[0]:
+                texts = []
+                for line in result[0]:
+                    text_content = line[1][0]
+                    texts.append(text_content)
+
+                extracted = " ".join(texts)
+                return extracted
+            else:
+                return ""
+
+        except MemoryError:
+            raise
+        except Exception as e:
+            print(f"   ⚠️ PaddleOCR runtime error: {str(e)}")
+            traceback.print_exc()
+    else:
+        print(f"   ⚠️ PaddleOCR engine not available (state: {engine})")
+    return ""
@@ -1,11 +1,17 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, List
-from PyPDF2 import PdfReader
-import docx
-import pdfplumber
 from chonkie import SemanticChunker
+from core.config import settings
+from .document_parsers import (
+    init_parser_process, parse_pdf, parse_docx, parse_txt, parse_image
+)
 
 
 class DocumentProcessor:
+    # Версия для кеша извлечения (FileExtraction): увеличить при изменении парсинга или очистки текста
+    version = "docs-1"
 
     def __init__(self):
         self.chunker = SemanticChunker(
@@ -13,24 +19,58 @@ class DocumentProcessor:
             threshold=0.7,
             chunk_size=2000
         )
-        self.ocr_engine = None
-
-    def _init_ocr(self):
-        if self.ocr_engine is None:
+        # pdfplumber, python-docx и PaddleOCR синхронные - работают в пуле процессов,
+        # не блокируя event loop. Слотов столько же, сколько процессов,
+        # поэтому таймаут считается от начала разбора, а не от постановки в очередь
+        self.parser_pool: Optional[ProcessPoolExecutor] = None
+        self.parser_slots = asyncio.Semaphore(settings.DOCUMENT_PARSER_WORKERS)
+
+    def _get_parser_pool(self) -> ProcessPoolExecutor:
+        if self.parser_pool is None:
+            self.parser_pool = ProcessPoolExecutor(
+                max_workers=settings.DOCUMENT_PARSER_WORKERS,
+                initializer=init_parser_process,
+                initargs=(settings.DOCUMENT_PARSER_MEMORY_MB,)
+            )
+        return self.parser_pool
+
+    def _reset_parser_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        ProcessPoolExecutor не умеет отменить выполняющуюся задачу:
+        процессы пула убиваются, следующий вызов создаёт новый пул.
+        """
+        if self.parser_pool is pool:
+            self.parser_pool = None
+        for process in list((pool._processes or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_parser(self, parser, file_path: str, retry: bool = True) -> str:
+        async with self.parser_slots:
+            pool = self._get_parser_pool()
+            loop = asyncio.get_running_loop()
             try:
-                from paddleocr import PaddleOCR
-                self.ocr_engine = PaddleOCR(
-                    use_angle_cls=True,
-                    lang='ru',
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, parser, file_path),
+                    timeout=settings.DOCUMENT_PARSER_TIMEOUT_SECONDS
                 )
-
-            except Exception as e:
-                print(f"Failed to initialize PaddleOCR: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self.ocr_engine = False
-        else:
-            print(f"PaddleOCR already initialized")
+            except asyncio.TimeoutError:
+                print(f"⏱️ {parser.__name__} timed out after {settings.DOCUMENT_PARSER_TIMEOUT_SECONDS}s: {file_path}")
+                self._reset_parser_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # Пул уже пересоздан из-за соседней задачи (таймаут) - пробуем ещё раз
+                replaced = self.parser_pool is not pool
+                self._reset_parser_pool(pool)
+                if not (replaced and retry):
+                    print(f"💥 Parser process died (memory limit?): {file_path}")
+                    raise
+
+        return await self._run_parser(parser, file_path, retry=False)
+
+    def shutdown(self) -> None:
+        if self.parser_pool is not None:
+            self._reset_parser_pool(self.parser_pool)
 
     def _clean_text(self, text: str) -> str:
         """
@@ -88,83 +128,16 @@ class DocumentProcessor:
             return None
 
     async def _extract_from_pdf(self, file_path: str) -> str:
-        """Извлечение текста из PDF с правильной кодировкой"""
-        text = ""
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                for i, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"=== Страница {i} ===\n{page_text}\n\n"
-
-            print(f"✅ Used pdfplumber for extraction")
-
-        except ImportError:
-            print(f"⚠️ pdfplumber not installed, using PyPDF2")
-            try:
-                reader = PdfReader(file_path)
-                for i, page in enumerate(reader.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"=== Страница {i} ===\n{page_text}\n\n"
-            except Exception as e:
-                print(f"❌ PyPDF2 extraction error: {str(e)}")
-
-        except Exception as e:
-            print(f"❌ PDF extraction error: {str(e)}")
-
-        return text.strip()
+        return await self._run_parser(parse_pdf, file_path)
 
     async def _extract_from_docx(self, file_path: str) -> str:
-        """Извлечение текста из DOCX"""
-        text = ""
-        try:
-            doc = docx.Document(file_path)
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-        except Exception as e:
-            print(f"❌ DOCX extraction error: {str(e)}")
-
-        return text.strip()
+        return await self._run_parser(parse_docx, file_path)
 
     async def _extract_from_txt(self, file_path: str) -> str:
-        """Чтение текстового файла"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            print(f"❌ TXT reading error: {str(e)}")
-            return ""
+        return await self._run_parser(parse_txt, file_path)
 
     async def _extract_from_image(self, file_path: str) -> str:
-        """
-            OCR для изображений с PaddleOCR
-            TODO: НЕ РАБОТАЕТ С РУ ТЕКСТОМ, КАКАЯ ТО ЖИЖА
-        """
-        self._init_ocr()
-        if self.ocr_engine and self.ocr_engine is not False:
-            try:
-                print(f"   🚀 Running PaddleOCR...")
-                result = self.ocr_engine.ocr(file_path)
-
-                if result and result[0]:
-                    texts = []
-                    for line in result[0]:
-                        text_content = line[1][0]
-                        texts.append(text_content)
-
-                    extracted = " ".join(texts)
-                    return extracted
-                else:
-                    return ""
-
-            except Exception as e:
-                print(f"   ⚠️ PaddleOCR runtime error: {str(e)}")
-                import traceback
-                traceback.print_exc()
-        else:
-            print(f"   ⚠️ PaddleOCR engine not available (state: {self.ocr_engine})")
-        return ""
+        return await self._run_parser(parse_image, file_path)
 
     def chunk_text(self, text: str, max_chunk_size: int = 2000) -> List[str]:
         """Разбиение большого текста на семантические чанки"""
@@ -4,9 +4,11 @@ from sqlalchemy import select, and_
 from typing import List
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
-from models import Test, Question, AnswerOption, Material, User, Module
+from models import Test, Question, Material, User, Module
 from models.Enums import QuestionType
+from schemas.tests import QuestionDocument, AnswerOptionDocument
 from service.course_service import check_course_access
+from service.test_service import apply_test_document
 
 
 async def generate_test_with_ai(
@@ -59,6 +61,27 @@ async def generate_test_with_ai(
             detail=f"AI generation failed: {str(e)}"
         )
 
+    # Ответ модели проверяется до создания теста (ValidationError pydantic - подкласс ValueError)
+    try:
+        questions = [
+            QuestionDocument(
+                text=q_data["text"],
+                type=QuestionType(q_data["type"]),
+                position=i,
+                hint_text=q_data.get("hint_text"),
+                options=[
+                    AnswerOptionDocument(content=opt_data["content"], is_correct=opt_data["is_correct"])
+                    for opt_data in q_data.get("options", [])
+                ]
+            )
+            for i, q_data in enumerate(ai_response.get("questions", []), 1)
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"AI returned invalid questions: {str(e)}"
+        )
+
     test = Test(
         title=ai_response.get("title", f"Тест по материалу: {material.title}"),
         num_questions=num_questions,
@@ -74,25 +97,7 @@ async def generate_test_with_ai(
     db.add(test)
     await db.flush()
 
-    for i, q_data in enumerate(ai_response.get("questions", []), 1):
-        question = Question(
-            test_id=test.id,
-            text=q_data["text"],
-            type=QuestionType(q_data["type"]),
-            position=i,
-            hint_text=q_data.get("hint_text")
-        )
-
-        db.add(question)
-        await db.flush()
-
-        for opt_data in q_data.get("options", []):
-            option = AnswerOption(
-                question_id=question.id,
-                content=opt_data["content"],
-                is_correct=opt_data["is_correct"]
-            )
-            db.add(option)
+    await apply_test_document(test.id, questions, db)
 
     await db.commit()
     await db.refresh(test)
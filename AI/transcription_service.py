@@ -15,6 +15,11 @@ class TranscriptionService:
         self.compute_type = "int8"
         self.executor = ThreadPoolExecutor(max_workers=1)
 
+    @property
+    def version(self) -> str:
+        """Версия для кеша транскрипций (FileExtraction)"""
+        return f"whisper-{self.model_size}-{self.compute_type}-1"
+
     def load_model(self):
         """Ленивая загрузка Faster-Whisper"""
         if self.model is None:
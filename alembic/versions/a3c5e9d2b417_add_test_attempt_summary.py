@@ -0,0 +1,73 @@
+"""Add test_attempt_summary
+
+Revision ID: a3c5e9d2b417
+Revises: f1a67d75461a
+Create Date: 2026-10-19 11:40:08.271934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e9d2b417'
+down_revision: Union[str, Sequence[str], None] = 'f1a67d75461a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'test_attempt_summary',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('test_id', sa.Integer(), nullable=False),
+        sa.Column('attempt_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('best_score', sa.Integer(), nullable=True),
+        sa.Column('fail_streak', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('blocked_until', sa.TIMESTAMP(), nullable=True),
+        sa.Column('active_attempt_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['active_attempt_id'], ['test_attempts.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('user_id', 'test_id')
+    )
+    op.create_index(
+        op.f('ix_test_attempt_summary_test_id'), 'test_attempt_summary', ['test_id'], unique=False
+    )
+    # Серия неудач - завершённые попытки после последней успешной
+    op.execute(
+        """
+        INSERT INTO test_attempt_summary (
+            user_id, test_id, attempt_count, best_score,
+            fail_streak, blocked_until, active_attempt_id
+        )
+        SELECT
+            a.user_id,
+            a.test_id,
+            max(a.attempt_number),
+            max(a.score),
+            count(*) FILTER (
+                WHERE a.finished_at IS NOT NULL
+                  AND a.attempt_number > coalesce(a.last_passed, 0)
+            ),
+            max(a.blocked_until),
+            max(a.id) FILTER (WHERE a.finished_at IS NULL)
+        FROM (
+            SELECT
+                ta.*,
+                max(ta.attempt_number) FILTER (WHERE ta.passed IS TRUE)
+                    OVER (PARTITION BY ta.user_id, ta.test_id) AS last_passed
+            FROM test_attempts AS ta
+        ) AS a
+        GROUP BY a.user_id, a.test_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_test_attempt_summary_test_id'), table_name='test_attempt_summary')
+    op.drop_table('test_attempt_summary')
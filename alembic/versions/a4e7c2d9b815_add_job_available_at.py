@@ -0,0 +1,31 @@
+"""Add job available_at
+
+Revision ID: a4e7c2d9b815
+Revises: d9b4e7a2c516
+Create Date: 2026-10-20 10:41:09.734512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7c2d9b815'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e7a2c516'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'jobs',
+        sa.Column('available_at', sa.TIMESTAMP(), server_default=sa.text('NOW()'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'available_at')
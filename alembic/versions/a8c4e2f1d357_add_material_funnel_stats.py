@@ -0,0 +1,55 @@
+"""Add material funnel stats
+
+Revision ID: a8c4e2f1d357
+Revises: f7a3d1e6b924
+Create Date: 2026-10-19 19:10:24.518930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c4e2f1d357'
+down_revision: Union[str, Sequence[str], None] = 'f7a3d1e6b924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'material_funnel_stats',
+        sa.Column('material_id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('completed_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('passed_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['material_id'], ['materials.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('material_id')
+    )
+    op.create_index(
+        op.f('ix_material_funnel_stats_course_id'), 'material_funnel_stats', ['course_id'], unique=False
+    )
+
+    # Начальное заполнение по текущему прогрессу и сданным попыткам
+    op.execute("""
+        INSERT INTO material_funnel_stats (material_id, course_id, completed_count, passed_count)
+        SELECT
+            materials.id,
+            modules.course_id,
+            (SELECT count(*) FROM lesson_progress
+             WHERE lesson_progress.lesson_id = materials.id),
+            (SELECT count(DISTINCT test_attempts.user_id)
+             FROM test_attempts JOIN tests ON tests.id = test_attempts.test_id
+             WHERE tests.material_id = materials.id AND test_attempts.passed IS TRUE)
+        FROM materials JOIN modules ON modules.id = materials.module_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_material_funnel_stats_course_id'), table_name='material_funnel_stats')
+    op.drop_table('material_funnel_stats')
@@ -0,0 +1,47 @@
+"""Add file ref counts
+
+Revision ID: b2d6f9a4c183
+Revises: a8c4e2f1d357
+Create Date: 2026-10-19 20:31:02.663417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d6f9a4c183'
+down_revision: Union[str, Sequence[str], None] = 'a8c4e2f1d357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('files', sa.Column('ref_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('files', sa.Column('unreferenced_at', sa.TIMESTAMP(), nullable=True))
+
+    # Существующие файлы остаются на старых путях, file_path хранится в строке
+    op.execute("""
+        UPDATE files SET ref_count = refs.count
+        FROM (
+            SELECT file_id, count(*) AS count
+            FROM material_files GROUP BY file_id
+        ) AS refs
+        WHERE files.id = refs.file_id
+    """)
+    op.execute("UPDATE files SET unreferenced_at = NOW() WHERE ref_count = 0")
+
+    op.create_index(
+        'idx_file_unreferenced', 'files', ['unreferenced_at'],
+        unique=False, postgresql_where=sa.text('ref_count <= 0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_file_unreferenced', table_name='files')
+    op.drop_column('files', 'unreferenced_at')
+    op.drop_column('files', 'ref_count')
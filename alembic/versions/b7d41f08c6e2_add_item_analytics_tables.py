@@ -0,0 +1,60 @@
+"""Add item analytics tables
+
+Revision ID: b7d41f08c6e2
+Revises: a3c5e9d2b417
+Create Date: 2026-10-19 12:55:47.093166
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41f08c6e2'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e9d2b417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Счётчики заполняются командой python -m scripts.backfill_item_analytics
+    op.create_table(
+        'question_stats',
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('test_id', sa.Integer(), nullable=False),
+        sa.Column('answers_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('correct_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('hint_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sum_x', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sum_x2', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sum_y', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sum_y2', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sum_xy', sa.Float(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('question_id')
+    )
+    op.create_index(op.f('ix_question_stats_test_id'), 'question_stats', ['test_id'], unique=False)
+    op.create_table(
+        'answer_option_stats',
+        sa.Column('option_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('selected_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['option_id'], ['answer_options.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('option_id')
+    )
+    op.create_index(
+        op.f('ix_answer_option_stats_question_id'), 'answer_option_stats', ['question_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_answer_option_stats_question_id'), table_name='answer_option_stats')
+    op.drop_table('answer_option_stats')
+    op.drop_index(op.f('ix_question_stats_test_id'), table_name='question_stats')
+    op.drop_table('question_stats')
@@ -0,0 +1,59 @@
+"""Add job queue fields
+
+Revision ID: c3f8a5d7e219
+Revises: b2d6f9a4c183
+Create Date: 2026-10-19 22:14:48.205391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a5d7e219'
+down_revision: Union[str, Sequence[str], None] = 'b2d6f9a4c183'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ALTER TYPE ... ADD VALUE нельзя использовать в той же транзакции, где он добавлен
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_status ADD VALUE IF NOT EXISTS 'cancelled'")
+
+    op.add_column('jobs', sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('jobs', sa.Column('max_attempts', sa.Integer(), server_default=sa.text('3'), nullable=False))
+    op.add_column('jobs', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.TIMESTAMP(), nullable=True))
+
+    # Задачи, начатые до обновления, уже запускались один раз
+    op.execute("UPDATE jobs SET attempts = 1 WHERE status <> 'pending'")
+
+    op.create_index(
+        'idx_job_pending', 'jobs', ['id'],
+        unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_job_pending', table_name='jobs')
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'locked_by')
+    op.drop_column('jobs', 'max_attempts')
+    op.drop_column('jobs', 'attempts')
+
+    # Значение из enum в PostgreSQL не удаляется - тип пересоздаётся
+    op.execute("UPDATE jobs SET status = 'failed' WHERE status = 'cancelled'")
+    op.execute("ALTER TABLE jobs ALTER COLUMN status DROP DEFAULT")
+    op.execute("ALTER TYPE job_status RENAME TO job_status_old")
+    op.execute("CREATE TYPE job_status AS ENUM ('pending', 'running', 'completed', 'failed')")
+    op.execute(
+        "ALTER TABLE jobs ALTER COLUMN status TYPE job_status "
+        "USING status::text::job_status"
+    )
+    op.execute("ALTER TABLE jobs ALTER COLUMN status SET DEFAULT 'pending'")
+    op.execute("DROP TYPE job_status_old")
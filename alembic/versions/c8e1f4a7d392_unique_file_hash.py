@@ -0,0 +1,55 @@
+"""Unique file hash
+
+Revision ID: c8e1f4a7d392
+Revises: a4e7c2d9b815
+Create Date: 2026-10-20 15:12:37.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f4a7d392'
+down_revision: Union[str, Sequence[str], None] = 'a4e7c2d9b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Привязки дубликатов переносим на самый ранний файл с тем же хешем
+    op.execute("""
+        UPDATE material_files SET file_id = original.id
+        FROM files duplicate, (
+            SELECT file_hash, min(id) AS id FROM files GROUP BY file_hash
+        ) AS original
+        WHERE material_files.file_id = duplicate.id
+          AND duplicate.file_hash = original.file_hash
+          AND duplicate.id <> original.id
+    """)
+    # Блобы дубликатов с другим путём остаются в хранилище без строки в files
+    op.execute("""
+        DELETE FROM files duplicate
+        USING files original
+        WHERE duplicate.file_hash = original.file_hash
+          AND duplicate.id > original.id
+    """)
+    op.execute("""
+        UPDATE files SET ref_count = (
+            SELECT count(*) FROM material_files WHERE material_files.file_id = files.id
+        )
+    """)
+    op.execute("UPDATE files SET unreferenced_at = NULL WHERE ref_count > 0")
+    op.execute("UPDATE files SET unreferenced_at = NOW() WHERE ref_count = 0 AND unreferenced_at IS NULL")
+
+    op.drop_index(op.f('ix_files_file_hash'), table_name='files')
+    op.create_index(op.f('ix_files_file_hash'), 'files', ['file_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_files_file_hash'), table_name='files')
+    op.create_index(op.f('ix_files_file_hash'), 'files', ['file_hash'], unique=False)
@@ -0,0 +1,90 @@
+"""Typed selected_option_ids and partial_score on question_attempts
+
+Revision ID: c9e2a4f7d813
+Revises: b7d41f08c6e2
+Create Date: 2026-10-19 14:08:19.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2a4f7d813'
+down_revision: Union[str, Sequence[str], None] = 'b7d41f08c6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Перенос идёт пачками по id, каждая пачка в своей транзакции,
+# чтобы не держать блокировки на всей таблице. Старые значения проверяются
+# до приведения типа: нечисловой id варианта пропускается, а не роняет миграцию
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'question_attempts',
+        sa.Column('selected_option_ids', postgresql.ARRAY(sa.Integer()), nullable=True)
+    )
+    op.add_column(
+        'question_attempts',
+        sa.Column('partial_score', sa.REAL(), server_default=sa.text('0'), nullable=False)
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        max_id = conn.execute(sa.text('SELECT max(id) FROM question_attempts')).scalar() or 0
+        for start in range(0, max_id, BATCH_SIZE):
+            conn.execute(
+                sa.text(
+                    """
+                    UPDATE question_attempts
+                    SET selected_option_ids = CASE
+                            WHEN jsonb_typeof(answer -> 'selected_option_ids') = 'array'
+                            THEN ARRAY(
+                                SELECT option_id::int
+                                FROM jsonb_array_elements_text(answer -> 'selected_option_ids') AS option_id
+                                WHERE option_id ~ '^-?[0-9]{1,9}$'
+                            )
+                        END,
+                        partial_score = coalesce(
+                            CASE
+                                WHEN jsonb_typeof(answer -> 'partial_score') = 'number'
+                                THEN (answer ->> 'partial_score')::real
+                            END,
+                            CASE WHEN is_correct THEN 1 ELSE 0 END
+                        ),
+                        answer = nullif(answer - 'selected_option_ids' - 'partial_score', '{}'::jsonb)
+                    WHERE id > :start AND id <= :stop
+                      AND jsonb_typeof(answer) = 'object'
+                    """
+                ),
+                {"start": start, "stop": start + BATCH_SIZE}
+            )
+        op.create_index(
+            'idx_question_attempt_selected_options', 'question_attempts', ['selected_option_ids'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_question_attempt_selected_options', table_name='question_attempts')
+    op.execute(
+        """
+        UPDATE question_attempts
+        SET answer = coalesce(answer, '{}'::jsonb)
+            || jsonb_build_object('partial_score', partial_score)
+            || CASE
+                   WHEN selected_option_ids IS NOT NULL
+                   THEN jsonb_build_object('selected_option_ids', to_jsonb(selected_option_ids))
+                   ELSE '{}'::jsonb
+               END
+        """
+    )
+    op.drop_column('question_attempts', 'partial_score')
+    op.drop_column('question_attempts', 'selected_option_ids')
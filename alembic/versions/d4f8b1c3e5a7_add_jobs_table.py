@@ -0,0 +1,52 @@
+"""Add jobs table
+
+Revision ID: d4f8b1c3e5a7
+Revises: c9e2a4f7d813
+Create Date: 2026-10-19 15:21:36.840117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8b1c3e5a7'
+down_revision: Union[str, Sequence[str], None] = 'c9e2a4f7d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('pending', 'running', 'completed', 'failed', name='job_status'),
+            server_default=sa.text("'pending'"),
+            nullable=False
+        ),
+        sa.Column('progress', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('NOW()'), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_created_by'), 'jobs', ['created_by'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_created_by'), table_name='jobs')
+    op.drop_table('jobs')
+    op.execute('DROP TYPE IF EXISTS job_status')
@@ -0,0 +1,36 @@
+"""Add file extractions
+
+Revision ID: d9b4e7a2c516
+Revises: c3f8a5d7e219
+Create Date: 2026-10-19 23:02:17.518264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e7a2c516'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a5d7e219'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'file_extractions',
+        sa.Column('file_hash', sa.String(length=64), nullable=False),
+        sa.Column('extractor_version', sa.String(length=50), nullable=False),
+        sa.Column('text_content', sa.Text(), nullable=True),
+        sa.Column('transcript', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('file_hash', 'extractor_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('file_extractions')
@@ -0,0 +1,31 @@
+"""Add test version
+
+Revision ID: e4d9a2b7c651
+Revises: c8e1f4a7d392
+Create Date: 2026-10-20 16:03:52.917046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4d9a2b7c651'
+down_revision: Union[str, Sequence[str], None] = 'c8e1f4a7d392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'tests',
+        sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tests', 'version')
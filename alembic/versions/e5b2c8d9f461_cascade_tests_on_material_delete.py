@@ -0,0 +1,37 @@
+"""Cascade tests on material delete
+
+Revision ID: e5b2c8d9f461
+Revises: d4f8b1c3e5a7
+Create Date: 2026-10-19 17:02:11.408315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2c8d9f461'
+down_revision: Union[str, Sequence[str], None] = 'd4f8b1c3e5a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Тесты удалялись вместе с материалом каскадом ORM, теперь это делает БД
+    op.drop_constraint('tests_material_id_fkey', 'tests', type_='foreignkey')
+    op.create_foreign_key(
+        'tests_material_id_fkey', 'tests', 'materials',
+        ['material_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('tests_material_id_fkey', 'tests', type_='foreignkey')
+    op.create_foreign_key(
+        'tests_material_id_fkey', 'tests', 'materials',
+        ['material_id'], ['id'], ondelete='SET NULL'
+    )
@@ -0,0 +1,43 @@
+"""Add deadline_at to test_attempts
+
+Revision ID: f1a67d75461a
+Revises: 8261e0c11f62
+Create Date: 2026-10-19 10:12:31.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a67d75461a'
+down_revision: Union[str, Sequence[str], None] = '8261e0c11f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_attempts', sa.Column('deadline_at', sa.TIMESTAMP(), nullable=True))
+    op.execute(
+        """
+        UPDATE test_attempts AS ta
+        SET deadline_at = ta.started_at + t.time_limit_seconds * INTERVAL '1 second'
+        FROM tests AS t
+        WHERE t.id = ta.test_id
+          AND ta.finished_at IS NULL
+          AND t.time_limit_seconds IS NOT NULL
+        """
+    )
+    op.create_index(
+        'idx_test_attempt_open_deadline', 'test_attempts', ['deadline_at'],
+        unique=False, postgresql_where=sa.text('finished_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_test_attempt_open_deadline', table_name='test_attempts')
+    op.drop_column('test_attempts', 'deadline_at')
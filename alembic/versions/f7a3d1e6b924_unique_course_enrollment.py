@@ -0,0 +1,38 @@
+"""Unique course enrollment
+
+Revision ID: f7a3d1e6b924
+Revises: e5b2c8d9f461
+Create Date: 2026-10-19 17:48:53.120664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3d1e6b924'
+down_revision: Union[str, Sequence[str], None] = 'e5b2c8d9f461'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубликаты записей на курс оставляем по одной, самой ранней
+    op.execute("""
+        DELETE FROM course_enrollments duplicate
+        USING course_enrollments original
+        WHERE duplicate.user_id = original.user_id
+          AND duplicate.course_id = original.course_id
+          AND duplicate.id > original.id
+    """)
+    op.create_unique_constraint(
+        'uq_user_course_enrollment', 'course_enrollments', ['user_id', 'course_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_user_course_enrollment', 'course_enrollments', type_='unique')
@@ -40,6 +40,83 @@ class Settings(BaseSettings):
         ".zip", ".rar"
     ]
 
+    # Временные файлы обычной загрузки - вне UPLOAD_DIR, чтобы недокачанное не раздавалось
+    UPLOAD_TEMP_DIR: str = "upload_incoming"
+
+    # Resumable uploads: недокачанные файлы лежат вне UPLOAD_DIR и не раздаются
+    UPLOAD_SESSION_DIR: str = "upload_sessions"
+    UPLOAD_SESSION_MAX_FILE_SIZE: int = 5 * 1024 * 1024 * 1024  # 5GB
+    UPLOAD_SESSION_CHUNK_SIZE: int = 8 * 1024 * 1024  # максимум за один запрос
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+
+    # Storage backend: local (UPLOAD_DIR) или s3 (S3-совместимое, в т.ч. MinIO)
+    STORAGE_BACKEND: str = "local"
+    STORAGE_PART_SIZE: int = 8 * 1024 * 1024  # часть multipart-загрузки и ranged-чтения, >= 5MB для S3
+    S3_ENDPOINT_URL: str = ""  # пусто - AWS, для MinIO например http://minio:9000
+    S3_BUCKET: str = "uploads"
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_PUBLIC_URL: str = ""  # базовый URL для file_url, по умолчанию S3_ENDPOINT_URL/S3_BUCKET
+
+    # Media delivery
+    MEDIA_TOKEN_EXPIRE_MINUTES: int = 360
+    MEDIA_CACHE_MAX_AGE: int = 3600
+    # Префикс internal-location nginx, напр. /protected-uploads/ -> alias UPLOAD_DIR.
+    # Пусто - файл отдаётся приложением (FileResponse с Range)
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = ""
+    # Публичная раздача /uploads и прямые file_url без авторизации - только для старых клиентов.
+    # По умолчанию file_url ведёт на /api/media/{id}/url
+    UPLOADS_PUBLIC_MOUNT: bool = False
+
+    # Blob garbage collection
+    BLOB_GC_INTERVAL_SECONDS: int = 3600
+    BLOB_GC_BATCH_SIZE: int = 500
+    BLOB_GC_GRACE_SECONDS: int = 24 * 3600
+
+    # Test snapshot cache
+    TEST_SNAPSHOT_CACHE_SIZE: int = 512
+
+    # Batch answer submit: верхняя граница размера запроса до загрузки теста
+    MAX_ANSWERS_PER_BATCH: int = 200
+
+    # Test attempt expiry
+    ATTEMPT_EXPIRY_INTERVAL_SECONDS: int = 30
+    ATTEMPT_EXPIRY_BATCH_SIZE: int = 500
+
+    # Regrade
+    REGRADE_BATCH_SIZE: int = 2000
+
+    # Roster import
+    ROSTER_IMPORT_BATCH_SIZE: int = 500
+
+    # Bulk user import
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    # Загруженные файлы импорта: каталог общий для app и worker, вне UPLOAD_DIR (в файлах пароли)
+    USER_IMPORT_DIR: str = "user_imports"
+    USER_IMPORT_TTL_SECONDS: int = 7 * 24 * 3600  # файл упавшей задачи хранится для /retry
+    PASSWORD_HASH_WORKERS: int = 0  # 0 - по числу ядер
+
+    # Gradebook export
+    GRADEBOOK_BATCH_SIZE: int = 1000
+
+    # Background jobs: при JOB_WORKER_ENABLED задачи выполняет отдельный процесс worker.py
+    JOB_WORKER_ENABLED: bool = False
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_POLL_INTERVAL_SECONDS: int = 2
+    JOB_HEARTBEAT_SECONDS: int = 30
+    JOB_STALE_SECONDS: int = 300
+    JOB_RETRY_BACKOFF_SECONDS: int = 30  # задержка перед повтором, удваивается с каждой попыткой
+
+    # Document parsers: PDF/DOCX/OCR в пуле процессов
+    DOCUMENT_PARSER_WORKERS: int = 2
+    DOCUMENT_PARSER_TIMEOUT_SECONDS: int = 300  # зависший парсер убивается вместе с пулом
+    DOCUMENT_PARSER_MEMORY_MB: int = 4096  # RLIMIT_AS процесса парсера, 0 - без ограничения
+    INGEST_CONCURRENCY: int = 4  # файлов материала, обрабатываемых одновременно
+
+    # Background deletion
+    DELETE_BATCH_SIZE: int = 5000
+
     # AI Service (DeepSeek через LiteLLM)
     # Timeweb Cloud AI (OpenAI-compatible)
     TIMEWEB_AGENT_ACCESS_ID: str  # agent_access_id
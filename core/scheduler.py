@@ -0,0 +1,44 @@
+import asyncio
+import traceback
+from typing import Awaitable, Callable, List
+
+
+class PeriodicScheduler:
+    """Простой планировщик периодических задач внутри процесса приложения"""
+
+    def __init__(self):
+        self._jobs: List[tuple[str, Callable[[], Awaitable[None]], float]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(
+            self, name: str,
+            func: Callable[[], Awaitable[None]],
+            interval_seconds: float
+    ) -> None:
+        self._jobs.append((name, func, interval_seconds))
+
+    async def _run(self, name: str, func: Callable[[], Awaitable[None]], interval_seconds: float):
+        while True:
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Scheduled job '{name}' failed: {str(e)}")
+                traceback.print_exc()
+            await asyncio.sleep(interval_seconds)
+
+    def start(self) -> None:
+        for name, func, interval_seconds in self._jobs:
+            self._tasks.append(
+                asyncio.create_task(self._run(name, func, interval_seconds), name=name)
+            )
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+scheduler = PeriodicScheduler()
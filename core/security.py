@@ -1,5 +1,7 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 import jwt
 from jwt.exceptions import PyJWTError
 from passlib.context import CryptContext
@@ -18,6 +20,30 @@ def get_password_hash(password: str):
     return pwd_context.hash(password)
 
 
+# Пул процессов для массового хеширования, создаётся при первом использовании
+hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """bcrypt для пачки паролей в пуле процессов, не блокируя event loop"""
+    global hash_pool
+    if hash_pool is None:
+        hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS or None)
+
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(hash_pool, get_password_hash, password)
+        for password in passwords
+    )))
+
+
+def shutdown_hash_pool() -> None:
+    global hash_pool
+    if hash_pool is not None:
+        hash_pool.shutdown(cancel_futures=True)
+        hash_pool = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
 
@@ -52,6 +78,18 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def create_media_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """Короткоживущий токен доступа к одному файлу, передаётся в query (<video src> не шлёт заголовки)"""
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.MEDIA_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "type": "media"})
+
+    if "sub" in to_encode:
+        to_encode["sub"] = str(to_encode["sub"])
+
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
 def decode_token(token: str):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -0,0 +1,277 @@
+import errno
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+
+
+def blob_key(file_hash: str, ext: str) -> str:
+    """
+    Путь блоба по его SHA-256: ab/cd/abcd...ext.
+    Два уровня каталогов по 256 штук держат каталоги маленькими.
+    """
+    return f"{file_hash[:2]}/{file_hash[2:4]}/{file_hash}{ext.lower()}"
+
+
+class LocalBlobStore:
+    """
+    Блобы на локальном диске в UPLOAD_DIR, раздаются статикой /uploads.
+    Локатор (File.file_path) - путь к файлу на диске.
+    """
+
+    name = "local"
+
+    async def prepare(self) -> None:
+        await run_in_threadpool(os.makedirs, settings.UPLOAD_DIR, exist_ok=True)
+
+    def locator(self, key: str) -> str:
+        return str(Path(settings.UPLOAD_DIR) / key)
+
+    def url(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+    def _put(self, temp_path: str, locator: str) -> None:
+        path = Path(locator)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Блоб с тем же ключом имеет то же содержимое - перезапись безопасна.
+        # В пределах одной файловой системы rename атомарен
+        try:
+            os.replace(temp_path, path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+        # Временный файл на другой файловой системе: копия рядом с блобом и rename,
+        # чтобы под ключом никогда не оказался недописанный файл
+        fd, staging_path = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as target, open(temp_path, "rb") as source:
+                shutil.copyfileobj(source, target, settings.STORAGE_PART_SIZE)
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(staging_path, path)
+        except BaseException:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+            raise
+        os.remove(temp_path)
+
+    async def put(self, temp_path: str, locator: str) -> None:
+        """Перенос готового временного файла на место блоба"""
+        await run_in_threadpool(self._put, temp_path, locator)
+
+    def _delete(self, locator: str) -> bool:
+        try:
+            os.remove(locator)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def delete(self, locator: str) -> bool:
+        return await run_in_threadpool(self._delete, locator)
+
+    async def size(self, locator: str) -> int:
+        return (await run_in_threadpool(os.stat, locator)).st_size
+
+    def _read_range(self, locator: str, start: int, length: int) -> bytes:
+        with open(locator, "rb") as file:
+            file.seek(start)
+            return file.read(length)
+
+    async def read_range(self, locator: str, start: int, length: int) -> bytes:
+        return await run_in_threadpool(self._read_range, locator, start, length)
+
+    @asynccontextmanager
+    async def local_copy(self, locator: str, suffix: str = "") -> AsyncIterator[str]:
+        """Файл уже на диске - отдаётся как есть"""
+        if not await run_in_threadpool(os.path.exists, locator):
+            raise FileNotFoundError(locator)
+        yield locator
+
+
+class S3BlobStore:
+    """
+    Блобы в S3-совместимом хранилище (AWS S3, MinIO, Timeweb S3).
+    Локатор (File.file_path) - ключ объекта в бакете S3_BUCKET.
+    boto3 импортируется лениво и нужен только при STORAGE_BACKEND=s3.
+    """
+
+    name = "s3"
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3, install it with pip install boto3")
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                region_name=settings.S3_REGION,
+                aws_access_key_id=settings.S3_ACCESS_KEY or None,
+                aws_secret_access_key=settings.S3_SECRET_KEY or None,
+                # MinIO и большинство S3-совместимых хранилищ требуют path-style адреса
+                config=Config(s3={"addressing_style": "path"})
+            )
+        return self._client
+
+    def _prepare(self) -> None:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_bucket(Bucket=settings.S3_BUCKET)
+        except ClientError:
+            # Локальный MinIO поднимается пустым - бакет создаётся при старте
+            self.client.create_bucket(Bucket=settings.S3_BUCKET)
+            print(f"🪣 Created bucket {settings.S3_BUCKET}")
+
+    async def prepare(self) -> None:
+        await run_in_threadpool(self._prepare)
+
+    def locator(self, key: str) -> str:
+        return key
+
+    def url(self, key: str) -> str:
+        base_url = settings.S3_PUBLIC_URL or f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET}"
+        return f"{base_url.rstrip('/')}/{key}"
+
+    def _exists(self, locator: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=settings.S3_BUCKET, Key=locator)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def _put(self, temp_path: str, locator: str) -> None:
+        """
+        Multipart-загрузка частями по STORAGE_PART_SIZE: в памяти одна часть,
+        при ошибке незавершённая загрузка отменяется.
+        """
+        try:
+            if self._exists(locator):
+                return
+
+            upload = self.client.create_multipart_upload(Bucket=settings.S3_BUCKET, Key=locator)
+            upload_id = upload["UploadId"]
+            parts = []
+            try:
+                with open(temp_path, "rb") as source:
+                    # Последняя часть короче STORAGE_PART_SIZE (у пустого файла - пустая)
+                    while True:
+                        chunk = source.read(settings.STORAGE_PART_SIZE)
+                        part_number = len(parts) + 1
+                        part = self.client.upload_part(
+                            Bucket=settings.S3_BUCKET, Key=locator,
+                            UploadId=upload_id, PartNumber=part_number, Body=chunk
+                        )
+                        parts.append({"PartNumber": part_number, "ETag": part["ETag"]})
+                        if len(chunk) < settings.STORAGE_PART_SIZE:
+                            break
+
+                self.client.complete_multipart_upload(
+                    Bucket=settings.S3_BUCKET, Key=locator,
+                    UploadId=upload_id, MultipartUpload={"Parts": parts}
+                )
+            except BaseException:
+                self.client.abort_multipart_upload(
+                    Bucket=settings.S3_BUCKET, Key=locator, UploadId=upload_id
+                )
+                raise
+        finally:
+            os.remove(temp_path)
+
+    async def put(self, temp_path: str, locator: str) -> None:
+        await run_in_threadpool(self._put, temp_path, locator)
+
+    def _delete(self, locator: str) -> bool:
+        if not self._exists(locator):
+            return False
+        self.client.delete_object(Bucket=settings.S3_BUCKET, Key=locator)
+        return True
+
+    async def delete(self, locator: str) -> bool:
+        return await run_in_threadpool(self._delete, locator)
+
+    def _size(self, locator: str) -> int:
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=settings.S3_BUCKET, Key=locator)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(locator)
+            raise
+        return head["ContentLength"]
+
+    async def size(self, locator: str) -> int:
+        return await run_in_threadpool(self._size, locator)
+
+    def presigned_url(self, locator: str, expires_in: int, filename: str, mime_type: str) -> str:
+        """Подписанная ссылка на объект: Range и кеширование обслуживает само хранилище"""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.S3_BUCKET, "Key": locator,
+                "ResponseContentType": mime_type,
+                "ResponseContentDisposition": f"inline; filename*=utf-8''{quote(filename)}"
+            },
+            ExpiresIn=expires_in
+        )
+
+    def _read_range(self, locator: str, start: int, length: int) -> bytes:
+        response = self.client.get_object(
+            Bucket=settings.S3_BUCKET, Key=locator,
+            Range=f"bytes={start}-{start + length - 1}"
+        )
+        return response["Body"].read()
+
+    async def read_range(self, locator: str, start: int, length: int) -> bytes:
+        return await run_in_threadpool(self._read_range, locator, start, length)
+
+    @asynccontextmanager
+    async def local_copy(self, locator: str, suffix: str = "") -> AsyncIterator[str]:
+        """
+        Парсерам и Whisper нужен путь на диске: объект скачивается
+        во временный файл ranged-запросами по STORAGE_PART_SIZE.
+        """
+        total = await self.size(locator)
+        fd, path = tempfile.mkstemp(prefix="blob_", suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as target:
+                offset = 0
+                while offset < total:
+                    chunk = await self.read_range(
+                        locator, offset, min(settings.STORAGE_PART_SIZE, total - offset)
+                    )
+                    if not chunk:
+                        break
+                    await run_in_threadpool(target.write, chunk)
+                    offset += len(chunk)
+            yield path
+        finally:
+            os.remove(path)
+
+
+def create_blob_store(backend: Optional[str] = None):
+    backend = backend or settings.STORAGE_BACKEND
+    if backend == "local":
+        return LocalBlobStore()
+    if backend == "s3":
+        return S3BlobStore()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_blob_store()
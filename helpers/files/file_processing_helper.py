@@ -1,6 +1,22 @@
 from typing import List, Optional, Tuple
 import os
 
+VIDEO_AUDIO_EXTENSIONS = ['.mp4', '.webm', '.avi', '.mov', '.mp3', '.wav']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp']
+DOCUMENT_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt']
+
+
+def extractor_version(
+        file_extension: str,
+        document_processor, transcription_service
+) -> Optional[str]:
+    """Версия обработчика для типа файла; None - файл не обрабатывается"""
+    if file_extension in VIDEO_AUDIO_EXTENSIONS:
+        return transcription_service.version
+    if file_extension in IMAGE_EXTENSIONS or file_extension in DOCUMENT_EXTENSIONS:
+        return document_processor.version
+    return None
+
 
 async def process_single_file(
         file_path: str, file_extension: str,
@@ -10,9 +26,6 @@ async def process_single_file(
     Returns:
         Tuple[text_content, transcript] - текст из документа/транскрипция из видео
     """
-    VIDEO_AUDIO_EXTENSIONS = ['.mp4', '.webm', '.avi', '.mov', '.mp3', '.wav']
-    IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp']
-
     if not os.path.exists(file_path):
         print(f"❌ File not found: {file_path}")
         return None, None
@@ -26,7 +39,7 @@ async def process_single_file(
             print(f"❌ Transcription error: {str(e)}")
             return None, None
 
-    elif file_extension in IMAGE_EXTENSIONS or file_extension in ['.pdf', '.docx', '.doc', '.txt']:
+    elif file_extension in IMAGE_EXTENSIONS or file_extension in DOCUMENT_EXTENSIONS:
         file_type = "image" if file_extension in IMAGE_EXTENSIONS else "document"
         print(f"📄 Processing {file_type}: {os.path.basename(file_path)}")
         try:
@@ -1,14 +1,16 @@
+import asyncio
 import os
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
 from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 from starlette import status
+from core.config import settings
 from models import Module, Material, File, MaterialFile
 from AI.document_processor import document_processor
 from AI.transcription_service import transcription_service
-from core.config import settings
-from .file_processing_helper import combine_contents, process_single_file
+from helpers.files.blob_store import storage
+from .file_processing_helper import combine_contents, process_single_file, extractor_version
 
 
 async def get_material(db, material_id: int, module_id: int, course_id: int):
@@ -45,11 +47,9 @@ async def get_files(db, file_ids: List[int]):
     return files
 
 
-async def process_files(db, material_id: int, files: List[File]):
-    """Обработка всех файлов: создание связей и извлечение контента"""
+async def attach_files(db, material_id: int, files: List[File]) -> List[MaterialFile]:
+    """Создание связей материал-файл; уже прикреплённые файлы пропускаются"""
     material_files = []
-    extracted_texts = []
-    transcriptions = []
 
     for file in files:
         existing = await db.execute(
@@ -68,22 +68,54 @@ async def process_files(db, material_id: int, files: List[File]):
         db.add(material_file)
         material_files.append(material_file)
 
-        file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-        file_extension = os.path.splitext(file.filename)[1].lower()
+    return material_files
 
-        text, transcript = await process_single_file(
-            file_path,
-            file_extension,
-            document_processor,
-            transcription_service
-        )
 
-        if text:
-            extracted_texts.append(text)
-        if transcript:
-            transcriptions.append(transcript)
+def file_extractor_version(file: File) -> Optional[str]:
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    return extractor_version(file_extension, document_processor, transcription_service)
 
-    return material_files, extracted_texts, transcriptions
+
+async def extract_file_content(file: File) -> Tuple[Optional[str], Optional[str]]:
+    file_extension = os.path.splitext(file.filename)[1].lower()
+
+    # Парсерам нужен путь на диске: из S3 файл скачивается ranged-запросами
+    try:
+        async with storage.local_copy(file.file_path, file_extension) as file_path:
+            return await process_single_file(
+                file_path,
+                file_extension,
+                document_processor,
+                transcription_service
+            )
+    except FileNotFoundError:
+        print(f"❌ File not found: {file.file_path}")
+        return None, None
+
+
+async def extract_files_content(
+        files: List[File], progress=None, on_extracted=None
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Извлечение текста и транскрипций из файлов, до INGEST_CONCURRENCY одновременно;
+    on_extracted(файл, результат) и progress(процент) - по мере готовности.
+    Возвращает пары (текст, транскрипция) в порядке files.
+    """
+    slots = asyncio.Semaphore(settings.INGEST_CONCURRENCY)
+    done = 0
+
+    async def extract(file: File) -> Tuple[Optional[str], Optional[str]]:
+        nonlocal done
+        async with slots:
+            result = await extract_file_content(file)
+        if on_extracted:
+            await on_extracted(file, result)
+        done += 1
+        if progress:
+            await progress(min(99, done * 100 // len(files)))
+        return result
+
+    return list(await asyncio.gather(*(extract(file) for file in files)))
 
 
 async def update_material_content(
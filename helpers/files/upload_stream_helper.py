@@ -0,0 +1,121 @@
+import codecs
+import csv
+import json
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Tuple
+from fastapi import UploadFile
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class LineFeed:
+    """Итератор строк для csv.reader, пополняемый по мере чтения файла"""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_text_lines(
+        file: UploadFile, chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[list[str]]:
+    """
+    Чтение загруженного файла кусками с инкрементальным декодированием UTF-8.
+    Отдаёт пачки целых строк, неполная строка переносится в следующий кусок.
+    Строки делятся только по \n (str.splitlines режет и по \r, \x0b, \x1c-\x1e).
+    При неверной кодировке бросает UnicodeDecodeError.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        parts = (tail + decoder.decode(chunk, final=not chunk)).split("\n")
+        tail = parts.pop()
+        lines = [part + "\n" for part in parts]
+        if not chunk and tail:
+            lines.append(tail)
+        if lines:
+            yield lines
+        if not chunk:
+            return
+
+
+async def iter_csv_rows(
+        file: UploadFile, chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """
+    Построчный разбор CSV без чтения файла целиком в память.
+
+    Первая строка - заголовок, имена колонок приводятся к нижнему регистру.
+    Разделитель (',' или ';' из Excel) определяется по заголовку.
+    Отдаёт пары (номер строки в файле, словарь значений), пустые строки пропускаются.
+    """
+    feed = LineFeed()
+    reader = None
+    header = None
+    # Строки записи, в которой открытая кавычка ещё не закрыта: csv.reader получает
+    # их только целиком, иначе поле с переводом строки на границе куска обрезается
+    pending = []
+    quotes = 0
+
+    def read_rows():
+        nonlocal header
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if header is None:
+                header = [name.strip().lower() for name in row]
+                continue
+            yield reader.line_num, dict(zip(header, (cell.strip() for cell in row)))
+
+    async for lines in iter_text_lines(file, chunk_size):
+        if reader is None:
+            delimiter = ";" if lines[0].count(";") > lines[0].count(",") else ","
+            reader = csv.reader(feed, delimiter=delimiter)
+
+        for line in lines:
+            pending.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                feed.lines.extend(pending)
+                pending = []
+                quotes = 0
+
+        for row in read_rows():
+            yield row
+
+    # Незакрытая кавычка в конце файла - отдаём как есть, строку разберёт csv
+    if pending:
+        feed.lines.extend(pending)
+        for row in read_rows():
+            yield row
+
+
+async def iter_jsonl_rows(
+        file: UploadFile, chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """
+    Построчный разбор JSON Lines без чтения файла целиком в память.
+    Отдаёт пары (номер строки, объект); строка с невалидным JSON
+    или не-объектом отдаётся как None, чтобы вызывающий записал ошибку.
+    """
+    line_number = 0
+    async for lines in iter_text_lines(file, chunk_size):
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError:
+                value = None
+            yield line_number, value if isinstance(value, dict) else None
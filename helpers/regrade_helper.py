@@ -0,0 +1,163 @@
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from helpers.test_snapshot import QuestionSnapshot
+from models.Enums import QuestionType
+
+# Маска вариантов хранится в uint64, поэтому вопросы с большим
+# количеством вариантов оцениваются поштучно
+MAX_MASK_OPTIONS = 64
+
+TYPE_SINGLE = 0
+TYPE_MULTIPLE = 1
+TYPE_OTHER = 2
+
+
+class QuestionMasks:
+    """Битовые маски правильных ответов для всех вопросов теста"""
+
+    def __init__(self, questions: Sequence[QuestionSnapshot]):
+        self.questions = sorted(questions, key=lambda q: q.id)
+        self.question_ids = np.array([q.id for q in self.questions], dtype=np.int64)
+        count = len(self.questions)
+        self.correct_mask = np.zeros(count, dtype=np.uint64)
+        self.correct_count = np.zeros(count, dtype=np.int64)
+        self.question_type = np.full(count, TYPE_OTHER, dtype=np.int8)
+        self.maskable = np.ones(count, dtype=bool)
+
+        option_ids = []
+        option_questions = []
+        option_bits = []
+        for i, question in enumerate(self.questions):
+            if question.type == QuestionType.single:
+                self.question_type[i] = TYPE_SINGLE
+            elif question.type == QuestionType.multiple:
+                self.question_type[i] = TYPE_MULTIPLE
+
+            if len(question.options) > MAX_MASK_OPTIONS:
+                self.maskable[i] = False
+                continue
+
+            for bit, option in enumerate(question.options):
+                option_ids.append(option.id)
+                option_questions.append(i)
+                option_bits.append(bit)
+                if option.is_correct:
+                    self.correct_mask[i] |= np.uint64(1) << np.uint64(bit)
+            self.correct_count[i] = len(question.correct_ids)
+
+        order = np.argsort(np.asarray(option_ids, dtype=np.int64), kind="stable")
+        self.option_ids = np.asarray(option_ids, dtype=np.int64)[order]
+        self.option_question = np.asarray(option_questions, dtype=np.int64)[order]
+        self.option_bit = np.asarray(option_bits, dtype=np.uint64)[order]
+
+
+def score_answers_vectorized(
+        masks: QuestionMasks,
+        question_ids: Sequence[int],
+        selected_option_ids: Sequence[Optional[Sequence[int]]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Векторизованная версия calculate_question_score для массива ответов.
+
+    Возвращает:
+        (is_correct, partial_score) - массивы той же длины, что и question_ids
+    """
+    rows_count = len(question_ids)
+    q_index = np.searchsorted(
+        masks.question_ids, np.asarray(question_ids, dtype=np.int64)
+    )
+
+    selected_option_ids = [ids or () for ids in selected_option_ids]
+    lengths = np.fromiter(map(len, selected_option_ids), dtype=np.int64, count=rows_count)
+    flat_ids = np.fromiter(
+        chain.from_iterable(selected_option_ids),
+        dtype=np.int64, count=int(lengths.sum())
+    )
+    flat_rows = np.repeat(np.arange(rows_count, dtype=np.int64), lengths)
+
+    selected_mask = np.zeros(rows_count, dtype=np.uint64)
+    extra_selected = np.zeros(rows_count, dtype=np.int64)
+    if flat_ids.size:
+        if masks.option_ids.size:
+            pos = np.searchsorted(masks.option_ids, flat_ids)
+            pos = np.minimum(pos, masks.option_ids.size - 1)
+            known = (
+                (masks.option_ids[pos] == flat_ids)
+                & (masks.option_question[pos] == q_index[flat_rows])
+            )
+            # Повторно выбранный вариант даёт тот же бит, как и в set()
+            np.bitwise_or.at(
+                selected_mask, flat_rows[known],
+                np.uint64(1) << masks.option_bit[pos[known]]
+            )
+        else:
+            known = np.zeros(flat_ids.size, dtype=bool)
+
+        # Посторонние варианты считаются неправильными, каждый по одному разу
+        if not known.all():
+            extra = np.unique(
+                np.stack([flat_rows[~known], flat_ids[~known]]), axis=1
+            )
+            np.add.at(extra_selected, extra[0], 1)
+
+    correct_mask = masks.correct_mask[q_index]
+    correct_count = masks.correct_count[q_index]
+    question_type = masks.question_type[q_index]
+
+    exact = (selected_mask == correct_mask) & (extra_selected == 0)
+    correct_selected = np.bitwise_count(selected_mask & correct_mask).astype(np.int64)
+    incorrect_selected = (
+        np.bitwise_count(selected_mask & ~correct_mask).astype(np.int64)
+        + extra_selected
+    )
+
+    # Формула та же: (правильные / всего правильных) - половинный штраф за неправильные
+    with np.errstate(divide="ignore", invalid="ignore"):
+        multiple_score = np.where(
+            correct_count > 0,
+            np.maximum(
+                0.0,
+                correct_selected / correct_count
+                - incorrect_selected / correct_count * 0.5
+            ),
+            0.0
+        )
+
+    graded = question_type != TYPE_OTHER
+    is_correct = exact & graded
+    partial_score = np.where(
+        is_correct, 1.0,
+        np.where(question_type == TYPE_MULTIPLE, multiple_score, 0.0)
+    )
+
+    # Вопросы, не поместившиеся в маску, оцениваются поштучно
+    fallback_rows = np.flatnonzero(~masks.maskable[q_index])
+    if fallback_rows.size:
+        from service.student_test_service import calculate_question_score
+        for row in fallback_rows:
+            question = masks.questions[q_index[row]]
+            row_correct, row_score = calculate_question_score(
+                question, list(selected_option_ids[row] or [])
+            )
+            is_correct[row] = row_correct
+            partial_score[row] = row_score
+
+    return is_correct, partial_score
+
+
+def attempt_scores(
+        attempt_index: np.ndarray, partial_score: np.ndarray,
+        attempts_count: int, total_questions: int
+) -> np.ndarray:
+    """Итоговый балл попыток в процентах, как в finish_test_attempt"""
+    if total_questions == 0:
+        return np.zeros(attempts_count, dtype=np.int64)
+
+    totals = np.bincount(attempt_index, weights=partial_score, minlength=attempts_count)
+    # Половины вверх, как round_score в finish_test_attempt
+    return np.floor(totals / total_questions * 100 + 0.5).astype(np.int64)
+
+
+def to_python_rows(*columns: np.ndarray) -> List[tuple]:
+    return list(zip(*(column.tolist() for column in columns)))
@@ -45,7 +45,6 @@ async def load_course_with_modules(course_id: int, db: AsyncSession):
             detail="Course not found"
         )
 
-    course.modules.sort(key=lambda m: m.position)
     return course
 
 
@@ -161,7 +160,6 @@ async def load_module_with_materials(course_id: int, module_id: int, db: AsyncSe
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Module not found in this course"
         )
-    module.materials.sort(key=lambda m: m.position)
     return module
 
 
@@ -173,8 +171,6 @@ async def load_course_modules_with_materials(course_id: int, db: AsyncSession):
         .order_by(Module.position)
     )
     modules = list(result.scalars().all())
-    for module in modules:
-        module.materials.sort(key=lambda m: m.position)
 
     return modules
 
@@ -1,8 +1,11 @@
+import math
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
-from models import CourseEnrollment, TestAttempt, User
+from models import CourseEnrollment, TestAttempt, TestAttemptSummary, User
 
 
 # TODO: удалить и заменить на from helpers.students.access_helper import require_course_enrollment
@@ -27,9 +30,12 @@ async def get_test_attempt_with_validation(
         user: User, db: AsyncSession,
         load_test: bool = False,
         load_questions: bool = False,
-        load_answers: bool = False
+        load_answers: bool = False,
+        for_update: bool = False
 ) -> TestAttempt:
     query = select(TestAttempt)
+    if for_update:
+        query = query.with_for_update(of=TestAttempt)
     if load_test:
         if load_questions:
             from models import Test, Question
@@ -63,6 +69,23 @@ async def get_test_attempt_with_validation(
     return attempt
 
 
+async def get_attempt_summary_for_update(
+        user_id: int, test_id: int, db: AsyncSession
+) -> TestAttemptSummary:
+    """
+    Сводка попыток с блокировкой строки до конца транзакции.
+    Создаётся при первом обращении одним INSERT ... ON CONFLICT.
+    """
+    stmt = pg_insert(TestAttemptSummary).values(user_id=user_id, test_id=test_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TestAttemptSummary.user_id, TestAttemptSummary.test_id],
+        set_={"user_id": stmt.excluded.user_id}
+    ).returning(TestAttemptSummary)
+
+    result = await db.scalars(stmt, execution_options={"populate_existing": True})
+    return result.one()
+
+
 async def validate_attempt_not_finished(attempt: TestAttempt) -> None:
     if attempt.finished_at is not None:
         raise HTTPException(
@@ -71,6 +94,26 @@ async def validate_attempt_not_finished(attempt: TestAttempt) -> None:
         )
 
 
+def round_score(value: float) -> int:
+    """
+    Балл в процентах округляется половиной вверх - floor(x + 0.5).
+    То же правило в attempt_scores (NumPy) и при истечении попыток (SQL).
+    """
+    return math.floor(value + 0.5)
+
+
+def is_attempt_expired(attempt: TestAttempt) -> bool:
+    return attempt.deadline_at is not None and datetime.utcnow() > attempt.deadline_at
+
+
+async def validate_attempt_deadline(attempt: TestAttempt) -> None:
+    if is_attempt_expired(attempt):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Time limit for this test attempt has expired"
+        )
+
+
 async def validate_attempt_finished(attempt: TestAttempt) -> None:
     if attempt.finished_at is None:
         raise HTTPException(
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+from models import Test, Question, Material, Module
+from models.Enums import QuestionType
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class OptionSnapshot:
+    id: int
+    content: str
+    is_correct: bool
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    id: int
+    text: str
+    type: QuestionType
+    position: int
+    hint_text: Optional[str]
+    options: Tuple[OptionSnapshot, ...]
+    correct_ids: frozenset
+
+
+@dataclass(frozen=True)
+class TestSnapshot:
+    """Неизменяемый снимок теста: вопросы, варианты и правильные ответы"""
+    id: int
+    version: int
+    title: str
+    status: str
+    num_questions: int
+    time_limit_seconds: Optional[int]
+    pass_threshold: int
+    material_id: Optional[int]
+    module_id: Optional[int]
+    course_id: Optional[int]
+    questions: Tuple[QuestionSnapshot, ...]
+    questions_by_id: Dict[int, QuestionSnapshot] = field(compare=False, repr=False)
+
+    def belongs_to(self, course_id: int, module_id: int, material_id: int) -> bool:
+        return (
+            self.course_id == course_id
+            and self.module_id == module_id
+            and self.material_id == material_id
+        )
+
+
+class TestSnapshotCache:
+    """
+    Ограниченный LRU-кэш снимков тестов в памяти процесса.
+
+    Снимок выдаётся, только если его версия совпадает с tests.version:
+    изменение теста в любом процессе увеличивает версию в БД,
+    и устаревший снимок больше не используется.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, TestSnapshot]" = OrderedDict()
+
+    def get(self, test_id: int, version: int) -> Optional[TestSnapshot]:
+        snapshot = self._entries.get(test_id)
+        if snapshot is None or snapshot.version != version:
+            return None
+
+        self._entries.move_to_end(test_id)
+        return snapshot
+
+    def put(self, snapshot: TestSnapshot) -> None:
+        cached = self._entries.get(snapshot.id)
+        if cached is not None and cached.version > snapshot.version:
+            return
+
+        self._entries[snapshot.id] = snapshot
+        self._entries.move_to_end(snapshot.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+test_snapshot_cache = TestSnapshotCache(max_size=settings.TEST_SNAPSHOT_CACHE_SIZE)
+
+
+def build_test_snapshot(
+        test: Test, module_id: Optional[int],
+        course_id: Optional[int], version: int
+) -> TestSnapshot:
+    questions = []
+    for question in sorted(test.questions, key=lambda q: (q.position, q.id)):
+        options = tuple(
+            OptionSnapshot(id=opt.id, content=opt.content, is_correct=opt.is_correct)
+            for opt in sorted(question.options, key=lambda o: o.id)
+        )
+        questions.append(QuestionSnapshot(
+            id=question.id,
+            text=question.text,
+            type=question.type,
+            position=question.position,
+            hint_text=question.hint_text,
+            options=options,
+            correct_ids=frozenset(opt.id for opt in options if opt.is_correct)
+        ))
+
+    return TestSnapshot(
+        id=test.id,
+        version=version,
+        title=test.title,
+        status=test.status,
+        num_questions=test.num_questions,
+        time_limit_seconds=test.time_limit_seconds,
+        pass_threshold=test.pass_threshold,
+        material_id=test.material_id,
+        module_id=module_id,
+        course_id=course_id,
+        questions=tuple(questions),
+        questions_by_id={q.id: q for q in questions}
+    )
+
+
+async def get_test_snapshot(test_id: int, db: AsyncSession) -> Optional[TestSnapshot]:
+    # Одна лёгкая выборка версии на каждое обращение; тест целиком - только при промахе
+    version = await db.scalar(select(Test.version).where(Test.id == test_id))
+    if version is None:
+        return None
+
+    snapshot = test_snapshot_cache.get(test_id, version)
+    if snapshot is not None:
+        return snapshot
+
+    result = await db.execute(
+        select(Test, Material.module_id, Module.course_id)
+        .options(
+            selectinload(Test.questions).selectinload(Question.options)
+        )
+        .outerjoin(Material, Test.material_id == Material.id)
+        .outerjoin(Module, Material.module_id == Module.id)
+        .where(Test.id == test_id)
+        .execution_options(populate_existing=True)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    test, module_id, course_id = row
+    snapshot = build_test_snapshot(test, module_id, course_id, test.version)
+    test_snapshot_cache.put(snapshot)
+
+    return snapshot
+
+
+async def invalidate_test_snapshot(test_id: int, db: AsyncSession) -> None:
+    """Увеличение версии теста: снимки во всех процессах устаревают. Вызывать до коммита"""
+    await db.execute(
+        update(Test)
+        .where(Test.id == test_id)
+        .values(version=Test.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def clear_test_snapshots() -> None:
+    test_snapshot_cache.clear()
@@ -8,7 +8,16 @@ from dotenv import load_dotenv
 from core.database import engine, Base
 from core.config import settings
 from core.init_db import init_database
+from core.scheduler import scheduler
+from core.security import shutdown_hash_pool
+from AI.document_processor import document_processor
 from routers import routes
+from service.attempt_expiry_service import run_attempt_expiry
+from service.file_service import run_blob_gc
+from service.job_service import run_pending_jobs
+from service.upload_session_service import run_upload_session_cleanup
+from service.user_import_service import run_import_file_cleanup
+from helpers.files.blob_store import storage
 
 
 load_dotenv()
@@ -28,10 +37,27 @@ async def lifespan(app: FastAPI):
         if settings.ENV == "production":
             raise
 
+    await storage.prepare()
+    print(f"Storage backend: {storage.name}")
+
+    scheduler.add_job(
+        "attempt_expiry", run_attempt_expiry,
+        settings.ATTEMPT_EXPIRY_INTERVAL_SECONDS
+    )
+    scheduler.add_job("blob_gc", run_blob_gc, settings.BLOB_GC_INTERVAL_SECONDS)
+    scheduler.add_job("upload_session_cleanup", run_upload_session_cleanup, settings.BLOB_GC_INTERVAL_SECONDS)
+    scheduler.add_job("import_file_cleanup", run_import_file_cleanup, settings.BLOB_GC_INTERVAL_SECONDS)
+    if not settings.JOB_WORKER_ENABLED:
+        scheduler.add_job("job_queue", run_pending_jobs, settings.JOB_RETRY_BACKOFF_SECONDS)
+    scheduler.start()
+
     print("Application started successfully")
 
     yield
 
+    await scheduler.shutdown()
+    shutdown_hash_pool()
+    document_processor.shutdown()
     await engine.dispose()
 
 
@@ -55,7 +81,9 @@ for router in routes:
     app.include_router(router, prefix="/api")
 
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# При STORAGE_BACKEND=s3 файлы отдаются по S3_PUBLIC_URL, UPLOAD_DIR - только временные загрузки
+if settings.STORAGE_BACKEND == "local" and settings.UPLOADS_PUBLIC_MOUNT:
+    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 if __name__ == "__main__":
     uvicorn.run(
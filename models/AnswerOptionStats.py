@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, ForeignKey, text
+from core.database import Base
+
+
+class AnswerOptionStats(Base):
+    __tablename__ = "answer_option_stats"
+
+    option_id: Mapped[int] = mapped_column(
+        ForeignKey("answer_options.id", ondelete="CASCADE"), primary_key=True
+    )
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    selected_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+
+    option: Mapped["AnswerOption"] = relationship("AnswerOption")
@@ -22,19 +22,25 @@ class Course(Base):
         back_populates="created_courses"
     )
     modules: Mapped[List["Module"]] = relationship(
-        "Module", back_populates="course", cascade="all, delete-orphan"
+        "Module", back_populates="course", cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="Module.position"
     )
     editors: Mapped[List["CourseEditor"]] = relationship(
-        "CourseEditor", back_populates="course", cascade="all, delete-orphan"
+        "CourseEditor", back_populates="course", cascade="all, delete-orphan",
+        passive_deletes=True
     )
     applications: Mapped[List["CourseApplication"]] = relationship(
-        "CourseApplication", back_populates="course", cascade="all, delete-orphan"
+        "CourseApplication", back_populates="course", cascade="all, delete-orphan",
+        passive_deletes=True
     )
     enrollments: Mapped[List["CourseEnrollment"]] = relationship(
-        "CourseEnrollment", back_populates="course", cascade="all, delete-orphan"
+        "CourseEnrollment", back_populates="course", cascade="all, delete-orphan",
+        passive_deletes=True
     )
     progress: Mapped[List["CourseProgress"]] = relationship(
         "CourseProgress",
         back_populates="course",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
\ No newline at end of file
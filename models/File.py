@@ -1,12 +1,18 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, BigInteger, TIMESTAMP, text
+from sqlalchemy import String, Integer, BigInteger, TIMESTAMP, text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from typing import List
+from typing import List, Optional
 from core.database import Base
 
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index(
+            "idx_file_unreferenced", "unreferenced_at",
+            postgresql_where=text("ref_count <= 0")
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -15,11 +21,15 @@ class File(Base):
     file_url: Mapped[str] = mapped_column(String(500), nullable=False)
     file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)  # в байтах
     mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
-    file_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)  # SHA-256 hash
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True, unique=True)  # SHA-256 hash
     uploaded_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
+    # Число привязок к материалам; при нуле файл через BLOB_GC_GRACE_SECONDS удаляет сборщик
+    ref_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    unreferenced_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
 
     material_files: Mapped[List["MaterialFile"]] = relationship(
         "MaterialFile",
         back_populates="file",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
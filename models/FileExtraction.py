@@ -0,0 +1,20 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Text, TIMESTAMP, text
+from core.database import Base
+
+
+class FileExtraction(Base):
+    """
+    Кеш извлечённого текста и транскрипции по содержимому файла.
+    Ключ - SHA-256 и версия извлекателя: смена парсера или модели Whisper
+    даёт новую версию, и файлы обрабатываются заново.
+    """
+    __tablename__ = "file_extractions"
+
+    file_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    extractor_version: Mapped[str] = mapped_column(String(50), primary_key=True)
+    text_content: Mapped[Optional[str]] = mapped_column(Text)
+    transcript: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
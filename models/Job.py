@@ -0,0 +1,43 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, String, Text, ForeignKey, TIMESTAMP, text, Index
+from sqlalchemy import Enum as SAEnum
+from core.database import Base
+from .Enums import JobStatus
+
+
+class Job(Base):
+    """Фоновая задача с прогрессом (клонирование курса, обработка файлов и т.п.)"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Очередь для воркера: SELECT ... WHERE status = 'pending' FOR UPDATE SKIP LOCKED
+        Index("idx_job_pending", "id", postgresql_where=text("status = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    type: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[JobStatus] = mapped_column(
+        SAEnum(JobStatus, name="job_status"),
+        server_default=text("'pending'"),
+        nullable=False
+    )
+    progress: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    payload: Mapped[Optional[dict]] = mapped_column(JSONB)
+    result: Mapped[Optional[dict]] = mapped_column(JSONB)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, server_default=text("3"), nullable=False)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(100))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    # Повтор после ошибки откладывается (экспоненциальная задержка)
+    available_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
+    created_by: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+
+    creator: Mapped[Optional["User"]] = relationship("User")
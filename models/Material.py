@@ -22,10 +22,12 @@ class Material(Base):
     tests: Mapped[List["Test"]] = relationship(
         "Test",
         back_populates="material",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     material_files: Mapped[List["MaterialFile"]] = relationship(
         "MaterialFile",
         back_populates="material",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
@@ -0,0 +1,22 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, ForeignKey, text
+from core.database import Base
+
+
+class MaterialFunnelStats(Base):
+    """
+    Накопительные счётчики воронки прохождения курса по материалу:
+    сколько студентов отметили материал пройденным и сдали его тест.
+    """
+    __tablename__ = "material_funnel_stats"
+
+    material_id: Mapped[int] = mapped_column(
+        ForeignKey("materials.id", ondelete="CASCADE"), primary_key=True
+    )
+    course_id: Mapped[int] = mapped_column(
+        ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    completed_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    passed_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+
+    material: Mapped["Material"] = relationship("Material")
@@ -19,6 +19,8 @@ class Module(Base):
     materials: Mapped[List["Material"]] = relationship(
         "Material",
         back_populates="module",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="Material.position"
     )
 
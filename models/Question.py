@@ -22,5 +22,6 @@ class Question(Base):
     options: Mapped[List["AnswerOption"]] = relationship(
         "AnswerOption",
         back_populates="question",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
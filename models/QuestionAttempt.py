@@ -1,7 +1,7 @@
-from typing import Optional
-from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Dict, List, Optional
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, Boolean, ForeignKey, text, UniqueConstraint
+from sqlalchemy import Integer, Boolean, ForeignKey, REAL, text, UniqueConstraint, Index
 from core.database import Base
 
 
@@ -14,15 +14,31 @@ class QuestionAttempt(Base):
             "attempt_number",
             name="uq_test_question_attempt"
         ),
+        Index(
+            "idx_question_attempt_selected_options", "selected_option_ids",
+            postgresql_using="gin"
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     test_attempt_id: Mapped[int] = mapped_column(ForeignKey("test_attempts.id", ondelete="CASCADE"), nullable=False)
     question_id: Mapped[int] = mapped_column(ForeignKey("questions.id"), nullable=False)
+    # Только свободная часть ответа (например, {"text": ...}); выбор и балл - в отдельных колонках
     answer: Mapped[Optional[dict]] = mapped_column(JSONB)
+    selected_option_ids: Mapped[Optional[List[int]]] = mapped_column(ARRAY(Integer))
+    partial_score: Mapped[float] = mapped_column(REAL, server_default=text("0"), nullable=False)
     is_correct: Mapped[Optional[bool]] = mapped_column(Boolean)
     hint_used: Mapped[bool] = mapped_column(Boolean, server_default=text("false"), nullable=False)
     attempt_number: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
     question: Mapped["Question"] = relationship("Question")
     test_attempt: Mapped["TestAttempt"] = relationship("TestAttempt", back_populates="question_attempts")
+
+    @property
+    def answer_data(self) -> Dict[str, Any]:
+        """Ответ в прежнем формате API: {"selected_option_ids": [...], "partial_score": x, ...}"""
+        data = dict(self.answer or {})
+        if self.selected_option_ids is not None:
+            data["selected_option_ids"] = list(self.selected_option_ids)
+        data["partial_score"] = self.partial_score
+        return data
@@ -0,0 +1,28 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, Float, ForeignKey, text
+from core.database import Base
+
+
+class QuestionStats(Base):
+    """
+    Накопительные счётчики для анализа вопроса.
+    x - балл за вопрос (partial_score), y - итоговый балл попытки (0..1).
+    """
+    __tablename__ = "question_stats"
+
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True
+    )
+    test_id: Mapped[int] = mapped_column(
+        ForeignKey("tests.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    answers_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    correct_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    hint_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    sum_x: Mapped[float] = mapped_column(Float, server_default=text("0"), nullable=False)
+    sum_x2: Mapped[float] = mapped_column(Float, server_default=text("0"), nullable=False)
+    sum_y: Mapped[float] = mapped_column(Float, server_default=text("0"), nullable=False)
+    sum_y2: Mapped[float] = mapped_column(Float, server_default=text("0"), nullable=False)
+    sum_xy: Mapped[float] = mapped_column(Float, server_default=text("0"), nullable=False)
+
+    question: Mapped["Question"] = relationship("Question")
@@ -13,6 +13,8 @@ class Test(Base):
     time_limit_seconds: Mapped[Optional[int]] = mapped_column(Integer)
     pass_threshold: Mapped[int] = mapped_column(Integer, nullable=False)
     status: Mapped[str] = mapped_column(String(20), server_default=text("'draft'"), nullable=False)
+    # Увеличивается при каждом изменении теста; по ней сверяются снимки в кэшах процессов
+    version: Mapped[int] = mapped_column(Integer, server_default=text("1"), nullable=False)
     generated_by_nn: Mapped[bool] = mapped_column(Boolean, server_default=text("false"), nullable=False)
     created_by: Mapped[Optional[int]] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"), nullable=True
@@ -21,7 +23,7 @@ class Test(Base):
         ForeignKey("modules.id", ondelete="CASCADE"), nullable=True
     )
     material_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey("materials.id", ondelete="SET NULL"),
+        ForeignKey("materials.id", ondelete="CASCADE"),
         nullable=True, index=True
     )
 
@@ -33,10 +35,13 @@ class Test(Base):
     questions: Mapped[List["Question"]] = relationship(
         "Question",
         back_populates="test",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="Question.position"
     )
     attempts: Mapped[List["TestAttempt"]] = relationship(
         "TestAttempt",
         back_populates="test",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
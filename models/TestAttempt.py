@@ -9,6 +9,10 @@ class TestAttempt(Base):
     __tablename__ = "test_attempts"
     __table_args__ = (
         Index("idx_user_test_attempt", "user_id", "test_id"),
+        Index(
+            "idx_test_attempt_open_deadline", "deadline_at",
+            postgresql_where=text("finished_at IS NULL")
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -19,6 +23,7 @@ class TestAttempt(Base):
     attempt_number: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     started_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
     finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    deadline_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
     blocked_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
     current_question_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("questions.id", ondelete="SET NULL")
@@ -27,7 +32,8 @@ class TestAttempt(Base):
     question_attempts: Mapped[List["QuestionAttempt"]] = relationship(
         "QuestionAttempt",
         back_populates="test_attempt",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     test: Mapped["Test"] = relationship("Test", back_populates="attempts")
     user: Mapped["User"] = relationship("User")
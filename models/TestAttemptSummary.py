@@ -0,0 +1,28 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, ForeignKey, TIMESTAMP, text
+from core.database import Base
+
+
+class TestAttemptSummary(Base):
+    """Сводка попыток пользователя по тесту, обновляется вместе с попытками"""
+    __tablename__ = "test_attempt_summary"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    test_id: Mapped[int] = mapped_column(
+        ForeignKey("tests.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    attempt_count: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    best_score: Mapped[Optional[int]] = mapped_column(Integer)
+    fail_streak: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    blocked_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    active_attempt_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("test_attempts.id", ondelete="SET NULL")
+    )
+
+    user: Mapped["User"] = relationship("User")
+    test: Mapped["Test"] = relationship("Test")
+    active_attempt: Mapped[Optional["TestAttempt"]] = relationship("TestAttempt")
@@ -25,40 +25,47 @@ class User(Base):
     refresh_tokens: Mapped[list["RefreshToken"]] = relationship(
         "RefreshToken",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     created_courses: Mapped[List["Course"]] = relationship(
         "Course",
         back_populates="creator",
         foreign_keys="Course.creator_id",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     applications: Mapped[List["CourseApplication"]] = relationship(
         "CourseApplication",
         back_populates="user",
         foreign_keys="CourseApplication.user_id",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     enrollments: Mapped[List["CourseEnrollment"]] = relationship(
         "CourseEnrollment",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     editable_courses: Mapped[List["CourseEditor"]] = relationship(
         "CourseEditor",
         back_populates="user",
         foreign_keys="CourseEditor.user_id",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     lesson_progress: Mapped[List["LessonProgress"]] = relationship(
         "LessonProgress",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     course_progress: Mapped[List["CourseProgress"]] = relationship(
         "CourseProgress",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=text("NOW()"), nullable=False)
@@ -17,3 +17,9 @@ from .Question import Question
 from .AnswerOption import AnswerOption
 from .TestAttempt import TestAttempt
 from .QuestionAttempt import QuestionAttempt
+from .TestAttemptSummary import TestAttemptSummary
+from .QuestionStats import QuestionStats
+from .AnswerOptionStats import AnswerOptionStats
+from .Job import Job
+from .MaterialFunnelStats import MaterialFunnelStats
+from .FileExtraction import FileExtraction
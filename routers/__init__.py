@@ -5,6 +5,7 @@ from .teacher import teacher_route
 from .test import test_route
 from .student import student_route
 from .AI import ai_route
+from .media import media_route
 
 routes = [
     auth_route.auth_router,
@@ -13,5 +14,6 @@ routes = [
     teacher_route.teacher_router,
     test_route.test_router,
     student_route.student_router,
-    ai_route.ai_router
+    ai_route.ai_router,
+    media_route.media_router
 ]
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, HTTPException,
+    status, Query, UploadFile, File as FastAPIFile
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from math import ceil
 from core.database import get_db
 from core.dependencies import get_current_admin
-from service import admin_service
+from service import admin_service, job_service, user_import_service
 from models import User
 from models.Enums import RoleType
 from schemas.admin import (
@@ -13,6 +16,7 @@ from schemas.admin import (
     StatisticsResponse, ChangeUserRoleRequest
 )
 from schemas.auth import MessageResponse
+from schemas.job import JobResponse
 
 admin_router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -32,6 +36,26 @@ async def create_user(
     return user
 
 
+@admin_router.post(
+    "/users/import",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Create users in bulk from CSV or JSONL"
+)
+async def import_users(
+        background_tasks: BackgroundTasks,
+        file: UploadFile = FastAPIFile(...),
+        current_admin: User = Depends(get_current_admin),
+        db: AsyncSession = Depends(get_db)
+):
+    path = await user_import_service.store_import_file(file)
+    job = await job_service.create_job(
+        "import_users", {"path": path}, current_admin, db
+    )
+    job_service.dispatch_job(job, background_tasks)
+    return job
+
+
 @admin_router.get(
     "/users",
     response_model=PaginatedUsersResponse,
@@ -104,6 +128,31 @@ async def delete_user(
     return MessageResponse(message="User successfully deleted")
 
 
+@admin_router.post(
+    "/users/{user_id}/delete-job",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Delete user with large history in background"
+)
+async def delete_user_in_background(
+        user_id: int,
+        background_tasks: BackgroundTasks,
+        current_admin: User = Depends(get_current_admin),
+        db: AsyncSession = Depends(get_db)
+):
+    if user_id == current_admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You cannot delete yourself"
+        )
+    await admin_service.get_user_by_id(user_id, db)
+    job = await job_service.create_job(
+        "delete_user", {"user_id": user_id}, current_admin, db
+    )
+    job_service.dispatch_job(job, background_tasks)
+    return job
+
+
 @admin_router.patch(
     "/users/{user_id}/role",
     response_model=UserListResponse,
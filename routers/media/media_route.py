@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_db
+from core.dependencies import get_current_user
+from service import media_service
+from models import User
+from schemas.file import MediaUrlResponse
+
+media_router = APIRouter(prefix="/media", tags=["Media"])
+
+
+#     Доступ проверяется один раз при выдаче ссылки,
+#     сама отдача (в т.ч. перемотка видео Range-запросами) идёт по токену
+@media_router.get(
+    "/{file_id}/url",
+    response_model=MediaUrlResponse,
+    summary="Get signed media URL"
+)
+async def get_media_url(
+        file_id: int,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    return await media_service.create_media_url(file_id, current_user, db)
+
+
+@media_router.get(
+    "/{file_id}/content",
+    summary="Stream media file"
+)
+async def get_media_content(
+        file_id: int, request: Request,
+        token: str = Query(...)
+):
+    return await media_service.serve_media(file_id, token, request)
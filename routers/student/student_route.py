@@ -14,7 +14,8 @@ from schemas.student import (
 from schemas.student_tests import (
     TestForStudent, TestAttemptResponse, SubmitAnswerRequest,
     QuestionAttemptResponse, TestResultResponse, MyTestAttemptSummary,
-    TestAttemptWithBlockResponse
+    TestAttemptWithBlockResponse, SubmitAnswersBatchRequest,
+    SubmitAnswersBatchResponse
 )
 from schemas.auth import MessageResponse
 
@@ -235,6 +236,26 @@ async def submit_answer(
     return question_attempt
 
 
+@student_router.post(
+    "/my-courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}/attempts/{attempt_id}/answers",
+    response_model=SubmitAnswersBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Submit answers to several questions"
+)
+async def submit_answers_batch(
+    course_id: int, module_id: int,
+    material_id: int, test_id: int,
+    attempt_id: int, data: SubmitAnswersBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await student_test_service.submit_answers_batch(
+        course_id, module_id, material_id, test_id,
+        attempt_id, data.answers, current_user, db
+    )
+    return result
+
+
 @student_router.post(
     "/my-courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}/attempts/{attempt_id}/finish",
     response_model=TestAttemptWithBlockResponse,
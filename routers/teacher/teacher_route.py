@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File as FastAPIFile, HTTPException
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, status, UploadFile, File as FastAPIFile, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from core.database import get_db
 from sqlalchemy import select, and_
 from core.dependencies import get_current_teacher
 from models import User, Module, Material, File, MaterialFile
-from service import course_service, file_service, material_service
+from models.Enums import ApplicationStatus
+from service import (
+    course_service, file_service, material_service,
+    course_clone_service, job_service, roster_service,
+    gradebook_service, funnel_service, upload_session_service
+)
 from models import User
 from schemas.course import (
     CourseCreateRequest, CourseUpdateRequest, CourseResponse,
     ModuleCreateRequest, ModuleUpdateRequest, CourseWithModulesResponse,
     ModuleResponse, ModuleWithMaterialsResponse,
     MaterialCreateRequest, MaterialUpdateRequest,
-    MaterialResponse, AddEditorRequest, EditorResponse
+    MaterialResponse, AddEditorRequest, EditorResponse,
+    CourseCloneRequest, ReorderRequest, CourseFunnelResponse
+)
+from schemas.student import (
+    CourseApplicationDetailResponse, CourseApplicationResponse,
+    BulkApplicationReviewRequest, BulkApplicationReviewResponse,
+    RosterImportResponse
+)
+from schemas.file import (
+    FileResponse, AttachFilesResponse,
+    UploadSessionCreateRequest, UploadSessionResponse,
+    FileLookupRequest, FileLookupResponse
 )
-from schemas.student import CourseApplicationDetailResponse, CourseApplicationResponse
-from schemas.file import FileResponse, MaterialFileResponse
 from schemas.auth import MessageResponse
+from schemas.job import JobResponse
 
 teacher_router = APIRouter(prefix="/teacher", tags=["Teacher"])
 
@@ -100,8 +118,145 @@ async def delete_course(
     )
 
 
+@teacher_router.post(
+    "/courses/{course_id}/delete-job",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Delete large course in background"
+)
+async def delete_course_in_background(
+        course_id: int,
+        background_tasks: BackgroundTasks,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    await course_service.check_course_access(
+        course_id, current_teacher, db, require_creator=True
+    )
+    job = await job_service.create_job(
+        "delete_course", {"course_id": course_id}, current_teacher, db
+    )
+    job_service.dispatch_job(job, background_tasks)
+    return job
+
+
+@teacher_router.post(
+    "/courses/{course_id}/clone",
+    response_model=CourseResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Clone course with modules, materials and tests"
+)
+async def clone_course(
+        course_id: int, data: CourseCloneRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    course = await course_clone_service.clone_course_for_teacher(
+        course_id, data.title, current_teacher, db
+    )
+    return course
+
+
+@teacher_router.post(
+    "/courses/{course_id}/clone-job",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Clone course in background"
+)
+async def clone_course_in_background(
+        course_id: int, data: CourseCloneRequest,
+        background_tasks: BackgroundTasks,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    await course_service.check_course_access(course_id, current_teacher, db)
+    job = await job_service.create_job(
+        "clone_course",
+        {"course_id": course_id, "title": data.title, "user_id": current_teacher.id},
+        current_teacher, db
+    )
+    job_service.dispatch_job(job, background_tasks)
+    return job
+
+
+@teacher_router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    summary="Get background job status"
+)
+async def get_job(
+        job_id: int,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    job = await job_service.get_job(job_id, current_teacher, db)
+    return job
+
+
+@teacher_router.post(
+    "/jobs/{job_id}/cancel",
+    response_model=JobResponse,
+    summary="Cancel background job"
+)
+async def cancel_job(
+        job_id: int,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    return await job_service.cancel_job(job_id, current_teacher, db)
+
+
+@teacher_router.post(
+    "/jobs/{job_id}/retry",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Retry failed or cancelled background job"
+)
+async def retry_job(
+        job_id: int,
+        background_tasks: BackgroundTasks,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    return await job_service.retry_job(job_id, current_teacher, db, background_tasks)
+
+
 # MODULES
 
+@teacher_router.put(
+    "/courses/{course_id}/modules/order",
+    response_model=CourseWithModulesResponse,
+    summary="Reorder modules"
+)
+async def reorder_modules(
+        course_id: int,
+        data: ReorderRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    course = await course_service.reorder_modules(
+        course_id, data, current_teacher, db
+    )
+    return course
+
+
+@teacher_router.put(
+    "/courses/{course_id}/modules/{module_id}/materials/order",
+    response_model=ModuleWithMaterialsResponse,
+    summary="Reorder materials"
+)
+async def reorder_materials(
+        course_id: int, module_id: int,
+        data: ReorderRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    module = await material_service.reorder_materials(
+        course_id, module_id, data, current_teacher, db
+    )
+    return module
+
+
 @teacher_router.post(
     "/courses/{course_id}/modules",
     response_model=ModuleResponse,
@@ -284,24 +439,114 @@ async def upload_file(
     return uploaded_file
 
 
+#     Сначала хеш: если файл уже есть, тело не передаётся,
+#     иначе в ответе открытая сессия возобновляемой загрузки.
+@teacher_router.post(
+    "/files/lookup",
+    response_model=FileLookupResponse,
+    summary="Find uploaded file by hash before upload"
+)
+async def lookup_file(
+        data: FileLookupRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    return await upload_session_service.negotiate_upload(data, current_teacher, db)
+
+
+#     Возобновляемая загрузка больших файлов:
+#     POST /files/uploads -> PUT /files/uploads/{id}?offset=N (тело - байты куска)
+#     -> POST /files/uploads/{id}/complete. После обрыва offset берётся из GET.
+@teacher_router.post(
+    "/files/uploads",
+    response_model=UploadSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Start resumable upload"
+)
+async def create_upload_session(
+        data: UploadSessionCreateRequest,
+        current_teacher: User = Depends(get_current_teacher)
+):
+    return await upload_session_service.create_upload_session(data, current_teacher)
+
+
+@teacher_router.get(
+    "/files/uploads/{upload_id}",
+    response_model=UploadSessionResponse,
+    summary="Get resumable upload status"
+)
+async def get_upload_session(
+        upload_id: str,
+        current_teacher: User = Depends(get_current_teacher)
+):
+    return await upload_session_service.get_upload_session(upload_id, current_teacher)
+
+
+@teacher_router.put(
+    "/files/uploads/{upload_id}",
+    response_model=UploadSessionResponse,
+    summary="Append chunk to resumable upload"
+)
+async def append_upload_chunk(
+        upload_id: str, request: Request,
+        offset: int = Query(..., ge=0),
+        current_teacher: User = Depends(get_current_teacher)
+):
+    return await upload_session_service.append_upload_chunk(
+        upload_id, offset, request.stream(), current_teacher
+    )
+
+
+@teacher_router.post(
+    "/files/uploads/{upload_id}/complete",
+    response_model=FileResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Complete resumable upload"
+)
+async def complete_upload_session(
+        upload_id: str,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    return await upload_session_service.complete_upload_session(upload_id, current_teacher, db)
+
+
+@teacher_router.delete(
+    "/files/uploads/{upload_id}",
+    response_model=MessageResponse,
+    summary="Abort resumable upload"
+)
+async def abort_upload_session(
+        upload_id: str,
+        current_teacher: User = Depends(get_current_teacher)
+):
+    await upload_session_service.abort_upload_session(upload_id, current_teacher)
+    return MessageResponse(message="Upload aborted")
+
+
 #     Прикрепление файлов к материалу.
 #     Сначала загрузить файлы через /files/upload,
 #     затем прикрепите их к материалу по ID.
+#     Текст и транскрипция появляются в материале после задачи из ответа.
 @teacher_router.post(
     "/courses/{course_id}/modules/{module_id}/materials/{material_id}/files",
-    response_model=List[MaterialFileResponse],
+    response_model=AttachFilesResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     summary="Attach files to material"
 )
 async def attach_files(
     course_id: int, module_id: int,
     material_id: int, file_ids: List[int],
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
-    material_files = await material_service.attach_files_to_material(
+    result = await material_service.attach_files_to_material(
         course_id, module_id, material_id, file_ids, current_teacher, db
     )
-    return material_files
+    if result["job"]:
+        job_service.dispatch_job(result["job"], background_tasks)
+    return result
 
 
 @teacher_router.delete(
@@ -390,6 +635,101 @@ async def get_applications(
     return applications
 
 
+@teacher_router.post(
+    "/courses/{course_id}/applications/approve",
+    response_model=BulkApplicationReviewResponse,
+    summary="Approve applications in bulk"
+)
+async def approve_applications(
+        course_id: int,
+        data: BulkApplicationReviewRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    result = await course_service.review_applications(
+        course_id, data, ApplicationStatus.approved, current_teacher, db
+    )
+    return result
+
+
+@teacher_router.post(
+    "/courses/{course_id}/applications/reject",
+    response_model=BulkApplicationReviewResponse,
+    summary="Reject applications in bulk"
+)
+async def reject_applications(
+        course_id: int,
+        data: BulkApplicationReviewRequest,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    result = await course_service.review_applications(
+        course_id, data, ApplicationStatus.rejected, current_teacher, db
+    )
+    return result
+
+
+@teacher_router.post(
+    "/courses/{course_id}/roster",
+    response_model=RosterImportResponse,
+    summary="Enroll students from CSV roster"
+)
+async def import_roster(
+        course_id: int,
+        file: UploadFile = FastAPIFile(...),
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    result = await roster_service.import_roster(
+        course_id, file, current_teacher, db
+    )
+    return result
+
+
+@teacher_router.get(
+    "/courses/{course_id}/gradebook",
+    summary="Export course gradebook"
+)
+async def export_gradebook(
+        course_id: int,
+        file_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    await course_service.check_course_access(course_id, current_teacher, db)
+
+    if file_format == "xlsx":
+        path = await gradebook_service.build_gradebook_xlsx(course_id)
+        return StreamingResponse(
+            gradebook_service.iter_file_chunks(path),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="gradebook_{course_id}.xlsx"'},
+            background=BackgroundTask(os.remove, path)
+        )
+
+    return StreamingResponse(
+        gradebook_service.iter_gradebook_csv(course_id),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="gradebook_{course_id}.csv"'}
+    )
+
+
+@teacher_router.get(
+    "/courses/{course_id}/funnel",
+    response_model=CourseFunnelResponse,
+    summary="Get course completion funnel"
+)
+async def get_course_funnel(
+        course_id: int,
+        current_teacher: User = Depends(get_current_teacher),
+        db: AsyncSession = Depends(get_db)
+):
+    funnel = await funnel_service.get_course_funnel(
+        course_id, current_teacher, db
+    )
+    return funnel
+
+
 @teacher_router.post(
     "/applications/{application_id}/approve",
     response_model=CourseApplicationDetailResponse,
@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
 from core.dependencies import get_current_teacher
-from service import test_service
-from models import User
+from service import test_service, job_service
+from service.regrade_service import check_regrade_access
+from service.item_analytics_service import get_test_analytics
+from models import User, Job
 from schemas.tests import (
     TestCreateRequest, TestUpdateRequest, TestResponse,
     TestWithQuestionsResponse, QuestionCreateRequest,
     QuestionUpdateRequest, QuestionResponse,
-    AnswerOptionCreate, AnswerOptionUpdate, AnswerOptionResponse
+    AnswerOptionCreate, AnswerOptionUpdate, AnswerOptionResponse,
+    TestAnalyticsResponse, TestDocumentRequest
 )
 from schemas.auth import MessageResponse
+from schemas.job import JobResponse
 
 test_router = APIRouter(prefix="/test", tags=["Test"])
 
 
+async def enqueue_regrade(
+    test_id: int, user: User, db: AsyncSession,
+    background_tasks: BackgroundTasks
+) -> Job:
+    """Пересчёт уже сданных попыток - задачей в очереди, переживает рестарт"""
+    job = await job_service.create_job("regrade_test", {"test_id": test_id}, user, db)
+    job_service.dispatch_job(job, background_tasks)
+    return job
+
+
 @test_router.post(
     "/courses/{course_id}/modules/{module_id}/materials/{material_id}/tests",
     response_model=TestResponse,
@@ -71,6 +85,29 @@ async def update_test(
     return test
 
 
+@test_router.put(
+    "/courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}/document",
+    response_model=TestWithQuestionsResponse,
+    summary="Save whole test with questions and options"
+)
+async def save_test_document(
+    course_id: int, module_id: int,
+    material_id: int, test_id: int,
+    data: TestDocumentRequest,
+    background_tasks: BackgroundTasks,
+    current_teacher: User = Depends(get_current_teacher),
+    db: AsyncSession = Depends(get_db)
+):
+    test, key_changed = await test_service.save_test_document(
+        course_id, module_id, material_id,
+        test_id, data, current_teacher, db
+    )
+    # Ключ ответов изменился - пересчитываем уже сданные попытки
+    if key_changed:
+        await enqueue_regrade(test_id, current_teacher, db, background_tasks)
+    return test
+
+
 @test_router.delete(
     "/courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}",
     response_model=MessageResponse,
@@ -119,6 +156,7 @@ async def update_question(
     course_id: int, module_id: int,
     material_id: int, test_id: int,
     question_id: int, data: QuestionUpdateRequest,
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
@@ -126,6 +164,9 @@ async def update_question(
         course_id, module_id, material_id, test_id,
         question_id, data, current_teacher, db
     )
+    # От типа вопроса зависит оценка ответа
+    if data.type is not None:
+        await enqueue_regrade(test_id, current_teacher, db, background_tasks)
     return question
 
 
@@ -138,6 +179,7 @@ async def delete_question(
     course_id: int, module_id: int,
     material_id: int, test_id: int,
     question_id: int,
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
@@ -145,6 +187,8 @@ async def delete_question(
         course_id, module_id, material_id,
         test_id, question_id, current_teacher, db
     )
+    # Без вопроса меняется максимальный балл - пересчитываем уже сданные попытки
+    await enqueue_regrade(test_id, current_teacher, db, background_tasks)
     return MessageResponse(message="Question successfully deleted")
 
 
@@ -160,6 +204,7 @@ async def add_answer_option(
     course_id: int, module_id: int,
     material_id: int, test_id: int,
     question_id: int, data: AnswerOptionCreate,
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
@@ -167,6 +212,9 @@ async def add_answer_option(
         course_id, module_id, material_id, test_id,
         question_id, data, current_teacher, db
     )
+    # Новый правильный вариант меняет ключ ответов
+    if data.is_correct:
+        await enqueue_regrade(test_id, current_teacher, db, background_tasks)
     return option
 
 
@@ -181,6 +229,7 @@ async def update_answer_option(
     material_id: int, test_id: int,
     question_id: int, option_id: int,
     data: AnswerOptionUpdate,
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
@@ -188,6 +237,9 @@ async def update_answer_option(
         course_id, module_id, material_id, test_id,
         question_id, option_id, data, current_teacher, db
     )
+    # Ключ ответов изменился - пересчитываем уже сданные попытки
+    if data.is_correct is not None:
+        await enqueue_regrade(test_id, current_teacher, db, background_tasks)
     return option
 
 
@@ -201,6 +253,7 @@ async def delete_answer_option(
     course_id: int, module_id: int,
     material_id: int, test_id: int,
     question_id: int, option_id: int,
+    background_tasks: BackgroundTasks,
     current_teacher: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db)
 ):
@@ -208,4 +261,43 @@ async def delete_answer_option(
         course_id, module_id, material_id, test_id,
         question_id, option_id, current_teacher, db
     )
+    await enqueue_regrade(test_id, current_teacher, db, background_tasks)
     return MessageResponse(message="Answer option successfully deleted")
+
+
+@test_router.post(
+    "/courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}/regrade",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Regrade all attempts of test in background"
+)
+async def regrade_test(
+    course_id: int, module_id: int,
+    material_id: int, test_id: int,
+    background_tasks: BackgroundTasks,
+    current_teacher: User = Depends(get_current_teacher),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_regrade_access(
+        course_id, module_id, material_id,
+        test_id, current_teacher, db
+    )
+    return await enqueue_regrade(test_id, current_teacher, db, background_tasks)
+
+
+@test_router.get(
+    "/courses/{course_id}/modules/{module_id}/materials/{material_id}/tests/{test_id}/analytics",
+    response_model=TestAnalyticsResponse,
+    summary="Get item analytics of test"
+)
+async def get_analytics(
+    course_id: int, module_id: int,
+    material_id: int, test_id: int,
+    current_teacher: User = Depends(get_current_teacher),
+    db: AsyncSession = Depends(get_db)
+):
+    analytics = await get_test_analytics(
+        course_id, module_id, material_id,
+        test_id, current_teacher, db
+    )
+    return analytics
@@ -19,6 +19,13 @@ class CourseUpdateRequest(BaseModel):
     img_url: Optional[str] = Field(None, max_length=500)
 
 
+class CourseCloneRequest(BaseModel):
+    title: Optional[str] = Field(
+        None, min_length=1, max_length=255,
+        description="Название копии; по умолчанию - как у исходного курса"
+    )
+
+
 class CourseResponse(BaseModel):
     id: int
     title: str
@@ -42,6 +49,19 @@ class ModuleUpdateRequest(BaseModel):
     position: Optional[int] = Field(None, ge=1)
 
 
+class PositionItem(BaseModel):
+    id: int
+    position: int = Field(..., ge=1)
+
+
+class ReorderRequest(BaseModel):
+    items: List[PositionItem] = Field(
+        ...,
+        min_length=1,
+        description="Новые позиции элементов; остальные элементы не меняются"
+    )
+
+
 class ModuleResponse(BaseModel):
     id: int
     title: str
@@ -116,3 +136,29 @@ class EditorResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# COURSE FUNNEL
+class MaterialFunnel(BaseModel):
+    material_id: int
+    title: str
+    position: int
+    has_tests: bool
+    completed_count: int = Field(..., description="Отметили материал пройденным")
+    passed_count: int = Field(..., description="Сдали тест материала")
+    completion_rate: Optional[float] = Field(None, description="Доля записанных, отметивших материал")
+    pass_rate: Optional[float] = Field(None, description="Доля записанных, сдавших тест")
+    stuck_count: int = Field(..., description="Открыли материал, но ещё не прошли его")
+
+
+class ModuleFunnel(BaseModel):
+    module_id: int
+    title: str
+    position: int
+    materials: List[MaterialFunnel] = []
+
+
+class CourseFunnelResponse(BaseModel):
+    course_id: int
+    enrolled: int
+    modules: List[ModuleFunnel] = []
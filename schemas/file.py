@@ -1,17 +1,28 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+from core.config import settings
+from schemas.job import JobResponse
 
 
 class FileResponse(BaseModel):
     id: int
     filename: str
     original_filename: str
-    file_url: str
+    file_url: str = Field(
+        ..., description="Ссылка на подписанный URL файла (GET с авторизацией)"
+    )
     file_size: int
     mime_type: str
     uploaded_at: datetime
 
+    @model_validator(mode="after")
+    def media_file_url(self):
+        # Прямые ссылки на хранилище отдаются только при включённой публичной раздаче
+        if not settings.UPLOADS_PUBLIC_MOUNT:
+            self.file_url = f"/api/media/{self.id}/url"
+        return self
+
     class Config:
         from_attributes = True
 
@@ -23,3 +34,49 @@ class MaterialFileResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AttachFilesResponse(BaseModel):
+    files: List[MaterialFileResponse]
+    job: Optional[JobResponse] = Field(
+        None, description="Задача извлечения текста и транскрибации новых файлов"
+    )
+
+
+class UploadSessionCreateRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255, description="Исходное имя файла")
+    size: int = Field(..., ge=0, description="Полный размер файла в байтах")
+    mime_type: Optional[str] = Field(None, max_length=100)
+    sha256: Optional[str] = Field(
+        None, min_length=64, max_length=64,
+        description="Хеш файла от клиента, сверяется при завершении"
+    )
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    offset: int = Field(..., description="Сколько байт уже принято - с этого места продолжать")
+    chunk_size: int = Field(..., description="Максимальный размер куска за один запрос")
+    created_at: datetime
+
+
+class FileLookupRequest(BaseModel):
+    sha256: str = Field(..., min_length=64, max_length=64, description="SHA-256 содержимого, считается клиентом")
+    size: int = Field(..., ge=0, description="Размер файла в байтах")
+    filename: str = Field(..., min_length=1, max_length=255)
+    mime_type: Optional[str] = Field(None, max_length=100)
+
+
+class FileLookupResponse(BaseModel):
+    exists: bool = Field(..., description="Файл уже загружен - передавать тело не нужно")
+    file: Optional[FileResponse] = None
+    upload: Optional[UploadSessionResponse] = Field(
+        None, description="Открытая сессия возобновляемой загрузки, если файла нет"
+    )
+
+
+class MediaUrlResponse(BaseModel):
+    url: str = Field(..., description="Ссылка на файл с токеном доступа, подходит для <video src>")
+    expires_at: datetime
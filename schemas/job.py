@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, Dict, Any
+from models.Enums import JobStatus
+
+
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    status: JobStatus
+    progress: int = Field(..., description="Прогресс в процентах")
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = Field(..., description="Сколько раз задача запускалась")
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -38,6 +38,42 @@ class CourseApplicationDetailResponse(BaseModel):
         from_attributes = True
 
 
+class BulkApplicationReviewRequest(BaseModel):
+    application_ids: Optional[List[int]] = Field(
+        None, min_length=1, description="Id заявок курса"
+    )
+    group_name: Optional[str] = Field(
+        None, description="Все ожидающие заявки студентов этой группы"
+    )
+
+
+class BulkApplicationReviewResponse(BaseModel):
+    reviewed_ids: List[int] = Field(..., description="Рассмотренные заявки")
+    skipped_ids: List[int] = Field(
+        default_factory=list,
+        description="Запрошенные заявки, которые не найдены или уже рассмотрены"
+    )
+    enrolled: int = Field(0, description="Сколько студентов записано на курс")
+
+
+# ROSTER IMPORT (ЗАПИСЬ ПО СПИСКУ)
+
+class RosterRowReport(BaseModel):
+    row: int = Field(..., description="Номер строки в файле")
+    email: Optional[str] = None
+    group_name: Optional[str] = None
+    status: str = Field(
+        ..., description="enrolled, already_enrolled, not_found или invalid"
+    )
+    enrolled: int = Field(0, description="Сколько студентов записано по строке")
+
+
+class RosterImportResponse(BaseModel):
+    total_rows: int
+    enrolled: int = Field(..., description="Всего новых записей на курс")
+    rows: List[RosterRowReport]
+
+
 # COURSE CATALOG (КАТАЛОГ КУРСОВ)
 
 class CourseCardResponse(BaseModel):
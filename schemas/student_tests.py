@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from core.config import settings
 from models.Enums import QuestionType
 
 
@@ -49,6 +50,7 @@ class TestAttemptResponse(BaseModel):
     attempt_number: int
     started_at: datetime
     finished_at: Optional[datetime]
+    deadline_at: Optional[datetime] = None
     blocked_until: Optional[datetime]
     current_question_id: Optional[int]
 
@@ -71,7 +73,9 @@ class QuestionAttemptResponse(BaseModel):
     id: int
     test_attempt_id: int
     question_id: int
-    answer: Optional[Dict[str, Any]]
+    answer: Optional[Dict[str, Any]] = Field(
+        None, validation_alias=AliasChoices("answer_data", "answer")
+    )
     is_correct: Optional[bool]
     hint_used: bool
     attempt_number: int
@@ -80,6 +84,23 @@ class QuestionAttemptResponse(BaseModel):
         from_attributes = True
 
 
+class SubmitAnswersBatchRequest(BaseModel):
+    answers: List[SubmitAnswerRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_ANSWERS_PER_BATCH,
+        description="Ответы на несколько вопросов попытки"
+    )
+
+
+class SubmitAnswersBatchResponse(BaseModel):
+    answers: List[QuestionAttemptResponse] = []
+    skipped_question_ids: List[int] = Field(
+        default=[],
+        description="Вопросы, на которые уже был дан ответ"
+    )
+
+
 # TEST RESULTS (РЕЗУЛЬТАТЫ)
 
 class QuestionResult(BaseModel):
@@ -134,6 +155,7 @@ class TestAttemptWithBlockResponse(BaseModel):
     attempt_number: int
     started_at: datetime
     finished_at: Optional[datetime]
+    deadline_at: Optional[datetime] = None
     blocked_until: Optional[datetime]
     current_question_id: Optional[int]
 
@@ -88,3 +88,56 @@ class TestWithQuestionsResponse(TestResponse):
 class AnswerOptionUpdate(BaseModel):
     content: Optional[str] = Field(None, min_length=1)
     is_correct: Optional[bool] = None
+
+
+class AnswerOptionDocument(BaseModel):
+    id: Optional[int] = Field(None, description="id существующего варианта; без id - новый вариант")
+    content: str = Field(..., min_length=1)
+    is_correct: bool
+
+
+class QuestionDocument(BaseModel):
+    id: Optional[int] = Field(None, description="id существующего вопроса; без id - новый вопрос")
+    text: str = Field(..., min_length=1)
+    type: QuestionType
+    position: int = Field(..., ge=1, description="Позиция вопроса в тесте")
+    hint_text: Optional[str] = None
+    options: List[AnswerOptionDocument] = []
+
+
+class TestDocumentRequest(BaseModel):
+    """Тест целиком: вопросы и варианты, которых нет в документе, удаляются"""
+    title: str = Field(..., min_length=1, max_length=255)
+    time_limit_seconds: Optional[int] = Field(None, ge=60, description="Лимит времени в секундах")
+    pass_threshold: int = Field(..., ge=0, le=100, description="Проходной балл в процентах")
+    status: str = Field(default="draft", description="Статус теста: draft, published")
+    questions: List[QuestionDocument] = Field(..., min_length=1)
+
+
+class OptionAnalytics(BaseModel):
+    option_id: int
+    content: str
+    is_correct: bool
+    selected_count: int
+    selection_rate: Optional[float] = Field(None, description="Доля ответов, в которых выбран вариант")
+
+
+class QuestionAnalytics(BaseModel):
+    question_id: int
+    text: str
+    type: QuestionType
+    position: int
+    answers_count: int
+    p_value: Optional[float] = Field(None, description="Средний балл за вопрос (трудность)")
+    correct_rate: Optional[float] = Field(None, description="Доля полностью правильных ответов")
+    discrimination: Optional[float] = Field(
+        None, description="Корреляция балла за вопрос с итоговым баллом попытки"
+    )
+    hint_rate: Optional[float] = Field(None, description="Доля ответов с подсказкой")
+    options: List[OptionAnalytics] = []
+
+
+class TestAnalyticsResponse(BaseModel):
+    test_id: int
+    title: str
+    questions: List[QuestionAnalytics] = []
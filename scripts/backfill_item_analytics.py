@@ -0,0 +1,45 @@
+"""
+Пересборка счётчиков аналитики вопросов по истории попыток.
+
+Каждый тест пересобирается rebuild_test_analytics в отдельной транзакции
+под исключительной блокировкой, поэтому параллельно завершаемые попытки
+не теряются и не считаются дважды.
+
+Запуск:
+    python -m scripts.backfill_item_analytics [--test-id 42] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+from sqlalchemy import select
+from core.database import AsyncSessionLocal, engine
+from models import Test
+from service.item_analytics_service import rebuild_test_analytics
+
+
+async def backfill(test_id: int | None, batch_size: int) -> None:
+    async with AsyncSessionLocal() as db:
+        if test_id is not None:
+            test_ids = [test_id]
+        else:
+            test_ids = (await db.execute(select(Test.id).order_by(Test.id))).scalars().all()
+
+        for processed, current_test_id in enumerate(test_ids, 1):
+            await rebuild_test_analytics(current_test_id, batch_size, db)
+            await db.commit()
+            print(f"📈 Rebuilt test {current_test_id} ({processed}/{len(test_ids)})")
+
+    await engine.dispose()
+    print(f"✅ Item analytics rebuilt for {len(test_ids)} tests")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--test-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.test_id, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
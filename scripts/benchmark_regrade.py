@@ -0,0 +1,86 @@
+"""
+Бенчмарк пересчёта ответов: поштучный calculate_question_score
+против векторизованного score_answers_vectorized.
+
+Запуск:
+    python -m scripts.benchmark_regrade --attempts 100000 --questions 10
+"""
+import argparse
+import random
+import time
+import numpy as np
+from helpers.test_snapshot import QuestionSnapshot, OptionSnapshot
+from helpers.regrade_helper import QuestionMasks, score_answers_vectorized, attempt_scores
+from models.Enums import QuestionType
+from service.student_test_service import calculate_question_score
+
+
+def build_questions(count: int, options_per_question: int) -> list[QuestionSnapshot]:
+    questions = []
+    option_id = 1
+    for i in range(count):
+        question_type = QuestionType.single if i % 2 == 0 else QuestionType.multiple
+        options = []
+        for j in range(options_per_question):
+            is_correct = j == 0 if question_type == QuestionType.single else j % 2 == 0
+            options.append(OptionSnapshot(id=option_id, content=f"option {option_id}", is_correct=is_correct))
+            option_id += 1
+        questions.append(QuestionSnapshot(
+            id=i + 1, text=f"question {i + 1}", type=question_type,
+            position=i + 1, hint_text=None, options=tuple(options),
+            correct_ids=frozenset(o.id for o in options if o.is_correct)
+        ))
+    return questions
+
+
+def build_answers(questions: list[QuestionSnapshot], attempts: int, seed: int):
+    rng = random.Random(seed)
+    attempt_index = []
+    question_ids = []
+    selected = []
+    for attempt in range(attempts):
+        for question in questions:
+            option_ids = [o.id for o in question.options]
+            k = 1 if question.type == QuestionType.single else rng.randint(0, len(option_ids))
+            attempt_index.append(attempt)
+            question_ids.append(question.id)
+            selected.append(rng.sample(option_ids, k))
+    return np.array(attempt_index, dtype=np.int64), question_ids, selected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    questions = build_questions(args.questions, args.options)
+    by_id = {q.id: q for q in questions}
+    attempt_index, question_ids, selected = build_answers(questions, args.attempts, args.seed)
+    print(f"📊 {args.attempts} attempts, {len(question_ids)} answers")
+
+    started = time.perf_counter()
+    scalar = [calculate_question_score(by_id[q_id], ids) for q_id, ids in zip(question_ids, selected)]
+    scalar_correct = np.array([s[0] for s in scalar], dtype=bool)
+    scalar_score = np.array([s[1] for s in scalar], dtype=np.float64)
+    scalar_totals = attempt_scores(attempt_index, scalar_score, args.attempts, len(questions))
+    scalar_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    masks = QuestionMasks(questions)
+    is_correct, partial_score = score_answers_vectorized(masks, question_ids, selected)
+    totals = attempt_scores(attempt_index, partial_score, args.attempts, len(questions))
+    vector_time = time.perf_counter() - started
+
+    assert np.array_equal(scalar_correct, is_correct), "is_correct mismatch"
+    assert np.allclose(scalar_score, partial_score), "partial_score mismatch"
+    assert np.array_equal(scalar_totals, totals), "attempt score mismatch"
+
+    print(f"🐢 Scalar:     {scalar_time:.3f}s")
+    print(f"🚀 Vectorized: {vector_time:.3f}s ({scalar_time / vector_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
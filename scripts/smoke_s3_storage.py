@@ -0,0 +1,92 @@
+"""
+Проверка S3BlobStore на живом хранилище (MinIO из docker-compose):
+multipart-загрузка, размер, ranged-чтение, local_copy, подписанная
+ссылка с Range и удаление. Объект пишется во временный ключ и удаляется.
+
+Запуск (MinIO: docker compose up -d minio):
+    python -m scripts.smoke_s3_storage [--endpoint http://localhost:9000] [--bucket uploads] [--size-mb 9]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import httpx
+from core.config import settings
+from helpers.files.blob_store import S3BlobStore, blob_key
+
+
+def write_sample(size: int) -> tuple[str, bytes]:
+    data = os.urandom(size)
+    fd, path = tempfile.mkstemp(suffix=".part")
+    with os.fdopen(fd, "wb") as target:
+        target.write(data)
+    return path, data
+
+
+async def smoke(size: int) -> None:
+    store = S3BlobStore()
+    await store.prepare()
+    print(f"🪣 Bucket {settings.S3_BUCKET} at {settings.S3_ENDPOINT_URL or 'AWS'}")
+
+    temp_path, data = write_sample(size)
+    locator = store.locator(blob_key(hashlib.sha256(data).hexdigest(), ".bin"))
+    try:
+        await store.put(temp_path, locator)
+        assert not os.path.exists(temp_path), "put must take the temp file"
+        assert await store.size(locator) == size, "size mismatch"
+        print(f"⬆️ put {size} bytes in {-(-size // settings.STORAGE_PART_SIZE)} parts: {locator}")
+
+        # Диапазон через границу частей multipart-загрузки
+        start = max(0, settings.STORAGE_PART_SIZE - 100)
+        length = min(200, size - start)
+        assert await store.read_range(locator, start, length) == data[start:start + length], "read_range mismatch"
+        print(f"📖 read_range {start}+{length} ok")
+
+        async with store.local_copy(locator, suffix=".bin") as path:
+            with open(path, "rb") as copy:
+                assert copy.read() == data, "local_copy mismatch"
+        print("📥 local_copy ok")
+
+        url = store.presigned_url(locator, 60, "smoke тест.bin", "application/octet-stream")
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206, f"presigned GET returned {response.status_code}"
+        assert response.content == data[10:20], "presigned range mismatch"
+        print("🔗 presigned_url with Range ok")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        deleted = await store.delete(locator)
+
+    assert deleted, "delete must report the removed object"
+    assert not await store.delete(locator), "second delete must report a missing object"
+    try:
+        await store.size(locator)
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("object still exists after delete")
+    print("🗑️ delete ok")
+    print("✅ S3 storage smoke test passed")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=None, help="по умолчанию S3_ENDPOINT_URL или локальный MinIO")
+    parser.add_argument("--bucket", default=None, help="по умолчанию S3_BUCKET")
+    parser.add_argument("--size-mb", type=int, default=9, help="больше STORAGE_PART_SIZE - несколько частей")
+    args = parser.parse_args()
+
+    settings.S3_ENDPOINT_URL = args.endpoint or settings.S3_ENDPOINT_URL or "http://localhost:9000"
+    if args.bucket:
+        settings.S3_BUCKET = args.bucket
+    # Учётные данные MinIO из docker-compose по умолчанию
+    settings.S3_ACCESS_KEY = settings.S3_ACCESS_KEY or "minioadmin"
+    settings.S3_SECRET_KEY = settings.S3_SECRET_KEY or "minioadmin"
+
+    asyncio.run(smoke(args.size_mb * 1024 * 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, delete, func, or_
 from fastapi import HTTPException, status
 from typing import Optional
-from models import User, Role, Course, CourseEnrollment, CourseApplication
+from models import (
+    User, Role, Course, Module, Material, MaterialFile,
+    CourseEnrollment, CourseApplication
+)
 from models.Enums import RoleType
 from core.security import get_password_hash
+from service.file_service import release_file_refs
+from service.funnel_service import user_funnel_materials, rebuild_material_funnel
 from schemas.admin import (
     CreateUserRequest, UpdateUserRequest,
     StatisticsResponse
@@ -136,7 +141,22 @@ async def delete_user(user_id: int, current_admin: User, db: AsyncSession):
 
     user = await get_user_by_id(user_id, db)
 
+    # courses.creator_id - SET NULL, созданные курсы удаляются явно
+    await release_file_refs(
+        MaterialFile.material_id.in_(
+            select(Material.id)
+            .join(Module, Material.module_id == Module.id)
+            .join(Course, Module.course_id == Course.id)
+            .where(Course.creator_id == user.id)
+        ),
+        db
+    )
+    funnel_material_ids = await user_funnel_materials(user.id, db)
+    await db.execute(delete(Course).where(Course.creator_id == user.id))
     await db.delete(user)
+    await db.flush()
+    # Прогресс и попытки удалены каскадом - счётчики воронки пересчитываются
+    await rebuild_material_funnel(funnel_material_ids, db)
     await db.commit()
 
 
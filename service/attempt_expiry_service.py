@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, func, case, cast, Float
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models import Test, Question, TestAttempt, QuestionAttempt, TestAttemptSummary
+from service.item_analytics_service import record_attempt_analytics, lock_test_analytics
+from service.funnel_service import record_material_passes
+
+
+async def update_summaries_for_expired(attempt_ids: list[int], db: AsyncSession) -> None:
+    """Перенос результатов завершённых попыток в test_attempt_summary"""
+    await db.execute(
+        update(TestAttemptSummary)
+        .where(
+            and_(
+                TestAttempt.id.in_(attempt_ids),
+                TestAttemptSummary.user_id == TestAttempt.user_id,
+                TestAttemptSummary.test_id == TestAttempt.test_id
+            )
+        )
+        .values(
+            fail_streak=case(
+                (TestAttempt.passed.is_(True), 0),
+                else_=TestAttemptSummary.fail_streak + 1
+            ),
+            blocked_until=TestAttempt.blocked_until,
+            best_score=func.greatest(TestAttemptSummary.best_score, TestAttempt.score),
+            active_attempt_id=case(
+                (TestAttemptSummary.active_attempt_id == TestAttempt.id, None),
+                else_=TestAttemptSummary.active_attempt_id
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def expire_overdue_attempts(
+        db: AsyncSession,
+        now: Optional[datetime] = None,
+        batch_size: Optional[int] = None
+) -> int:
+    """
+    Завершение просроченных попыток одним UPDATE.
+
+    Просроченные попытки ищутся по частичному индексу на deadline_at,
+    неотвеченные вопросы считаются как 0 баллов. Строки, заблокированные
+    другим воркером или finish_test_attempt, пропускаются.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.ATTEMPT_EXPIRY_BATCH_SIZE
+
+    expired = (
+        select(
+            TestAttempt.id, TestAttempt.test_id,
+            TestAttempt.user_id, TestAttempt.attempt_number
+        )
+        .where(
+            and_(
+                TestAttempt.finished_at.is_(None),
+                TestAttempt.deadline_at < now
+            )
+        )
+        .order_by(TestAttempt.deadline_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("expired")
+    )
+    answered = (
+        select(
+            QuestionAttempt.test_attempt_id.label("attempt_id"),
+            func.sum(cast(QuestionAttempt.partial_score, Float)).label("total_score")
+        )
+        .where(QuestionAttempt.test_attempt_id.in_(select(expired.c.id)))
+        .group_by(QuestionAttempt.test_attempt_id)
+        .cte("answered")
+    )
+    question_counts = (
+        select(
+            Question.test_id,
+            func.count(Question.id).label("total_questions")
+        )
+        .where(Question.test_id.in_(select(expired.c.test_id)))
+        .group_by(Question.test_id)
+        .cte("question_counts")
+    )
+    # Правило round_score (половины вверх), как в finish_test_attempt и regrade:
+    # у round() в PostgreSQL округление половин зависит от типа аргумента
+    score = case(
+        (
+            question_counts.c.total_questions > 0,
+            func.floor(
+                func.coalesce(answered.c.total_score, 0.0)
+                / question_counts.c.total_questions * 100 + 0.5
+            )
+        ),
+        else_=0
+    )
+    scores = (
+        select(
+            expired.c.id,
+            score.label("score"),
+            Test.pass_threshold,
+            TestAttemptSummary.fail_streak
+        )
+        .select_from(expired)
+        .join(Test, Test.id == expired.c.test_id)
+        .outerjoin(answered, answered.c.attempt_id == expired.c.id)
+        .outerjoin(question_counts, question_counts.c.test_id == expired.c.test_id)
+        .outerjoin(
+            TestAttemptSummary,
+            and_(
+                TestAttemptSummary.user_id == expired.c.user_id,
+                TestAttemptSummary.test_id == expired.c.test_id
+            )
+        )
+        .subquery("scores")
+    )
+
+    failed = scores.c.score < scores.c.pass_threshold
+    result = await db.execute(
+        update(TestAttempt)
+        .where(TestAttempt.id == scores.c.id)
+        .values(
+            finished_at=now,
+            score=scores.c.score,
+            passed=~failed,
+            blocked_until=case(
+                (and_(failed, scores.c.fail_streak >= 1), now + timedelta(minutes=5)),
+                else_=None
+            )
+        )
+        .returning(TestAttempt.id, TestAttempt.test_id)
+        .execution_options(synchronize_session=False)
+    )
+    expired_rows = result.all()
+    expired_ids = [attempt_id for attempt_id, _ in expired_rows]
+    if expired_ids:
+        await lock_test_analytics([test_id for _, test_id in expired_rows], db)
+        await update_summaries_for_expired(expired_ids, db)
+        await record_attempt_analytics(expired_ids, db)
+        await record_material_passes(expired_ids, db)
+    await db.commit()
+
+    if expired_ids:
+        print(f"⏰ Expired {len(expired_ids)} timed-out test attempt(s)")
+
+    return len(expired_ids)
+
+
+async def run_attempt_expiry():
+    batch_size = settings.ATTEMPT_EXPIRY_BATCH_SIZE
+    async with AsyncSessionLocal() as db:
+        while await expire_overdue_attempts(db, batch_size=batch_size) >= batch_size:
+            pass
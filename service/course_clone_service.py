@@ -0,0 +1,238 @@
+from typing import Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    select, insert, func, literal, or_,
+    MetaData, Table, Column, Integer
+)
+from sqlalchemy.orm import selectinload
+from sqlalchemy.schema import CreateTable
+from core.database import AsyncSessionLocal
+from models import (
+    User, Course, Module, Material, MaterialFile,
+    Test, Question, AnswerOption
+)
+from service.course_service import check_course_access
+from service.file_service import add_file_refs
+
+ProgressCallback = Callable[[int], Awaitable[None]]
+
+# Временные таблицы соответствия старых и новых id, живут до конца транзакции
+clone_metadata = MetaData()
+
+
+def id_map_table(name: str) -> Table:
+    return Table(
+        name, clone_metadata,
+        Column("old_id", Integer, primary_key=True, autoincrement=False),
+        Column("new_id", Integer, nullable=False),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP"
+    )
+
+
+module_map = id_map_table("clone_module_map")
+material_map = id_map_table("clone_material_map")
+test_map = id_map_table("clone_test_map")
+question_map = id_map_table("clone_question_map")
+
+CLONE_STEPS = 7
+
+
+async def allocate_ids(id_map: Table, source: Table, where, db: AsyncSession) -> int:
+    """Выдача новых id из последовательности исходной таблицы одним INSERT ... SELECT"""
+    await db.execute(CreateTable(id_map))
+    result = await db.execute(
+        insert(id_map).from_select(
+            ["old_id", "new_id"],
+            select(
+                source.c.id,
+                func.nextval(func.pg_get_serial_sequence(source.name, "id"))
+            ).where(where)
+        )
+    )
+    return result.rowcount
+
+
+async def clone_course(
+        source_course_id: int, title: Optional[str],
+        user: User, db: AsyncSession,
+        progress: Optional[ProgressCallback] = None
+) -> dict:
+    """
+    Глубокое копирование курса: модули, материалы, привязки файлов,
+    тесты, вопросы и варианты ответов.
+
+    Каждый уровень копируется одним INSERT ... SELECT, новые id
+    заранее берутся из последовательностей во временные таблицы.
+    Всё выполняется в одной транзакции, коммит - на вызывающем.
+    """
+    async def report(step: int):
+        if progress:
+            await progress(step * 100 // CLONE_STEPS)
+
+    new_course_id = (await db.execute(
+        insert(Course)
+        .from_select(
+            ["title", "description", "img_url", "creator_id"],
+            select(
+                literal(title) if title else Course.title,
+                Course.description,
+                Course.img_url,
+                literal(user.id)
+            ).where(Course.id == source_course_id)
+        )
+        .returning(Course.id)
+    )).scalar_one()
+    await report(1)
+
+    modules_count = await allocate_ids(
+        module_map, Module.__table__,
+        Module.course_id == source_course_id, db
+    )
+    await db.execute(
+        insert(Module).from_select(
+            ["id", "title", "position", "course_id"],
+            select(
+                module_map.c.new_id, Module.title,
+                Module.position, literal(new_course_id)
+            ).join(module_map, module_map.c.old_id == Module.id)
+        )
+    )
+    await report(2)
+
+    materials_count = await allocate_ids(
+        material_map, Material.__table__,
+        Material.module_id.in_(select(module_map.c.old_id)), db
+    )
+    await db.execute(
+        insert(Material).from_select(
+            [
+                "id", "module_id", "type", "title", "content_url",
+                "text_content", "transcript", "position"
+            ],
+            select(
+                material_map.c.new_id, module_map.c.new_id,
+                Material.type, Material.title, Material.content_url,
+                Material.text_content, Material.transcript, Material.position
+            )
+            .join(material_map, material_map.c.old_id == Material.id)
+            .join(module_map, module_map.c.old_id == Material.module_id)
+        )
+    )
+    await report(3)
+
+    # Файлы не копируются - новые материалы ссылаются на те же File
+    files_result = await db.execute(
+        insert(MaterialFile).from_select(
+            ["material_id", "file_id"],
+            select(material_map.c.new_id, MaterialFile.file_id)
+            .join(material_map, material_map.c.old_id == MaterialFile.material_id)
+        )
+    )
+    await add_file_refs(
+        MaterialFile.material_id.in_(select(material_map.c.new_id)), db
+    )
+    await report(4)
+
+    tests_count = await allocate_ids(
+        test_map, Test.__table__,
+        or_(
+            Test.material_id.in_(select(material_map.c.old_id)),
+            Test.module_id.in_(select(module_map.c.old_id))
+        ),
+        db
+    )
+    await db.execute(
+        insert(Test).from_select(
+            [
+                "id", "title", "num_questions", "time_limit_seconds",
+                "pass_threshold", "status", "generated_by_nn",
+                "created_by", "module_id", "material_id"
+            ],
+            select(
+                test_map.c.new_id, Test.title, Test.num_questions,
+                Test.time_limit_seconds, Test.pass_threshold, Test.status,
+                Test.generated_by_nn, literal(user.id),
+                module_map.c.new_id, material_map.c.new_id
+            )
+            .join(test_map, test_map.c.old_id == Test.id)
+            .outerjoin(module_map, module_map.c.old_id == Test.module_id)
+            .outerjoin(material_map, material_map.c.old_id == Test.material_id)
+        )
+    )
+    await report(5)
+
+    questions_count = await allocate_ids(
+        question_map, Question.__table__,
+        Question.test_id.in_(select(test_map.c.old_id)), db
+    )
+    await db.execute(
+        insert(Question).from_select(
+            [
+                "id", "test_id", "text", "type",
+                "position", "hint_text", "correct_answers"
+            ],
+            select(
+                question_map.c.new_id, test_map.c.new_id,
+                Question.text, Question.type, Question.position,
+                Question.hint_text, Question.correct_answers
+            )
+            .join(question_map, question_map.c.old_id == Question.id)
+            .join(test_map, test_map.c.old_id == Question.test_id)
+        )
+    )
+    await report(6)
+
+    options_result = await db.execute(
+        insert(AnswerOption).from_select(
+            ["question_id", "content", "is_correct"],
+            select(question_map.c.new_id, AnswerOption.content, AnswerOption.is_correct)
+            .join(question_map, question_map.c.old_id == AnswerOption.question_id)
+        )
+    )
+    await report(7)
+
+    return {
+        "course_id": new_course_id,
+        "modules": modules_count,
+        "materials": materials_count,
+        "material_files": files_result.rowcount,
+        "tests": tests_count,
+        "questions": questions_count,
+        "answer_options": options_result.rowcount
+    }
+
+
+async def clone_course_for_teacher(
+        course_id: int, title: Optional[str],
+        user: User, db: AsyncSession
+) -> Course:
+    await check_course_access(course_id, user, db)
+    cloned = await clone_course(course_id, title, user, db)
+    await db.commit()
+
+    result = await db.execute(
+        select(Course)
+        .options(selectinload(Course.creator))
+        .where(Course.id == cloned["course_id"])
+    )
+    return result.scalar_one()
+
+
+async def run_clone_course_job(payload: dict, progress: ProgressCallback) -> dict:
+    # job_service импортирует обработчики задач, поэтому импорт здесь
+    from service.job_service import JobFailed
+
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, payload["user_id"])
+        if user is None:
+            raise JobFailed(f"User {payload['user_id']} was deleted before the course was cloned")
+        if await db.get(Course, payload["course_id"]) is None:
+            raise JobFailed(f"Course {payload['course_id']} was deleted before it was cloned")
+        cloned = await clone_course(
+            payload["course_id"], payload.get("title"),
+            user, db, progress=progress
+        )
+        await db.commit()
+
+    return cloned
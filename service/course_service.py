@@ -1,6 +1,8 @@
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from typing import List
+from sqlalchemy import select, update, and_, values, column, literal, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 from models import (
@@ -11,8 +13,11 @@ from models import (
 from models.Enums import RoleType, ApplicationStatus
 from schemas.course import (
     CourseCreateRequest, CourseUpdateRequest, ModuleCreateRequest,
-    ModuleUpdateRequest
+    ModuleUpdateRequest, PositionItem, ReorderRequest
 )
+from schemas.student import BulkApplicationReviewRequest
+from helpers.test_snapshot import clear_test_snapshots
+from service.file_service import release_file_refs
 
 
 async def check_course_access(
@@ -103,7 +108,6 @@ async def get_course_detail(course_id: int, user: User, db: AsyncSession):
         .where(Course.id == course_id)
     )
     course = result.scalar_one()
-    course.modules.sort(key=lambda m: m.position)
 
     return course
 
@@ -129,8 +133,17 @@ async def update_course(
 
 async def delete_course(course_id: int, user: User, db: AsyncSession):
     course = await check_course_access(course_id, user, db, require_creator=True)
+    await release_file_refs(
+        MaterialFile.material_id.in_(
+            select(Material.id)
+            .join(Module, Material.module_id == Module.id)
+            .where(Module.course_id == course_id)
+        ),
+        db
+    )
     await db.delete(course)
     await db.commit()
+    clear_test_snapshots()
 
 
 async def create_module(
@@ -172,7 +185,6 @@ async def get_module_detail(
             detail="Module not found in this course"
         )
 
-    module.materials.sort(key=lambda mat: mat.position)
     for material in module.materials:
         material.files = material.material_files
 
@@ -208,6 +220,56 @@ async def update_module(
     return module
 
 
+async def apply_positions(
+        model, items: List[PositionItem],
+        scope, db: AsyncSession
+) -> int:
+    """
+    Новые позиции одним UPDATE ... FROM (VALUES ...).
+    Возвращает количество обновлённых строк в пределах scope.
+    """
+    ids = [item.id for item in items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each item can appear in the ordering only once"
+        )
+
+    positions = values(
+        column("id", Integer),
+        column("position", Integer),
+        name="positions"
+    ).data([(item.id, item.position) for item in items])
+    result = await db.execute(
+        update(model)
+        .where(and_(model.id == positions.c.id, scope))
+        .values(position=positions.c.position)
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    return len(result.all())
+
+
+async def reorder_modules(
+        course_id: int, data: ReorderRequest,
+        user: User, db: AsyncSession
+):
+    await check_course_access(course_id, user, db)
+    updated = await apply_positions(
+        Module, data.items, Module.course_id == course_id, db
+    )
+    if updated != len(data.items):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Module not found in this course"
+        )
+
+    await db.commit()
+
+    return await get_course_detail(course_id, user, db)
+
+
 async def delete_module(
         course_id: int, module_id: int,
         user: User, db: AsyncSession
@@ -225,8 +287,15 @@ async def delete_module(
             detail="Module not found in this course"
         )
 
+    await release_file_refs(
+        MaterialFile.material_id.in_(
+            select(Material.id).where(Material.module_id == module_id)
+        ),
+        db
+    )
     await db.delete(module)
     await db.commit()
+    clear_test_snapshots()
 
 
 async def add_editor(
@@ -451,3 +520,75 @@ async def reject_application(application_id: int, user: User, db: AsyncSession):
         "reviewed_at": application_loaded.reviewed_at,
         "reviewed_by": application_loaded.reviewer
     }
+
+
+async def review_applications(
+        course_id: int, data: BulkApplicationReviewRequest,
+        new_status: ApplicationStatus,
+        user: User, db: AsyncSession
+) -> dict:
+    """
+    Массовое одобрение или отклонение ожидающих заявок курса по списку id
+    и/или группе студентов. Статусы меняются одним UPDATE, записи на курс
+    создаются одним INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    """
+    if data.application_ids is None and data.group_name is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify application_ids or group_name"
+        )
+
+    await check_course_access(course_id, user, db, require_creator=False)
+
+    conditions = [
+        CourseApplication.course_id == course_id,
+        CourseApplication.status == ApplicationStatus.pending
+    ]
+    if data.application_ids is not None:
+        conditions.append(CourseApplication.id.in_(data.application_ids))
+    if data.group_name is not None:
+        conditions.append(
+            CourseApplication.user_id.in_(
+                select(User.id).where(User.group_name == data.group_name)
+            )
+        )
+
+    result = await db.execute(
+        update(CourseApplication)
+        .where(and_(*conditions))
+        .values(
+            status=new_status,
+            reviewed_at=datetime.utcnow(),
+            reviewed_by=user.id
+        )
+        .returning(CourseApplication.id)
+        .execution_options(synchronize_session=False)
+    )
+    reviewed_ids = sorted(result.scalars().all())
+
+    enrolled = 0
+    if new_status == ApplicationStatus.approved and reviewed_ids:
+        enrollment_result = await db.execute(
+            pg_insert(CourseEnrollment)
+            .from_select(
+                ["user_id", "course_id"],
+                select(CourseApplication.user_id, literal(course_id))
+                .where(CourseApplication.id.in_(reviewed_ids))
+            )
+            .on_conflict_do_nothing(
+                index_elements=[CourseEnrollment.user_id, CourseEnrollment.course_id]
+            )
+        )
+        enrolled = enrollment_result.rowcount
+
+    await db.commit()
+
+    reviewed = set(reviewed_ids)
+    return {
+        "reviewed_ids": reviewed_ids,
+        "skipped_ids": [
+            application_id for application_id in data.application_ids or []
+            if application_id not in reviewed
+        ],
+        "enrolled": enrolled
+    }
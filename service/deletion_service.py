@@ -0,0 +1,119 @@
+from typing import Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, or_
+from core.config import settings
+from core.database import AsyncSessionLocal
+from helpers.test_snapshot import clear_test_snapshots
+from models import (
+    User, Course, Module, Material, MaterialFile,
+    Test, TestAttempt, QuestionAttempt
+)
+from service.file_service import release_file_refs
+from service.funnel_service import user_funnel_materials, rebuild_material_funnel
+
+ProgressCallback = Callable[[int], Awaitable[None]]
+
+
+async def delete_in_batches(
+        model, where, db: AsyncSession,
+        batch_size: Optional[int] = None
+) -> int:
+    """
+    Удаление строк пачками DELETE ... WHERE id IN (SELECT ... LIMIT n)
+    с коммитом после каждой пачки, чтобы не держать длинные блокировки.
+    """
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    deleted = 0
+
+    while True:
+        result = await db.execute(
+            delete(model)
+            .where(model.id.in_(select(model.id).where(where).limit(batch_size)))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+async def delete_attempts_in_batches(where, db: AsyncSession) -> dict:
+    """Самые объёмные таблицы - ответы и попытки - чистятся пачками заранее"""
+    answers = await delete_in_batches(
+        QuestionAttempt,
+        QuestionAttempt.test_attempt_id.in_(select(TestAttempt.id).where(where)),
+        db
+    )
+    attempts = await delete_in_batches(TestAttempt, where, db)
+
+    return {"test_attempts": attempts, "question_attempts": answers}
+
+
+async def purge_course(
+        course_id: int, db: AsyncSession,
+        progress: Optional[ProgressCallback] = None
+) -> dict:
+    """
+    Удаление большого курса: сначала пачками попытки и ответы,
+    затем сам курс - остальное удаляет ON DELETE CASCADE в БД.
+    """
+    course_modules = select(Module.id).where(Module.course_id == course_id)
+    course_tests = select(Test.id).where(
+        or_(
+            Test.module_id.in_(course_modules),
+            Test.material_id.in_(
+                select(Material.id).where(Material.module_id.in_(course_modules))
+            )
+        )
+    )
+    deleted = await delete_attempts_in_batches(TestAttempt.test_id.in_(course_tests), db)
+    if progress:
+        await progress(50)
+
+    await release_file_refs(
+        MaterialFile.material_id.in_(
+            select(Material.id).where(Material.module_id.in_(course_modules))
+        ),
+        db
+    )
+    await db.execute(delete(Course).where(Course.id == course_id))
+    await db.commit()
+    clear_test_snapshots()
+
+    return {"course_id": course_id, **deleted}
+
+
+async def purge_user(
+        user_id: int, db: AsyncSession,
+        progress: Optional[ProgressCallback] = None
+) -> dict:
+    """Удаление пользователя вместе с созданными им курсами и всей историей попыток"""
+    result = await db.execute(select(Course.id).where(Course.creator_id == user_id))
+    course_ids = result.scalars().all()
+    funnel_material_ids = await user_funnel_materials(user_id, db)
+    steps = len(course_ids) + 2
+
+    for step, course_id in enumerate(course_ids, start=1):
+        await purge_course(course_id, db)
+        if progress:
+            await progress(step * 100 // steps)
+
+    deleted = await delete_attempts_in_batches(TestAttempt.user_id == user_id, db)
+    if progress:
+        await progress((steps - 1) * 100 // steps)
+
+    await db.execute(delete(User).where(User.id == user_id))
+    await rebuild_material_funnel(funnel_material_ids, db)
+    await db.commit()
+
+    return {"user_id": user_id, "courses": len(course_ids), **deleted}
+
+
+async def run_delete_course_job(payload: dict, progress: ProgressCallback) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await purge_course(payload["course_id"], db, progress=progress)
+
+
+async def run_delete_user_job(payload: dict, progress: ProgressCallback) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await purge_user(payload["user_id"], db, progress=progress)
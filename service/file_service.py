@@ -1,89 +1,169 @@
 import os
 import hashlib
-import aiofiles
+import tempfile
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, and_, func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import UploadFile, HTTPException, status
-from typing import List
-from models import File, MaterialFile, Material
+from fastapi.concurrency import run_in_threadpool
+from typing import BinaryIO, List, Optional, Tuple
+from models import File, MaterialFile, Material, FileExtraction
 from core.config import settings
+from core.database import AsyncSessionLocal
+from helpers.files.blob_store import blob_key, storage
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-def get_file_hash(content: bytes):
-    return hashlib.sha256(content).hexdigest()
 
-
-def get_unique_filename(original_filename: str, file_hash: str):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    ext = Path(original_filename).suffix
-    return f"{timestamp}_{file_hash[:16]}{ext}"
+async def validate_file(file: UploadFile):
+    validate_extension(file.filename)
 
 
-async def validate_file(file: UploadFile):
-    ext = Path(file.filename).suffix.lower()
+def validate_extension(filename: str):
+    ext = Path(filename).suffix.lower()
     if ext not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File extension {ext} is not allowed. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
 
+
+
+def write_to_temp_file(source: BinaryIO, temp_dir: Path) -> Tuple[str, str, int]:
+    """
+    Копирование загрузки во временный файл кусками: SHA-256 и размер
+    считаются по ходу, превышение MAX_FILE_SIZE обрывает запись.
+    Возвращает (путь к временному файлу, хеш, размер).
+    """
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=".part")
+    hasher = hashlib.sha256()
     file_size = 0
-    chunk_size = 1024 * 1024
-
-    await file.seek(0)
-    while chunk := await file.read(chunk_size):
-        file_size += len(chunk)
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE / (1024 * 1024)} MB"
-            )
 
-    await file.seek(0)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            source.seek(0)
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE / (1024 * 1024)} MB"
+                    )
+                hasher.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return temp_path, hasher.hexdigest(), file_size
 
 
 async def save_file(file: UploadFile, db: AsyncSession) -> File:
     await validate_file(file)
 
-    content = await file.read()
-    await file.seek(0)
+    # Чтение, хеширование и запись - в пуле потоков, event loop не блокируется
+    temp_path, file_hash, file_size = await run_in_threadpool(
+        write_to_temp_file, file.file, Path(settings.UPLOAD_TEMP_DIR)
+    )
+
+    return await store_uploaded_file(
+        temp_path, file_hash, file_size,
+        file.filename, file.content_type, db
+    )
+
+
+async def reuse_existing_file(existing_file: File, db: AsyncSession) -> File:
+    if existing_file.ref_count <= 0:
+        # Повторная загрузка продлевает срок до сборки мусора
+        existing_file.unreferenced_at = datetime.utcnow()
+        await db.commit()
+        await db.refresh(existing_file)
+    return existing_file
 
-    file_hash = get_file_hash(content)
 
+async def find_file_by_hash(
+        file_hash: str, file_size: int,
+        filename: str, db: AsyncSession
+) -> Optional[File]:
+    """
+    Поиск уже загруженного файла до передачи тела: клиент считает SHA-256
+    сам и при совпадении хеша и размера пропускает загрузку.
+    """
+    validate_extension(filename)
     result = await db.execute(
-        select(File).where(File.file_hash == file_hash)
+        select(File).where(
+            and_(
+                File.file_hash == file_hash.lower(),
+                File.file_size == file_size
+            )
+        )
     )
-    existing_file = result.scalar_one_or_none()
-
+    existing_file = result.scalars().first()
     if existing_file:
-        return existing_file
+        return await reuse_existing_file(existing_file, db)
+    return None
 
-    upload_path = Path(settings.UPLOAD_DIR)
-    upload_path.mkdir(parents=True, exist_ok=True)
 
-    unique_filename = get_unique_filename(file.filename, file_hash)
-    file_path = upload_path / unique_filename
+async def store_uploaded_file(
+        temp_path: str, file_hash: str, file_size: int,
+        original_filename: str, content_type: Optional[str],
+        db: AsyncSession
+) -> File:
+    """
+    Сохранение полностью принятого временного файла: при совпадении хеша
+    возвращается существующий File, иначе блоб уходит в хранилище.
+    Одновременные загрузки одного содержимого разрешает уникальный индекс по file_hash.
+    """
+    result = await db.execute(
+        select(File).where(File.file_hash == file_hash)
+    )
+    existing_file = result.scalars().first()
 
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    if existing_file:
+        os.remove(temp_path)
+        return await reuse_existing_file(existing_file, db)
 
-    db_file = File(
-        filename=unique_filename,
-        original_filename=file.filename,
-        file_path=str(file_path),
-        file_url=f"/uploads/{unique_filename}",
-        file_size=len(content),
-        mime_type=file.content_type or "application/octet-stream",
-        file_hash=file_hash
-    )
+    # Путь определяется содержимым: ab/cd/<sha256>.ext
+    ext = Path(original_filename).suffix.lower()
+    key = blob_key(file_hash, ext)
+    file_path = storage.locator(key)
+    # Локально - атомарный rename, в S3 - multipart-загрузка; временный файл забирает хранилище
+    await storage.put(temp_path, file_path)
 
-    db.add(db_file)
+    result = await db.execute(
+        pg_insert(File)
+        .values(
+            filename=f"{file_hash}{ext}",
+            original_filename=original_filename,
+            file_path=file_path,
+            file_url=storage.url(key),
+            file_size=file_size,
+            mime_type=content_type or "application/octet-stream",
+            file_hash=file_hash,
+            ref_count=0,
+            unreferenced_at=datetime.utcnow()
+        )
+        .on_conflict_do_nothing(index_elements=[File.file_hash])
+        .returning(File.id)
+    )
+    file_id = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(db_file)
 
-    return db_file
+    if file_id is None:
+        # Тот же файл параллельно сохранила другая загрузка
+        result = await db.execute(
+            select(File).where(File.file_hash == file_hash)
+        )
+        existing_file = result.scalar_one()
+        # При другом расширении блоб лёг по другому пути и никому не нужен
+        if existing_file.file_path != file_path:
+            await storage.delete(file_path)
+        return await reuse_existing_file(existing_file, db)
+
+    return await db.get(File, file_id)
 
 
 async def delete_file(file_id: int, db: AsyncSession):
@@ -107,9 +187,126 @@ async def delete_file(file_id: int, db: AsyncSession):
             detail="Cannot delete file that is attached to materials"
         )
 
-    file_path = Path(file.file_path)
-    if file_path.exists():
-        file_path.unlink()
-
+    file_path = file.file_path
     await db.delete(file)
     await db.commit()
+    await remove_unused_blobs([file_path], db)
+
+
+def file_refs(where):
+    """Число привязок material_files по file_id среди строк, подходящих под where"""
+    return (
+        select(MaterialFile.file_id, func.count().label("refs"))
+        .where(where)
+        .group_by(MaterialFile.file_id)
+        .subquery("refs")
+    )
+
+
+async def add_file_refs(where, db: AsyncSession) -> None:
+    """+N к ref_count для привязок под where; вызывать после их вставки, до коммита"""
+    refs = file_refs(where)
+    await db.execute(
+        update(File)
+        .where(File.id == refs.c.file_id)
+        .values(ref_count=File.ref_count + refs.c.refs, unreferenced_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def release_file_refs(where, db: AsyncSession) -> None:
+    """
+    -N к ref_count для привязок под where; вызывать до их удаления
+    (в том числе каскадного - вместе с материалом, модулем или курсом).
+    """
+    refs = file_refs(where)
+    new_count = File.ref_count - refs.c.refs
+    await db.execute(
+        update(File)
+        .where(File.id == refs.c.file_id)
+        .values(
+            ref_count=new_count,
+            unreferenced_at=case(
+                (new_count <= 0, datetime.utcnow()),
+                else_=File.unreferenced_at
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def remove_unused_blobs(paths: List[str], db: AsyncSession) -> int:
+    """Удаление блобов из хранилища, если на тот же локатор не ссылается другая запись"""
+    if not paths:
+        return 0
+    result = await db.execute(
+        select(File.file_path).where(File.file_path.in_(paths))
+    )
+    in_use = set(result.scalars().all())
+    removed = 0
+    for path in set(paths) - in_use:
+        if await storage.delete(path):
+            removed += 1
+    return removed
+
+
+async def collect_unreferenced_files(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """
+    Одна пачка сборки мусора: удаляет записи File без привязок дольше
+    BLOB_GC_GRACE_SECONDS и их блобы. Возвращает число удалённых записей.
+    """
+    batch_size = batch_size or settings.BLOB_GC_BATCH_SIZE
+    deadline = datetime.utcnow() - timedelta(seconds=settings.BLOB_GC_GRACE_SECONDS)
+
+    # ref_count - счётчик, а NOT EXISTS страхует от его расхождения с material_files
+    candidates = (
+        select(File.id)
+        .where(
+            and_(
+                File.ref_count <= 0,
+                File.unreferenced_at < deadline,
+                ~select(MaterialFile.id).where(MaterialFile.file_id == File.id).exists()
+            )
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(File)
+        .where(File.id.in_(candidates))
+        .returning(File.file_path, File.file_hash)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.all()
+    paths = [file_path for file_path, _ in deleted]
+
+    # Кеш извлечения живёт, пока есть хоть один File с тем же содержимым
+    hashes = {file_hash for _, file_hash in deleted}
+    if hashes:
+        await db.execute(
+            delete(FileExtraction)
+            .where(
+                and_(
+                    FileExtraction.file_hash.in_(hashes),
+                    ~select(File.id).where(File.file_hash == FileExtraction.file_hash).exists()
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    await remove_unused_blobs(paths, db)
+    return len(paths)
+
+
+async def run_blob_gc() -> None:
+    total = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            deleted = await collect_unreferenced_files(db)
+            total += deleted
+            if deleted < settings.BLOB_GC_BATCH_SIZE:
+                break
+
+    if total:
+        print(f"🧹 Blob GC: removed {total} unreferenced files")
@@ -0,0 +1,241 @@
+from typing import List, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models import (
+    User, Module, Material, Test, TestAttempt,
+    LessonProgress, CourseEnrollment, MaterialFunnelStats
+)
+from service.course_service import check_course_access
+
+
+async def record_material_completion(material_id: int, course_id: int, db: AsyncSession) -> None:
+    """+1 к completed_count; вызывается в транзакции создания LessonProgress"""
+    stmt = pg_insert(MaterialFunnelStats).values(
+        material_id=material_id, course_id=course_id, completed_count=1
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MaterialFunnelStats.material_id],
+            set_={"completed_count": MaterialFunnelStats.completed_count + 1}
+        )
+    )
+
+
+async def lock_funnel_rows(attempt_ids: Sequence[int], db: AsyncSession) -> None:
+    """
+    Строки воронки материалов попыток создаются при отсутствии и блокируются
+    до конца транзакции. Параллельное завершение попыток по тому же материалу
+    ждёт коммита и уже видит сданную попытку - первая сдача не считается дважды.
+    """
+    materials = (
+        select(Test.material_id, Module.course_id)
+        .select_from(TestAttempt)
+        .join(Test, Test.id == TestAttempt.test_id)
+        .join(Material, Material.id == Test.material_id)
+        .join(Module, Module.id == Material.module_id)
+        .where(TestAttempt.id.in_(attempt_ids))
+        .distinct()
+    )
+    await db.execute(
+        pg_insert(MaterialFunnelStats)
+        .from_select(["material_id", "course_id"], materials)
+        .on_conflict_do_nothing(index_elements=[MaterialFunnelStats.material_id])
+    )
+    # Порядок по material_id - без взаимных блокировок между пачками
+    await db.execute(
+        select(MaterialFunnelStats.material_id)
+        .where(MaterialFunnelStats.material_id.in_(
+            select(materials.subquery().c.material_id)
+        ))
+        .order_by(MaterialFunnelStats.material_id)
+        .with_for_update()
+    )
+
+
+async def record_material_passes(attempt_ids: Sequence[int], db: AsyncSession) -> None:
+    """
+    +1 к passed_count материала за каждого студента, впервые сдавшего
+    один из его тестов в переданных попытках. Коммит - на вызывающем.
+    """
+    if not attempt_ids:
+        return
+
+    await lock_funnel_rows(attempt_ids, db)
+
+    earlier = aliased(TestAttempt)
+    earlier_test = aliased(Test)
+    passed_before = (
+        select(earlier.id)
+        .join(earlier_test, earlier_test.id == earlier.test_id)
+        .where(
+            and_(
+                earlier.user_id == TestAttempt.user_id,
+                earlier.passed.is_(True),
+                earlier.id.not_in(attempt_ids),
+                earlier_test.material_id == Test.material_id
+            )
+        )
+        .exists()
+    )
+    first_passes = (
+        select(
+            Test.material_id,
+            Module.course_id,
+            func.count(func.distinct(TestAttempt.user_id))
+        )
+        .select_from(TestAttempt)
+        .join(Test, Test.id == TestAttempt.test_id)
+        .join(Material, Material.id == Test.material_id)
+        .join(Module, Module.id == Material.module_id)
+        .where(
+            and_(
+                TestAttempt.id.in_(attempt_ids),
+                TestAttempt.passed.is_(True),
+                ~passed_before
+            )
+        )
+        .group_by(Test.material_id, Module.course_id)
+    )
+
+    stmt = pg_insert(MaterialFunnelStats).from_select(
+        ["material_id", "course_id", "passed_count"], first_passes
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MaterialFunnelStats.material_id],
+            set_={"passed_count": MaterialFunnelStats.passed_count + stmt.excluded.passed_count}
+        )
+    )
+
+
+async def rebuild_material_funnel(material_ids: Sequence[int], db: AsyncSession) -> None:
+    """Пересчёт счётчиков материалов по lesson_progress и test_attempts (после пересчёта баллов)"""
+    if not material_ids:
+        return
+
+    completed = (
+        select(func.count(LessonProgress.id))
+        .where(LessonProgress.lesson_id == Material.id)
+        .scalar_subquery()
+    )
+    passed = (
+        select(func.count(func.distinct(TestAttempt.user_id)))
+        .join(Test, Test.id == TestAttempt.test_id)
+        .where(
+            and_(
+                Test.material_id == Material.id,
+                TestAttempt.passed.is_(True)
+            )
+        )
+        .scalar_subquery()
+    )
+    stmt = pg_insert(MaterialFunnelStats).from_select(
+        ["material_id", "course_id", "completed_count", "passed_count"],
+        select(Material.id, Module.course_id, completed, passed)
+        .join(Module, Module.id == Material.module_id)
+        .where(Material.id.in_(material_ids))
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MaterialFunnelStats.material_id],
+            set_={
+                "completed_count": stmt.excluded.completed_count,
+                "passed_count": stmt.excluded.passed_count
+            }
+        )
+    )
+
+
+async def user_funnel_materials(user_id: int, db: AsyncSession) -> List[int]:
+    """Материалы, в счётчиках которых учтён пользователь; вызывать до его удаления"""
+    result = await db.execute(
+        select(LessonProgress.lesson_id)
+        .where(LessonProgress.user_id == user_id)
+        .union(
+            select(Test.material_id)
+            .join(TestAttempt, TestAttempt.test_id == Test.id)
+            .where(
+                and_(
+                    TestAttempt.user_id == user_id,
+                    TestAttempt.passed.is_(True),
+                    Test.material_id.is_not(None)
+                )
+            )
+        )
+    )
+    return result.scalars().all()
+
+
+def share(count: int, total: int):
+    return round(count / total, 4) if total else None
+
+
+async def get_course_funnel(course_id: int, user: User, db: AsyncSession) -> dict:
+    """
+    Воронка курса по материалам из готовых счётчиков material_funnel_stats.
+
+    Материал считается пройденным по тем же правилам, что и блокировка
+    следующего: сдан тест, а если тестов нет - отмечен пройденным.
+    «Застрявшие» - открыли материал, но ещё не прошли его.
+    """
+    await check_course_access(course_id, user, db, require_creator=False)
+
+    enrolled_result = await db.execute(
+        select(func.count(CourseEnrollment.id))
+        .where(CourseEnrollment.course_id == course_id)
+    )
+    enrolled = enrolled_result.scalar()
+
+    has_tests = select(Test.id).where(Test.material_id == Material.id).exists()
+    result = await db.execute(
+        select(
+            Module.id.label("module_id"),
+            Module.title.label("module_title"),
+            Module.position.label("module_position"),
+            Material.id.label("material_id"),
+            Material.title,
+            Material.position,
+            has_tests.label("has_tests"),
+            func.coalesce(MaterialFunnelStats.completed_count, 0).label("completed_count"),
+            func.coalesce(MaterialFunnelStats.passed_count, 0).label("passed_count")
+        )
+        .outerjoin(Material, Material.module_id == Module.id)
+        .outerjoin(MaterialFunnelStats, MaterialFunnelStats.material_id == Material.id)
+        .where(Module.course_id == course_id)
+        .order_by(Module.position, Material.position)
+    )
+
+    modules = []
+    current = None
+    reached = enrolled
+    for row in result.all():
+        if current is None or current["module_id"] != row.module_id:
+            # Первый материал модуля открыт всем записанным студентам
+            current = {
+                "module_id": row.module_id,
+                "title": row.module_title,
+                "position": row.module_position,
+                "materials": []
+            }
+            modules.append(current)
+            reached = enrolled
+        if row.material_id is None:
+            continue
+
+        cleared = row.passed_count if row.has_tests else row.completed_count
+        current["materials"].append({
+            "material_id": row.material_id,
+            "title": row.title,
+            "position": row.position,
+            "has_tests": row.has_tests,
+            "completed_count": row.completed_count,
+            "passed_count": row.passed_count,
+            "completion_rate": share(row.completed_count, enrolled),
+            "pass_rate": share(row.passed_count, enrolled) if row.has_tests else None,
+            "stuck_count": max(0, reached - cleared)
+        })
+        reached = cleared
+
+    return {"course_id": course_id, "enrolled": enrolled, "modules": modules}
@@ -0,0 +1,162 @@
+import csv
+import io
+import os
+import tempfile
+from typing import AsyncIterator, List, Sequence, Tuple
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models import (
+    User, Module, Material, Test,
+    CourseEnrollment, CourseProgress, TestAttemptSummary
+)
+
+GRADEBOOK_COLUMNS = [
+    "email", "last_name", "first_name", "patronymic", "group_name",
+    "completed_items", "total_items"
+]
+
+
+async def load_gradebook_tests(course_id: int, db: AsyncSession) -> List[Tuple[int, str]]:
+    """Тесты курса в порядке модулей и материалов - столбцы ведомости"""
+    result = await db.execute(
+        select(Test.id, Test.title)
+        .join(Module, Test.module_id == Module.id)
+        .outerjoin(Material, Test.material_id == Material.id)
+        .where(Module.course_id == course_id)
+        .order_by(Module.position, Material.position, Test.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def gradebook_header(tests: Sequence[Tuple[int, str]]) -> List[str]:
+    return GRADEBOOK_COLUMNS + [f"{title} (#{test_id})" for test_id, title in tests]
+
+
+async def stream_gradebook_rows(
+        course_id: int, tests: Sequence[Tuple[int, str]],
+        db: AsyncSession
+) -> AsyncIterator[Sequence[tuple]]:
+    """
+    Строки ведомости пачками через серверный курсор (yield_per):
+    записи на курс JOIN course_progress JOIN лучший балл по каждому тесту
+    из test_attempt_summary, развёрнутый в столбцы агрегатом с FILTER.
+    """
+    query = (
+        select(
+            User.email, User.last_name, User.first_name,
+            User.patronymic, User.group_name,
+            func.coalesce(CourseProgress.completed_items, 0),
+            func.coalesce(CourseProgress.total_items, 0)
+        )
+        .select_from(CourseEnrollment)
+        .join(User, User.id == CourseEnrollment.user_id)
+        .outerjoin(
+            CourseProgress,
+            and_(
+                CourseProgress.user_id == CourseEnrollment.user_id,
+                CourseProgress.course_id == course_id
+            )
+        )
+    )
+
+    if tests:
+        scores = (
+            select(
+                TestAttemptSummary.user_id,
+                *[
+                    func.max(TestAttemptSummary.best_score)
+                    .filter(TestAttemptSummary.test_id == test_id)
+                    .label(f"test_{test_id}")
+                    for test_id, _ in tests
+                ]
+            )
+            .where(TestAttemptSummary.test_id.in_([test_id for test_id, _ in tests]))
+            .group_by(TestAttemptSummary.user_id)
+            .subquery("scores")
+        )
+        query = query.add_columns(
+            *[scores.c[f"test_{test_id}"] for test_id, _ in tests]
+        ).outerjoin(
+            scores, scores.c.user_id == CourseEnrollment.user_id
+        )
+
+    result = await db.stream(
+        query
+        .where(CourseEnrollment.course_id == course_id)
+        .order_by(User.group_name, User.last_name, User.first_name, User.id)
+        .execution_options(yield_per=settings.GRADEBOOK_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def iter_gradebook_csv(course_id: int) -> AsyncIterator[str]:
+    """
+    CSV ведомости кусками по пачке строк. Сессия своя: ответ отдаётся
+    потоково уже после завершения обработчика запроса.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    async with AsyncSessionLocal() as db:
+        tests = await load_gradebook_tests(course_id, db)
+        # BOM, чтобы Excel открыл кириллицу в UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(gradebook_header(tests))
+
+        async for rows in stream_gradebook_rows(course_id, tests, db):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def append_xlsx_rows(sheet, rows: Sequence[Sequence]) -> None:
+    for row in rows:
+        sheet.append(list(row))
+
+
+def save_xlsx(workbook, course_id: int) -> str:
+    fd, path = tempfile.mkstemp(prefix=f"gradebook_{course_id}_", suffix=".xlsx")
+    os.close(fd)
+    workbook.save(path)
+    return path
+
+
+async def build_gradebook_xlsx(course_id: int) -> str:
+    """
+    XLSX ведомости во временном файле (openpyxl в режиме write_only
+    не держит строки в памяти). Строки читаются из БД пачками, запись
+    пачки и сохранение книги - в пуле потоков. Путь удаляет вызывающий после отдачи.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="XLSX export is not available, install openpyxl or use format=csv"
+        )
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Gradebook")
+
+    async with AsyncSessionLocal() as db:
+        tests = await load_gradebook_tests(course_id, db)
+        await run_in_threadpool(append_xlsx_rows, sheet, [gradebook_header(tests)])
+        async for rows in stream_gradebook_rows(course_id, tests, db):
+            await run_in_threadpool(append_xlsx_rows, sheet, rows)
+
+    return await run_in_threadpool(save_xlsx, workbook, course_id)
+
+
+def iter_file_chunks(path: str, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
@@ -0,0 +1,156 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.database import AsyncSessionLocal
+from helpers.files.files_helper import (
+    extract_files_content, update_material_content, file_extractor_version
+)
+from models import Material, File, MaterialFile, FileExtraction
+
+ProgressCallback = Callable[[int], Awaitable[None]]
+Extraction = Tuple[Optional[str], Optional[str]]
+
+
+async def load_cached_extractions(
+        keys: List[Tuple[str, str]], db: AsyncSession
+) -> Dict[Tuple[str, str], Extraction]:
+    """Готовые результаты по (file_hash, extractor_version)"""
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(
+            FileExtraction.file_hash, FileExtraction.extractor_version,
+            FileExtraction.text_content, FileExtraction.transcript
+        )
+        .where(tuple_(FileExtraction.file_hash, FileExtraction.extractor_version).in_(keys))
+    )
+    return {
+        (file_hash, version): (text_content, transcript)
+        for file_hash, version, text_content, transcript in result.all()
+    }
+
+
+async def store_extractions(
+        extractions: Dict[Tuple[str, str], Extraction], db: AsyncSession
+) -> None:
+    # Пустой результат не кешируется: ошибку парсера или Whisper не отличить от пустого файла
+    rows = [
+        {
+            "file_hash": file_hash, "extractor_version": version,
+            "text_content": text_content, "transcript": transcript
+        }
+        for (file_hash, version), (text_content, transcript) in extractions.items()
+        if text_content or transcript
+    ]
+    if rows:
+        await db.execute(
+            pg_insert(FileExtraction).values(rows).on_conflict_do_nothing()
+        )
+
+
+def combine_extractions(files: List[File], keys: dict, *sources: dict) -> Tuple[List[str], List[str]]:
+    extracted_texts = []
+    transcriptions = []
+    for file in files:
+        key = keys.get(file.id)
+        text_content, transcript = next(
+            (source[key] for source in sources if key in source), (None, None)
+        )
+        if text_content:
+            extracted_texts.append(text_content)
+        if transcript:
+            transcriptions.append(transcript)
+    return extracted_texts, transcriptions
+
+
+def extraction_keys(files: List[File]) -> Dict[int, Tuple[str, str]]:
+    """file.id -> (file_hash, extractor_version) для файлов, которые вообще обрабатываются"""
+    return {
+        file.id: (file.file_hash, version)
+        for file in files
+        if (version := file_extractor_version(file)) is not None
+    }
+
+
+async def ingest_from_cache(material: Material, files: List[File], db: AsyncSession) -> bool:
+    """
+    Если все файлы уже обработаны раньше (в т.ч. в других материалах) -
+    контент материала обновляется сразу, без фоновой задачи. Коммит - на вызывающем.
+    """
+    keys = extraction_keys(files)
+    cached = await load_cached_extractions(list(set(keys.values())), db)
+    if any(key not in cached for key in keys.values()):
+        return False
+
+    extracted_texts, transcriptions = combine_extractions(files, keys, cached)
+    if extracted_texts or transcriptions:
+        await update_material_content(material, extracted_texts, transcriptions)
+    return True
+
+
+async def run_ingest_material_job(payload: dict, progress: ProgressCallback) -> dict:
+    """
+    Извлечение текста, OCR и транскрибация прикреплённых файлов.
+    Результаты берутся из кеша file_extractions по хешу содержимого, обрабатываются
+    только новые файлы. Соединение с БД не держится на время обработки.
+    """
+    material_id = payload["material_id"]
+    file_ids = payload["file_ids"]
+
+    async with AsyncSessionLocal() as db:
+        # Файл могли открепить, пока задача ждала в очереди
+        result = await db.execute(
+            select(File)
+            .join(MaterialFile, MaterialFile.file_id == File.id)
+            .where(
+                and_(
+                    MaterialFile.material_id == material_id,
+                    File.id.in_(file_ids)
+                )
+            )
+        )
+        files = sorted(result.scalars().all(), key=lambda f: file_ids.index(f.id))
+        keys = extraction_keys(files)
+        cached = await load_cached_extractions(list(set(keys.values())), db)
+
+    # Один и тот же файл обрабатывается один раз, остальные берут результат из кеша
+    pending: Dict[Tuple[str, str], File] = {}
+    for file in files:
+        key = keys.get(file.id)
+        if key and key not in cached:
+            pending.setdefault(key, file)
+
+    # Результат сохраняется в кеш сразу: при падении задачи повтор не обрабатывает файл заново
+    async def store_extraction(file: File, extraction: Extraction) -> None:
+        async with AsyncSessionLocal() as db:
+            await store_extractions({keys[file.id]: extraction}, db)
+            await db.commit()
+
+    extracted = dict(zip(
+        pending.keys(),
+        await extract_files_content(list(pending.values()), progress, store_extraction)
+    ))
+
+    extracted_texts, transcriptions = combine_extractions(files, keys, cached, extracted)
+
+    async with AsyncSessionLocal() as db:
+        material = await db.get(Material, material_id, with_for_update=True)
+        if material is not None and (extracted_texts or transcriptions):
+            await update_material_content(material, extracted_texts, transcriptions)
+        await db.commit()
+
+    from_cache = sum(1 for file in files if keys.get(file.id) in cached)
+    print(f"📚 Material {material_id}: {from_cache} files from cache, {len(pending)} processed")
+
+    if material is None:
+        return {"material_id": material_id, "files": len(files), "skipped": "Material was deleted"}
+
+    return {
+        "material_id": material_id,
+        "files": len(files),
+        "cached": from_cache,
+        "processed": len(pending),
+        "extracted": len(extracted_texts),
+        "transcribed": len(transcriptions)
+    }
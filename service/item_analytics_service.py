@@ -0,0 +1,223 @@
+import math
+from typing import Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, and_, func, cast, true, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from helpers.test_snapshot import get_test_snapshot
+from models import (
+    User, Question, AnswerOption, TestAttempt, QuestionAttempt,
+    QuestionStats, AnswerOptionStats
+)
+from service.course_service import check_course_access
+
+QUESTION_COUNTERS = (
+    "answers_count", "correct_count", "hint_count",
+    "sum_x", "sum_x2", "sum_y", "sum_y2", "sum_xy"
+)
+
+
+async def record_attempt_analytics(attempt_ids: Sequence[int], db: AsyncSession) -> None:
+    """
+    Добавление завершённых попыток в счётчики question_stats и answer_option_stats.
+    Вызывается в той же транзакции, что и завершение попыток; коммит - на вызывающем.
+    """
+    if not attempt_ids:
+        return
+
+    x = cast(QuestionAttempt.partial_score, Float)
+    y = cast(func.coalesce(TestAttempt.score, 0), Float) / 100.0
+    per_question = (
+        select(
+            QuestionAttempt.question_id,
+            TestAttempt.test_id,
+            func.count(),
+            func.count().filter(QuestionAttempt.is_correct.is_(True)),
+            func.count().filter(QuestionAttempt.hint_used.is_(True)),
+            func.sum(x),
+            func.sum(x * x),
+            func.sum(y),
+            func.sum(y * y),
+            func.sum(x * y)
+        )
+        .join(TestAttempt, TestAttempt.id == QuestionAttempt.test_attempt_id)
+        .where(TestAttempt.id.in_(attempt_ids))
+        .group_by(QuestionAttempt.question_id, TestAttempt.test_id)
+    )
+    stmt = pg_insert(QuestionStats).from_select(
+        ["question_id", "test_id", *QUESTION_COUNTERS], per_question
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[QuestionStats.question_id],
+            set_={
+                name: getattr(QuestionStats, name) + getattr(stmt.excluded, name)
+                for name in QUESTION_COUNTERS
+            }
+        )
+    )
+
+    selected = func.unnest(QuestionAttempt.selected_option_ids).table_valued("option_id").alias("selected")
+    per_option = (
+        select(
+            AnswerOption.id,
+            AnswerOption.question_id,
+            func.count(func.distinct(QuestionAttempt.id))
+        )
+        .select_from(QuestionAttempt)
+        .join(selected, true())
+        .join(
+            AnswerOption,
+            and_(
+                AnswerOption.id == selected.c.option_id,
+                AnswerOption.question_id == QuestionAttempt.question_id
+            )
+        )
+        .where(QuestionAttempt.test_attempt_id.in_(attempt_ids))
+        .group_by(AnswerOption.id, AnswerOption.question_id)
+    )
+    stmt = pg_insert(AnswerOptionStats).from_select(
+        ["option_id", "question_id", "selected_count"], per_option
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AnswerOptionStats.option_id],
+            set_={
+                "selected_count": AnswerOptionStats.selected_count + stmt.excluded.selected_count
+            }
+        )
+    )
+
+
+async def reset_test_analytics(test_id: Optional[int], db: AsyncSession) -> None:
+    """Обнуление счётчиков теста (или всех тестов, если test_id не указан)"""
+    if test_id is None:
+        await db.execute(delete(AnswerOptionStats))
+        await db.execute(delete(QuestionStats))
+        return
+
+    await db.execute(
+        delete(AnswerOptionStats).where(
+            AnswerOptionStats.question_id.in_(
+                select(Question.id).where(Question.test_id == test_id)
+            )
+        )
+    )
+    await db.execute(delete(QuestionStats).where(QuestionStats.test_id == test_id))
+
+
+async def lock_test_analytics(
+        test_ids: Sequence[int], db: AsyncSession, exclusive: bool = False
+) -> None:
+    """
+    Advisory-блокировка счётчиков тестов до конца транзакции.
+    Запись завершённых попыток берёт разделяемую, пересборка при regrade - исключительную,
+    поэтому попытка не попадает в счётчики дважды.
+    """
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    for test_id in sorted(set(test_ids)):
+        await db.execute(select(lock(test_id)))
+
+
+async def rebuild_test_analytics(test_id: int, batch_size: int, db: AsyncSession) -> None:
+    """
+    Пересборка счётчиков теста по всем завершённым попыткам в одной транзакции
+    под исключительной блокировкой. Коммит - на вызывающем.
+    """
+    await lock_test_analytics([test_id], db, exclusive=True)
+    await reset_test_analytics(test_id, db)
+
+    last_attempt_id = 0
+    while True:
+        result = await db.execute(
+            select(TestAttempt.id)
+            .where(
+                and_(
+                    TestAttempt.test_id == test_id,
+                    TestAttempt.finished_at.is_not(None),
+                    TestAttempt.id > last_attempt_id
+                )
+            )
+            .order_by(TestAttempt.id)
+            .limit(batch_size)
+        )
+        attempt_ids = result.scalars().all()
+        if not attempt_ids:
+            break
+        await record_attempt_analytics(attempt_ids, db)
+        last_attempt_id = attempt_ids[-1]
+
+
+def discrimination_index(stats: QuestionStats) -> Optional[float]:
+    """Коэффициент корреляции балла за вопрос с итоговым баллом попытки"""
+    n = stats.answers_count
+    if n < 2:
+        return None
+
+    covariance = n * stats.sum_xy - stats.sum_x * stats.sum_y
+    variance_x = n * stats.sum_x2 - stats.sum_x ** 2
+    variance_y = n * stats.sum_y2 - stats.sum_y ** 2
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+
+    return round(covariance / math.sqrt(variance_x * variance_y), 4)
+
+
+async def get_test_analytics(
+        course_id: int, module_id: int,
+        material_id: int, test_id: int,
+        user: User, db: AsyncSession
+) -> dict:
+    await check_course_access(course_id, user, db)
+    test = await get_test_snapshot(test_id, db)
+    if not test or not test.belongs_to(course_id, module_id, material_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+
+    question_stats_result = await db.execute(
+        select(QuestionStats).where(QuestionStats.test_id == test_id)
+    )
+    question_stats = {s.question_id: s for s in question_stats_result.scalars().all()}
+
+    option_stats_result = await db.execute(
+        select(AnswerOptionStats.option_id, AnswerOptionStats.selected_count)
+        .where(AnswerOptionStats.question_id.in_(list(test.questions_by_id)))
+    )
+    option_counts = dict(option_stats_result.all())
+
+    questions = []
+    for question in test.questions:
+        stats = question_stats.get(question.id)
+        answers_count = stats.answers_count if stats else 0
+
+        options = []
+        for option in question.options:
+            selected_count = option_counts.get(option.id, 0)
+            options.append({
+                "option_id": option.id,
+                "content": option.content,
+                "is_correct": option.is_correct,
+                "selected_count": selected_count,
+                "selection_rate": round(selected_count / answers_count, 4) if answers_count else None
+            })
+
+        questions.append({
+            "question_id": question.id,
+            "text": question.text,
+            "type": question.type,
+            "position": question.position,
+            "answers_count": answers_count,
+            "p_value": round(stats.sum_x / answers_count, 4) if answers_count else None,
+            "correct_rate": round(stats.correct_count / answers_count, 4) if answers_count else None,
+            "discrimination": discrimination_index(stats) if stats else None,
+            "hint_rate": round(stats.hint_count / answers_count, 4) if answers_count else None,
+            "options": options
+        })
+
+    return {
+        "test_id": test.id,
+        "title": test.title,
+        "questions": questions
+    }
@@ -0,0 +1,289 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, case, literal
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models import Job, User
+from models.Enums import JobStatus
+from service.course_clone_service import run_clone_course_job
+from service.deletion_service import run_delete_course_job, run_delete_user_job
+from service.user_import_service import run_import_users_job
+from service.ingestion_service import run_ingest_material_job
+from service.regrade_service import run_regrade_test_job
+
+# Обработчик получает payload задачи и колбэк прогресса, возвращает result
+JOB_HANDLERS = {
+    "clone_course": run_clone_course_job,
+    "delete_course": run_delete_course_job,
+    "delete_user": run_delete_user_job,
+    "import_users": run_import_users_job,
+    "ingest_material": run_ingest_material_job,
+    "regrade_test": run_regrade_test_job,
+}
+
+
+async def create_job(
+        job_type: str, payload: dict,
+        user: Optional[User], db: AsyncSession,
+        commit: bool = True
+) -> Job:
+    """
+    commit=False - задача создаётся в транзакции вызывающего вместе с данными,
+    которые она обрабатывает; коммит и refresh - на вызывающем.
+    """
+    job = Job(
+        type=job_type,
+        payload=payload,
+        created_by=user.id if user else None
+    )
+    db.add(job)
+    if not commit:
+        await db.flush()
+        return job
+
+    await db.commit()
+    await db.refresh(job)
+
+    return job
+
+
+async def get_job(job_id: int, user: User, db: AsyncSession) -> Job:
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    job = result.scalar_one_or_none()
+    if not job or job.created_by != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job
+
+
+async def set_job_state(job_id: int, **values) -> None:
+    """Обновление задачи в отдельной транзакции, чтобы прогресс был виден сразу"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    """Ошибка, которую повтор не исправит: задача сразу помечается failed"""
+    pass
+
+
+async def claim_job(job_id: Optional[int] = None, worker_id: Optional[str] = None) -> Optional[Job]:
+    """
+    Захват задачи из очереди: UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED).
+    Параллельные воркеры получают разные задачи. Без job_id - самая старая из pending,
+    у которой истекла задержка перед повтором.
+    """
+    now = datetime.utcnow()
+    candidate = (
+        select(Job.id)
+        .where(
+            and_(
+                Job.status == JobStatus.pending,
+                Job.available_at <= now,
+                Job.type.in_(JOB_HANDLERS.keys())
+            )
+        )
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .correlate(None)
+    )
+    if job_id is not None:
+        candidate = candidate.where(Job.id == job_id)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == candidate.scalar_subquery())
+            .values(
+                status=JobStatus.running,
+                started_at=now,
+                heartbeat_at=now,
+                progress=0,
+                error=None,
+                attempts=Job.attempts + 1,
+                locked_by=worker_id or f"app-{os.getpid()}"
+            )
+            .returning(Job)
+        )
+        job = result.scalar_one_or_none()
+        await db.commit()
+
+    return job
+
+
+async def requeue_stale_jobs() -> int:
+    """Задачи упавшего воркера (нет heartbeat дольше JOB_STALE_SECONDS) возвращаются в очередь"""
+    deadline = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(
+                and_(
+                    Job.status == JobStatus.running,
+                    Job.heartbeat_at < deadline
+                )
+            )
+            .values(
+                status=case(
+                    (Job.attempts < Job.max_attempts, literal(JobStatus.pending, Job.status.type)),
+                    else_=literal(JobStatus.failed, Job.status.type)
+                ),
+                error="Worker stopped responding",
+                locked_by=None
+            )
+            .returning(Job.id)
+        )
+        job_ids = result.scalars().all()
+        await db.commit()
+
+    if job_ids:
+        print(f"♻️ Requeued stale jobs: {job_ids}")
+    return len(job_ids)
+
+
+async def heartbeat(job_id: int) -> None:
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        await set_job_state(job_id, heartbeat_at=datetime.utcnow())
+
+
+async def execute_job(job: Job) -> None:
+    """Выполнение захваченной задачи; при ошибке - повтор, пока не исчерпаны попытки"""
+    async def report_progress(progress: int):
+        # Обновляется только running-задача: отменённая прерывается на ближайшем прогрессе
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Job)
+                .where(and_(Job.id == job.id, Job.status == JobStatus.running))
+                .values(progress=progress, heartbeat_at=datetime.utcnow())
+                .returning(Job.id)
+            )
+            updated = result.scalar_one_or_none()
+            await db.commit()
+        if updated is None:
+            raise JobCancelled()
+
+    beat = asyncio.create_task(heartbeat(job.id))
+    try:
+        result = await JOB_HANDLERS[job.type](job.payload or {}, report_progress)
+    except JobCancelled:
+        print(f"⏹️ Job {job.id} ({job.type}) cancelled")
+        return
+    except JobFailed as e:
+        print(f"❌ Job {job.id} ({job.type}) failed: {str(e)}")
+        await finish_job(
+            job.id, status=JobStatus.failed,
+            error=str(e), finished_at=datetime.utcnow()
+        )
+        return
+    except Exception as e:
+        print(f"❌ Job {job.id} ({job.type}) failed: {str(e)}")
+        traceback.print_exc()
+        retry = job.attempts < job.max_attempts
+        backoff = timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        await finish_job(
+            job.id,
+            status=JobStatus.pending if retry else JobStatus.failed,
+            error=str(e),
+            available_at=datetime.utcnow() + backoff,
+            finished_at=None if retry else datetime.utcnow()
+        )
+        return
+    finally:
+        beat.cancel()
+
+    await finish_job(
+        job.id, status=JobStatus.completed, progress=100,
+        result=result, finished_at=datetime.utcnow()
+    )
+    print(f"✅ Job {job.id} ({job.type}) completed")
+
+
+async def finish_job(job_id: int, **values) -> None:
+    """Итог пишется только если задачу не отменили, пока она выполнялась"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job)
+            .where(and_(Job.id == job_id, Job.status == JobStatus.running))
+            .values(locked_by=None, **values)
+        )
+        await db.commit()
+
+
+async def run_job(job_id: int) -> None:
+    """
+    Выполнение задачи в процессе приложения (BackgroundTasks), если отдельный воркер не запущен.
+    Повтор после ошибки отложен до available_at - его подберёт run_pending_jobs.
+    """
+    while job := await claim_job(job_id=job_id):
+        await execute_job(job)
+
+
+async def run_pending_jobs() -> None:
+    """Без отдельного воркера: подбор задач, оставшихся в очереди после рестарта или упавших"""
+    await requeue_stale_jobs()
+    while job := await claim_job():
+        await execute_job(job)
+
+
+def dispatch_job(job: Job, background_tasks: BackgroundTasks) -> None:
+    """При JOB_WORKER_ENABLED задачу забирает worker.py, иначе - выполнение после ответа"""
+    if not settings.JOB_WORKER_ENABLED:
+        background_tasks.add_task(run_job, job.id)
+
+
+async def cancel_job(job_id: int, user: User, db: AsyncSession) -> Job:
+    job = await get_job(job_id, user, db)
+    if job.status not in (JobStatus.pending, JobStatus.running):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Job is already {job.status.value}"
+        )
+
+    job.status = JobStatus.cancelled
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    await db.commit()
+    await db.refresh(job)
+
+    return job
+
+
+async def retry_job(
+        job_id: int, user: User, db: AsyncSession,
+        background_tasks: BackgroundTasks
+) -> Job:
+    job = await get_job(job_id, user, db)
+    if job.status not in (JobStatus.failed, JobStatus.cancelled):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only failed or cancelled jobs can be retried"
+        )
+
+    job.status = JobStatus.pending
+    job.progress = 0
+    job.attempts = 0
+    job.error = None
+    job.result = None
+    job.started_at = None
+    job.finished_at = None
+    job.available_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(job)
+
+    dispatch_job(job, background_tasks)
+    return job
@@ -4,11 +4,14 @@ from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from models import User, Module, Material, MaterialFile
-from schemas.course import MaterialCreateRequest, MaterialUpdateRequest
-from service.course_service import check_course_access
+from schemas.course import MaterialCreateRequest, MaterialUpdateRequest, ReorderRequest
+from service.course_service import check_course_access, apply_positions, get_module_detail
+from helpers.test_snapshot import clear_test_snapshots
+from service.file_service import add_file_refs, release_file_refs
+from service.job_service import create_job
+from service.ingestion_service import ingest_from_cache
 from helpers.files.files_helper import (
-    get_files, get_material, load_material_files_with_relations,
-    process_files, update_material_content
+    get_files, get_material, load_material_files_with_relations, attach_files
 )
 
 
@@ -91,6 +94,38 @@ async def update_material(
     return material
 
 
+async def reorder_materials(
+        course_id: int, module_id: int,
+        data: ReorderRequest,
+        user: User, db: AsyncSession
+):
+    await check_course_access(course_id, user, db)
+    result = await db.execute(
+        select(Module).where(
+            and_(Module.id == module_id, Module.course_id == course_id)
+        )
+    )
+    if not result.scalar_one_or_none():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Module not found in this course"
+        )
+
+    updated = await apply_positions(
+        Material, data.items, Material.module_id == module_id, db
+    )
+    if updated != len(data.items):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Material not found in this module"
+        )
+
+    await db.commit()
+
+    return await get_module_detail(course_id, module_id, user, db)
+
+
 async def delete_material(
         course_id: int, module_id: int,
         material_id: int,
@@ -115,8 +150,10 @@ async def delete_material(
             detail="Material not found in this module"
         )
 
+    await release_file_refs(MaterialFile.material_id == material_id, db)
     await db.delete(material)
     await db.commit()
+    clear_test_snapshots()
 
 
 async def attach_files_to_material(
@@ -124,7 +161,10 @@ async def attach_files_to_material(
         material_id: int, file_ids: List[int],
         user: User, db: AsyncSession
 ):
-    """Прикрепление файлов с автоматическим извлечением текста"""
+    """
+    Прикрепление файлов. Извлечение текста и транскрибация - в фоновой
+    задаче ingest_material, ответ содержит её для опроса прогресса.
+    """
     print(f"🔵 ATTACH FILES TO MATERIAL")
     print(f"Material ID: {material_id}, File IDs: {file_ids}")
     print(f"{'=' * 60}\n")
@@ -132,17 +172,36 @@ async def attach_files_to_material(
     await check_course_access(course_id, user, db)
     material = await get_material(db, material_id, module_id, course_id)
     files = await get_files(db, file_ids)
-    material_files, extracted_texts, transcriptions = await process_files(
-        db, material_id, files
+    material_files = await attach_files(db, material_id, files)
+    if material_files:
+        await db.flush()
+        await add_file_refs(
+            MaterialFile.id.in_([mf.id for mf in material_files]), db
+        )
+
+    # Уже обработанные ранее файлы берутся из кеша сразу, без задачи
+    new_file_ids = {mf.file_id for mf in material_files}
+    from_cache = await ingest_from_cache(
+        material, [file for file in files if file.id in new_file_ids], db
     )
-    if extracted_texts or transcriptions:
-        await update_material_content(
-            material, extracted_texts, transcriptions
+
+    # Задача создаётся в одной транзакции со связями: прикреплённый файл
+    # не может остаться без обработки
+    job = None
+    if material_files and not from_cache:
+        job = await create_job(
+            "ingest_material",
+            {"material_id": material_id, "file_ids": [mf.file_id for mf in material_files]},
+            user, db, commit=False
         )
     await db.commit()
-    await db.refresh(material)
+    if job:
+        await db.refresh(job)
 
-    return await load_material_files_with_relations(db, material_files)
+    return {
+        "files": await load_material_files_with_relations(db, material_files),
+        "job": job
+    }
 
 
 async def detach_file_from_material(
@@ -184,5 +243,6 @@ async def detach_file_from_material(
             detail="File not attached to this material"
         )
 
+    await release_file_refs(MaterialFile.id == material_file.id, db)
     await db.delete(material_file)
     await db.commit()
@@ -0,0 +1,158 @@
+import os
+from datetime import datetime, timedelta
+from urllib.parse import quote
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from core.config import settings
+from core.security import create_media_token, decode_token
+from helpers.files.blob_store import storage
+from models import User, Role, File, MaterialFile, Material, Module, CourseEnrollment
+from models.Enums import RoleType
+from service.course_service import check_course_access
+
+
+async def check_file_access(file_id: int, user: User, db: AsyncSession) -> File:
+    """
+    Админы видят все файлы, преподаватели - файлы курсов, к которым у них есть
+    доступ (check_course_access), и ещё не прикреплённые загрузки,
+    студенты - только файлы материалов курсов, на которые записаны.
+    """
+    result = await db.execute(select(File).where(File.id == file_id))
+    file = result.scalar_one_or_none()
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    role_result = await db.execute(select(Role.name).where(Role.id == user.role_id))
+    role = role_result.scalar_one_or_none()
+    if role == RoleType.admin:
+        return file
+
+    if role == RoleType.teacher:
+        courses_result = await db.execute(
+            select(Module.course_id)
+            .join(Material, Material.module_id == Module.id)
+            .join(MaterialFile, MaterialFile.material_id == Material.id)
+            .where(MaterialFile.file_id == file_id)
+            .distinct()
+        )
+        course_ids = courses_result.scalars().all()
+        # Только что загруженный файл ещё не прикреплён ни к одному курсу
+        if not course_ids:
+            return file
+
+        for course_id in course_ids:
+            try:
+                await check_course_access(course_id, user, db)
+            except HTTPException:
+                continue
+            return file
+
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to a course with this file"
+        )
+
+    enrolled_result = await db.execute(
+        select(
+            select(MaterialFile.id)
+            .join(Material, Material.id == MaterialFile.material_id)
+            .join(Module, Module.id == Material.module_id)
+            .join(CourseEnrollment, CourseEnrollment.course_id == Module.course_id)
+            .where(
+                and_(
+                    MaterialFile.file_id == file_id,
+                    CourseEnrollment.user_id == user.id
+                )
+            )
+            .exists()
+        )
+    )
+    if not enrolled_result.scalar():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not enrolled in a course with this file"
+        )
+
+    return file
+
+
+async def create_media_url(file_id: int, user: User, db: AsyncSession) -> dict:
+    """
+    Проверка доступа один раз - дальше клиент ходит по ссылке с токеном,
+    в котором уже лежит всё нужное для отдачи (без запросов к БД на каждый Range).
+    """
+    file = await check_file_access(file_id, user, db)
+
+    expires_delta = timedelta(minutes=settings.MEDIA_TOKEN_EXPIRE_MINUTES)
+    token = create_media_token(
+        {
+            "sub": user.id,
+            "fid": file.id,
+            "loc": file.file_path,
+            "hash": file.file_hash,
+            "mime": file.mime_type,
+            "name": file.original_filename
+        },
+        expires_delta
+    )
+
+    return {
+        "url": f"/api/media/{file.id}/content?token={token}",
+        "expires_at": datetime.utcnow() + expires_delta
+    }
+
+
+def decode_media_token(file_id: int, token: str) -> dict:
+    payload = decode_token(token)
+    if payload is None or payload.get("type") != "media" or payload.get("fid") != file_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired media token"
+        )
+    return payload
+
+
+def media_headers(payload: dict) -> dict:
+    # Содержимое адресуется хешем и не меняется - кеш браузера безопасен в пределах токена
+    return {
+        "Cache-Control": f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable",
+        "ETag": f'"{payload["hash"]}"',
+        "Content-Disposition": f"inline; filename*=utf-8''{quote(payload['name'])}"
+    }
+
+
+async def serve_media(file_id: int, token: str, request: Request) -> Response:
+    """
+    Отдача файла по токену. Порядок: S3 - редирект на подписанную ссылку,
+    локально с MEDIA_ACCEL_REDIRECT_PREFIX - X-Accel-Redirect в nginx,
+    иначе FileResponse (Range и sendfile через pathsend, если сервер умеет).
+    """
+    payload = decode_media_token(file_id, token)
+    headers = media_headers(payload)
+
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if storage.name == "s3":
+        url = storage.presigned_url(
+            payload["loc"], settings.MEDIA_CACHE_MAX_AGE,
+            payload["name"], payload["mime"]
+        )
+        return RedirectResponse(url, status_code=status.HTTP_302_FOUND)
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        relative_path = os.path.relpath(payload["loc"], settings.UPLOAD_DIR)
+        headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative_path)
+        return Response(media_type=payload["mime"], headers=headers)
+
+    if not os.path.isfile(payload["loc"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    return FileResponse(payload["loc"], media_type=payload["mime"], headers=headers)
@@ -0,0 +1,254 @@
+from typing import Optional
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, func, values, column
+from sqlalchemy import Integer, Boolean, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.config import settings
+from core.database import AsyncSessionLocal
+from helpers.test_snapshot import get_test_snapshot
+from helpers.regrade_helper import (
+    QuestionMasks, score_answers_vectorized, attempt_scores, to_python_rows
+)
+from models import (
+    User, Test, Material, Module,
+    TestAttempt, QuestionAttempt, TestAttemptSummary
+)
+from service.course_service import check_course_access
+from service.item_analytics_service import rebuild_test_analytics
+from service.funnel_service import rebuild_material_funnel
+
+# Ограничение asyncpg - не более 32767 параметров в одном запросе
+UPDATE_CHUNK_SIZE = 5000
+
+
+async def update_question_attempts(rows: list[tuple], db: AsyncSession) -> None:
+    for start in range(0, len(rows), UPDATE_CHUNK_SIZE):
+        scored = values(
+            column("id", Integer),
+            column("is_correct", Boolean),
+            column("partial_score", Float),
+            name="scored"
+        ).data(rows[start:start + UPDATE_CHUNK_SIZE])
+
+        await db.execute(
+            update(QuestionAttempt)
+            .where(QuestionAttempt.id == scored.c.id)
+            .values(
+                is_correct=scored.c.is_correct,
+                partial_score=scored.c.partial_score
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def update_attempt_scores(rows: list[tuple], db: AsyncSession) -> None:
+    for start in range(0, len(rows), UPDATE_CHUNK_SIZE):
+        scored = values(
+            column("id", Integer),
+            column("score", Integer),
+            column("passed", Boolean),
+            name="scored"
+        ).data(rows[start:start + UPDATE_CHUNK_SIZE])
+
+        await db.execute(
+            update(TestAttempt)
+            .where(TestAttempt.id == scored.c.id)
+            .values(score=scored.c.score, passed=scored.c.passed)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def rebuild_attempt_summaries(test_id: int, db: AsyncSession) -> None:
+    """
+    Пересчёт лучшего балла и серии неудач в test_attempt_summary
+    по истории попыток теста (нужен после изменения баллов).
+    """
+    attempts = (
+        select(
+            TestAttempt.id, TestAttempt.user_id, TestAttempt.test_id,
+            TestAttempt.attempt_number, TestAttempt.score, TestAttempt.finished_at,
+            func.max(TestAttempt.attempt_number)
+            .filter(TestAttempt.passed.is_(True))
+            .over(partition_by=(TestAttempt.user_id, TestAttempt.test_id))
+            .label("last_passed")
+        )
+        .where(TestAttempt.test_id == test_id)
+        .subquery("attempts")
+    )
+    finished = attempts.c.finished_at.is_not(None)
+    aggregated = (
+        select(
+            attempts.c.user_id,
+            attempts.c.test_id,
+            func.max(attempts.c.attempt_number),
+            func.max(attempts.c.score),
+            func.count().filter(
+                and_(
+                    finished,
+                    attempts.c.attempt_number > func.coalesce(attempts.c.last_passed, 0)
+                )
+            ),
+            func.max(attempts.c.id).filter(~finished)
+        )
+        .group_by(attempts.c.user_id, attempts.c.test_id)
+    )
+
+    stmt = pg_insert(TestAttemptSummary).from_select(
+        [
+            "user_id", "test_id", "attempt_count",
+            "best_score", "fail_streak", "active_attempt_id"
+        ],
+        aggregated
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TestAttemptSummary.user_id, TestAttemptSummary.test_id],
+            set_={
+                "best_score": stmt.excluded.best_score,
+                "fail_streak": stmt.excluded.fail_streak
+            }
+        )
+    )
+
+
+async def regrade_test(
+        test_id: int, db: AsyncSession,
+        batch_size: Optional[int] = None
+) -> dict:
+    """
+    Пересчёт всех ответов теста после изменения ключа ответов.
+
+    Попытки читаются пачками по id, оцениваются векторизованно
+    и записываются обратно через UPDATE ... FROM (VALUES ...).
+    Балл и passed пересчитываются только у завершённых попыток.
+    Сводки попыток, счётчики аналитики и воронки пересобираются в конце
+    одной транзакцией под advisory-блокировкой теста: попытки, завершённые
+    во время пересчёта, и параллельные пересчёты не учитываются дважды.
+    """
+    batch_size = batch_size or settings.REGRADE_BATCH_SIZE
+    test = await get_test_snapshot(test_id, db)
+    if not test:
+        return {"test_id": test_id, "attempts": 0, "answers": 0}
+
+    masks = QuestionMasks(test.questions)
+    last_attempt_id = 0
+    attempts_total = 0
+    answers_total = 0
+
+    while True:
+        attempts_result = await db.execute(
+            select(TestAttempt.id, TestAttempt.finished_at.is_not(None))
+            .where(
+                and_(
+                    TestAttempt.test_id == test_id,
+                    TestAttempt.id > last_attempt_id
+                )
+            )
+            .order_by(TestAttempt.id)
+            .limit(batch_size)
+        )
+        attempts = attempts_result.all()
+        if not attempts:
+            break
+
+        # Ключ могли изменить ещё раз по ходу пересчёта (и запустить параллельный
+        # пересчёт) - каждая пачка оценивается по актуальному снимку теста
+        current = await get_test_snapshot(test_id, db)
+        if not current:
+            break
+        if current is not test:
+            test = current
+            masks = QuestionMasks(test.questions)
+        total_questions = len(test.questions)
+
+        attempt_ids = np.array([a[0] for a in attempts], dtype=np.int64)
+        finished = np.array([a[1] for a in attempts], dtype=bool)
+        last_attempt_id = int(attempt_ids[-1])
+
+        answers_result = await db.execute(
+            select(
+                QuestionAttempt.id, QuestionAttempt.test_attempt_id,
+                QuestionAttempt.question_id, QuestionAttempt.selected_option_ids
+            )
+            .where(QuestionAttempt.test_attempt_id.in_(attempt_ids.tolist()))
+        )
+        answers = answers_result.all()
+
+        if answers:
+            is_correct, partial_score = score_answers_vectorized(
+                masks,
+                [a.question_id for a in answers],
+                [a.selected_option_ids for a in answers]
+            )
+            await update_question_attempts(
+                to_python_rows(
+                    np.array([a.id for a in answers], dtype=np.int64),
+                    is_correct, partial_score
+                ),
+                db
+            )
+            attempt_index = np.searchsorted(
+                attempt_ids,
+                np.array([a.test_attempt_id for a in answers], dtype=np.int64)
+            )
+        else:
+            partial_score = np.zeros(0, dtype=np.float64)
+            attempt_index = np.zeros(0, dtype=np.int64)
+
+        scores = attempt_scores(
+            attempt_index, partial_score, len(attempt_ids), total_questions
+        )
+        await update_attempt_scores(
+            to_python_rows(
+                attempt_ids[finished], scores[finished],
+                scores[finished] >= test.pass_threshold
+            ),
+            db
+        )
+        await db.commit()
+
+        attempts_total += len(attempt_ids)
+        answers_total += len(answers)
+
+    await rebuild_test_analytics(test_id, batch_size, db)
+    await rebuild_attempt_summaries(test_id, db)
+    if test.material_id:
+        await rebuild_material_funnel([test.material_id], db)
+    await db.commit()
+
+    print(f"🔁 Regraded test {test_id}: {attempts_total} attempts, {answers_total} answers")
+
+    return {"test_id": test_id, "attempts": attempts_total, "answers": answers_total}
+
+
+async def run_regrade_test_job(payload: dict, progress) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await regrade_test(payload["test_id"], db)
+
+
+async def check_regrade_access(
+        course_id: int, module_id: int,
+        material_id: int, test_id: int,
+        user: User, db: AsyncSession
+) -> None:
+    await check_course_access(course_id, user, db)
+    result = await db.execute(
+        select(Test.id)
+        .join(Material)
+        .join(Module)
+        .where(
+            and_(
+                Test.id == test_id,
+                Material.id == material_id,
+                Module.id == module_id,
+                Module.course_id == course_id
+            )
+        )
+    )
+    if not result.scalar_one_or_none():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
@@ -0,0 +1,205 @@
+import csv
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.config import settings
+from helpers.files.upload_stream_helper import iter_csv_rows
+from models import (
+    User, Role, Module, Material,
+    CourseEnrollment, CourseProgress, CourseApplication
+)
+from models.Enums import RoleType, ApplicationStatus
+from service.course_service import check_course_access
+
+
+async def enroll_users(
+        course_id: int, user_ids: Set[int],
+        total_items: int, reviewer: User,
+        db: AsyncSession
+) -> Set[int]:
+    """
+    Запись пользователей на курс одним INSERT ... SELECT ... ON CONFLICT DO NOTHING
+    вместе с CourseProgress. Возвращает id тех, кто записан впервые.
+    """
+    if not user_ids:
+        return set()
+
+    result = await db.execute(
+        pg_insert(CourseEnrollment)
+        .from_select(
+            ["user_id", "course_id"],
+            select(User.id, literal(course_id)).where(User.id.in_(user_ids))
+        )
+        .on_conflict_do_nothing(
+            index_elements=[CourseEnrollment.user_id, CourseEnrollment.course_id]
+        )
+        .returning(CourseEnrollment.user_id)
+    )
+    enrolled = set(result.scalars().all())
+    if not enrolled:
+        return enrolled
+
+    await db.execute(
+        pg_insert(CourseProgress)
+        .from_select(
+            ["user_id", "course_id", "completed_items", "total_items"],
+            select(User.id, literal(course_id), literal(0), literal(total_items))
+            .where(User.id.in_(enrolled))
+        )
+        .on_conflict_do_nothing(constraint="uq_user_course_progress")
+    )
+
+    # Ожидающие заявки записанных студентов считаются одобренными
+    await db.execute(
+        update(CourseApplication)
+        .where(
+            and_(
+                CourseApplication.course_id == course_id,
+                CourseApplication.user_id.in_(enrolled),
+                CourseApplication.status == ApplicationStatus.pending
+            )
+        )
+        .values(
+            status=ApplicationStatus.approved,
+            reviewed_at=datetime.utcnow(),
+            reviewed_by=reviewer.id
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    return enrolled
+
+
+async def import_roster_batch(
+        course_id: int, rows: List[Tuple[int, Dict[str, str]]],
+        total_items: int, user: User,
+        db: AsyncSession, report: list
+) -> None:
+    emails = {row["email"] for _, row in rows if row.get("email")}
+    groups = {
+        row["group_name"] for _, row in rows
+        if not row.get("email") and row.get("group_name")
+    }
+
+    users_by_email: Dict[str, int] = {}
+    if emails:
+        result = await db.execute(
+            select(User.email, User.id).where(User.email.in_(emails))
+        )
+        users_by_email = dict(result.all())
+
+    group_members: Dict[str, List[int]] = {}
+    if groups:
+        result = await db.execute(
+            select(User.group_name, User.id)
+            .join(Role, Role.id == User.role_id)
+            .where(
+                and_(
+                    User.group_name.in_(groups),
+                    Role.name == RoleType.student
+                )
+            )
+        )
+        for group_name, user_id in result.all():
+            group_members.setdefault(group_name, []).append(user_id)
+
+    user_ids = set(users_by_email.values())
+    for members in group_members.values():
+        user_ids.update(members)
+
+    enrolled = await enroll_users(course_id, user_ids, total_items, user, db)
+    await db.commit()
+
+    # Каждый новый студент засчитывается только первой строке, где он встретился
+    reported: Set[int] = set()
+    for line, row in rows:
+        email = row.get("email") or None
+        group_name = row.get("group_name") or None
+
+        if email:
+            user_id = users_by_email.get(email)
+            new_ids = [user_id] if user_id in enrolled and user_id not in reported else []
+            found = user_id is not None
+        elif group_name:
+            members = group_members.get(group_name, [])
+            new_ids = [m for m in members if m in enrolled and m not in reported]
+            found = bool(members)
+        else:
+            report.append({"row": line, "status": "invalid"})
+            continue
+
+        reported.update(new_ids)
+        if not found:
+            row_status = "not_found"
+        elif new_ids:
+            row_status = "enrolled"
+        else:
+            row_status = "already_enrolled"
+
+        report.append({
+            "row": line,
+            "email": email,
+            "group_name": group_name,
+            "status": row_status,
+            "enrolled": len(new_ids)
+        })
+
+
+async def import_roster(
+        course_id: int, file: UploadFile,
+        user: User, db: AsyncSession
+) -> dict:
+    """
+    Запись студентов на курс по CSV со столбцами email и/или group_name.
+    Файл разбирается построчно, строки обрабатываются пачками.
+    """
+    await check_course_access(course_id, user, db, require_creator=False)
+    if Path(file.filename or "").suffix.lower() != ".csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Roster must be a .csv file"
+        )
+
+    total_result = await db.execute(
+        select(func.count(Material.id))
+        .join(Module, Material.module_id == Module.id)
+        .where(Module.course_id == course_id)
+    )
+    total_items = total_result.scalar()
+
+    report = []
+    batch = []
+    try:
+        async for line, row in iter_csv_rows(file):
+            if not report and not batch and "email" not in row and "group_name" not in row:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Roster must have an email or group_name column"
+                )
+
+            batch.append((line, row))
+            if len(batch) >= settings.ROSTER_IMPORT_BATCH_SIZE:
+                await import_roster_batch(course_id, batch, total_items, user, db, report)
+                batch = []
+
+        if batch:
+            await import_roster_batch(course_id, batch, total_items, user, db, report)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Roster must be UTF-8 encoded"
+        )
+    except csv.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid CSV: {str(e)}"
+        )
+
+    enrolled = sum(r.get("enrolled", 0) for r in report)
+    print(f"📋 Roster import for course {course_id}: {len(report)} rows, {enrolled} enrolled")
+
+    return {"total_rows": len(report), "enrolled": enrolled, "rows": report}
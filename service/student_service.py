@@ -24,6 +24,7 @@ from helpers.students.course_loader import (
     load_module_with_materials, load_course_modules_with_materials,
     get_course_with_progress_data
 )
+from service.funnel_service import record_material_completion
 
 
 # COURSE CATALOG
@@ -355,6 +356,7 @@ async def mark_material_completed(
 
     progress = LessonProgress(user_id=user.id, lesson_id=material_id)
     db.add(progress)
+    await record_material_completion(material_id, course_id, db)
     await db.commit()
     await db.refresh(progress)
     await update_course_progress(user.id, course_id, db)
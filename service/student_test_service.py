@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, cast, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 from typing import Dict, Any, List
@@ -7,18 +8,25 @@ from datetime import datetime, timedelta
 from helpers.test_helper_service import (
     check_course_enrollment, get_test_attempt_with_validation,
     validate_attempt_not_finished, validate_attempt_finished,
-    get_test_attempt_by_id
+    get_test_attempt_by_id, validate_attempt_deadline, is_attempt_expired,
+    get_attempt_summary_for_update, round_score
+)
+from helpers.test_snapshot import (
+    TestSnapshot, QuestionSnapshot, get_test_snapshot
 )
 from models import (
     Test, Question, TestAttempt, QuestionAttempt,
     Material, Module, CourseEnrollment, User
 )
 from models.Enums import QuestionType
+from schemas.student_tests import SubmitAnswerRequest
+from service.item_analytics_service import record_attempt_analytics, lock_test_analytics
+from service.funnel_service import record_material_passes
 
 
 # TODO: могут быть ошибки
 def calculate_question_score(
-        question: Question,
+        question: QuestionSnapshot,
         selected_option_ids: List[int]
 ) -> tuple[bool, float]:
     """
@@ -30,13 +38,13 @@ def calculate_question_score(
         - partial_score: float - частичный балл от 0.0 до 1.0
     """
     if question.type == QuestionType.single:
-        correct_ids = {opt.id for opt in question.options if opt.is_correct}
+        correct_ids = question.correct_ids
         selected_ids = set(selected_option_ids)
         is_correct = correct_ids == selected_ids
         return is_correct, 1.0 if is_correct else 0.0
 
     elif question.type == QuestionType.multiple:
-        correct_ids = {opt.id for opt in question.options if opt.is_correct}
+        correct_ids = question.correct_ids
         selected_ids = set(selected_option_ids)
 
         if correct_ids == selected_ids:
@@ -57,38 +65,33 @@ def calculate_question_score(
         return False, 0.0
 
 
+async def get_test_snapshot_or_404(test_id: int, db: AsyncSession) -> TestSnapshot:
+    test = await get_test_snapshot(test_id, db)
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    return test
+
+
 async def get_test_for_student(
         course_id: int, module_id: int,
         material_id: int, test_id: int,
         user: User, db: AsyncSession
 ):
     await check_course_enrollment(course_id, user, db)
-    result = await db.execute(
-        select(Test)
-        .options(
-            selectinload(Test.questions).selectinload(Question.options)
-        )
-        .join(Material)
-        .join(Module)
-        .where(
-            and_(
-                Test.id == test_id,
-                Material.id == material_id,
-                Module.id == module_id,
-                Module.course_id == course_id,
-                Test.status == "published"
-            )
-        )
-    )
-    test = result.scalar_one_or_none()
-    if not test:
+    test = await get_test_snapshot(test_id, db)
+    if (
+            not test
+            or test.status != "published"
+            or not test.belongs_to(course_id, module_id, material_id)
+    ):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found or not published"
         )
 
-    test.questions.sort(key=lambda q: q.position)
-
     questions_data = []
     for question in test.questions:
         options_data = [
@@ -125,61 +128,96 @@ async def start_test_attempt(
         course_id, module_id,
         material_id, test_id, user, db
     )
-    active_attempt_result = await db.execute(
-        select(TestAttempt).where(
-            and_(
-                TestAttempt.test_id == test_id,
-                TestAttempt.user_id == user.id,
-                TestAttempt.finished_at.is_(None)
-            )
-        )
-    )
-    active_attempt = active_attempt_result.scalar_one_or_none()
-    if active_attempt:
+    summary = await get_attempt_summary_for_update(user.id, test_id, db)
+    if summary.active_attempt_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have an active test attempt. Please finish it first."
         )
-    blocked_attempt_result = await db.execute(
-        select(TestAttempt).where(
-            and_(
-                TestAttempt.test_id == test_id,
-                TestAttempt.user_id == user.id,
-                TestAttempt.blocked_until.isnot(None),
-                TestAttempt.blocked_until > datetime.utcnow()
-            )
-        )
-    )
-    blocked_attempt = blocked_attempt_result.scalar_one_or_none()
-    if blocked_attempt:
+    if summary.blocked_until and summary.blocked_until > datetime.utcnow():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"You are blocked from taking this test until {blocked_attempt.blocked_until}"
+            detail=f"You are blocked from taking this test until {summary.blocked_until}"
         )
 
-    max_attempt_result = await db.execute(
-        select(func.max(TestAttempt.attempt_number)).where(
-            and_(
-                TestAttempt.test_id == test_id,
-                TestAttempt.user_id == user.id
-            )
-        )
-    )
-    max_attempt = max_attempt_result.scalar() or 0
+    started_at = datetime.utcnow()
+    deadline_at = None
+    if test["time_limit_seconds"]:
+        deadline_at = started_at + timedelta(seconds=test["time_limit_seconds"])
 
     attempt = TestAttempt(
         test_id=test_id,
         user_id=user.id,
-        attempt_number=max_attempt + 1
+        attempt_number=summary.attempt_count + 1,
+        started_at=started_at,
+        deadline_at=deadline_at
     )
 
     db.add(attempt)
+    await db.flush()
+    summary.attempt_count = attempt.attempt_number
+    summary.active_attempt_id = attempt.id
     await db.commit()
     await db.refresh(attempt)
 
     return attempt
 
 
+def build_question_attempt_values(
+        attempt_id: int, question: QuestionSnapshot,
+        answer_data: Dict[str, Any], hint_used: bool
+) -> Dict[str, Any]:
+    selected_ids = answer_data.get("selected_option_ids")
+    if selected_ids is not None and (
+            not isinstance(selected_ids, list)
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in selected_ids)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="selected_option_ids must be a list of integers"
+        )
+
+    is_fully_correct = False
+    partial_score = 0.0
+    if question.type in [QuestionType.single, QuestionType.multiple]:
+        is_fully_correct, partial_score = calculate_question_score(question, selected_ids or [])
+
+    # Выбор и балл хранятся в типизированных колонках, в JSONB - только остальное
+    free_answer = {
+        key: value for key, value in answer_data.items()
+        if key not in ("selected_option_ids", "partial_score")
+    }
+
+    return {
+        "test_attempt_id": attempt_id,
+        "question_id": question.id,
+        "answer": free_answer or None,
+        "selected_option_ids": selected_ids,
+        "partial_score": partial_score,
+        "is_correct": is_fully_correct,
+        "hint_used": hint_used,
+        "attempt_number": 1
+    }
+
+
+async def insert_question_attempts(
+        rows: List[Dict[str, Any]], db: AsyncSession
+) -> List[QuestionAttempt]:
+    """
+    Вставка ответов одним INSERT ... ON CONFLICT DO NOTHING.
+    Возвращает только реально вставленные строки: повторные ответы
+    (в том числе от параллельных запросов) пропускаются без ошибки.
+    """
+    stmt = (
+        pg_insert(QuestionAttempt)
+        .values(rows)
+        .on_conflict_do_nothing(constraint="uq_test_question_attempt")
+        .returning(QuestionAttempt)
+    )
+    result = await db.scalars(stmt)
+    return list(result.all())
+
+
 async def submit_answer(
         course_id: int, module_id: int,
         material_id: int, test_id: int,
@@ -189,63 +227,90 @@ async def submit_answer(
         db: AsyncSession
 ):
     attempt = await get_test_attempt_with_validation(
-        attempt_id, test_id, user, db, load_test=True
+        attempt_id, test_id, user, db
     )
 
     await validate_attempt_not_finished(attempt)
+    await validate_attempt_deadline(attempt)
 
-    question_result = await db.execute(
-        select(Question)
-        .options(selectinload(Question.options))
-        .where(Question.id == question_id)
-    )
-    question = question_result.scalar_one_or_none()
-    if not question or question.test_id != test_id:
+    test = await get_test_snapshot_or_404(test_id, db)
+    question = test.questions_by_id.get(question_id)
+    if not question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found in this test"
         )
 
-    existing_answer_result = await db.execute(
-        select(QuestionAttempt).where(
-            and_(
-                QuestionAttempt.test_attempt_id == attempt_id,
-                QuestionAttempt.question_id == question_id
-            )
-        )
+    inserted = await insert_question_attempts(
+        [build_question_attempt_values(attempt_id, question, answer_data, hint_used)],
+        db
     )
-    existing_answer = existing_answer_result.scalar_one_or_none()
-    if existing_answer:
+    if not inserted:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already answered this question"
         )
 
-    is_fully_correct = False
-    partial_score = 0.0
-    if question.type in [QuestionType.single, QuestionType.multiple]:
-        selected_ids = answer_data.get("selected_option_ids", [])
-        is_fully_correct, partial_score = calculate_question_score(question, selected_ids)
-
-    answer_data_with_score = answer_data.copy()
-    answer_data_with_score["partial_score"] = partial_score
-
-    question_attempt = QuestionAttempt(
-        test_attempt_id=attempt_id,
-        question_id=question_id,
-        answer=answer_data_with_score,
-        is_correct=is_fully_correct,
-        hint_used=hint_used,
-        attempt_number=1
+    attempt.current_question_id = question_id
+    await db.commit()
+
+    return inserted[0]
+
+
+async def submit_answers_batch(
+        course_id: int, module_id: int,
+        material_id: int, test_id: int,
+        attempt_id: int, answers: List[SubmitAnswerRequest],
+        user: User, db: AsyncSession
+):
+    attempt = await get_test_attempt_with_validation(
+        attempt_id, test_id, user, db
     )
 
-    db.add(question_attempt)
-    attempt.current_question_id = question_id
+    await validate_attempt_not_finished(attempt)
+    await validate_attempt_deadline(attempt)
+
+    test = await get_test_snapshot_or_404(test_id, db)
+    if len(answers) > len(test.questions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many answers: test has {len(test.questions)} questions"
+        )
+
+    rows = []
+    submitted_ids = []
+    for item in answers:
+        question = test.questions_by_id.get(item.question_id)
+        if not question:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Question {item.question_id} not found in this test"
+            )
+        if item.question_id in submitted_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Question {item.question_id} is answered more than once"
+            )
+
+        rows.append(build_question_attempt_values(
+            attempt_id, question, item.answer, item.hint_used
+        ))
+        submitted_ids.append(item.question_id)
+
+    inserted = await insert_question_attempts(rows, db)
+    inserted_map = {qa.question_id: qa for qa in inserted}
+    if inserted_map:
+        attempt.current_question_id = next(
+            q_id for q_id in reversed(submitted_ids) if q_id in inserted_map
+        )
 
     await db.commit()
-    await db.refresh(question_attempt)
 
-    return question_attempt
+    return {
+        "answers": [inserted_map[q_id] for q_id in submitted_ids if q_id in inserted_map],
+        "skipped_question_ids": [q_id for q_id in submitted_ids if q_id not in inserted_map]
+    }
 
 
 async def finish_test_attempt(
@@ -255,56 +320,50 @@ async def finish_test_attempt(
         db: AsyncSession
 ):
     attempt = await get_test_attempt_with_validation(
-        attempt_id, test_id, user, db,
-        load_test=True, load_questions=True, load_answers=True
+        attempt_id, test_id, user, db, for_update=True
     )
     await validate_attempt_not_finished(attempt)
 
-    total_questions = len(attempt.test.questions)
-    answered_questions = len(attempt.question_attempts)
-    if answered_questions < total_questions:
+    test = await get_test_snapshot_or_404(test_id, db)
+    total_questions = len(test.questions)
+    answers_result = await db.execute(
+        select(
+            func.count(QuestionAttempt.id),
+            func.coalesce(func.sum(cast(QuestionAttempt.partial_score, Float)), 0.0)
+        )
+        .where(QuestionAttempt.test_attempt_id == attempt_id)
+    )
+    answered_questions, total_score = answers_result.one()
+    # После истечения времени неотвеченные вопросы засчитываются как 0
+    if answered_questions < total_questions and not is_attempt_expired(attempt):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"You must answer all questions. Answered: {answered_questions}/{total_questions}"
         )
 
-    total_score = 0.0
-    for qa in attempt.question_attempts:
-        partial_score = qa.answer.get("partial_score", 1.0 if qa.is_correct else 0.0)
-        total_score += partial_score
-
-    score = round((total_score / total_questions * 100)) if total_questions > 0 else 0
-    passed = score >= attempt.test.pass_threshold
+    score = round_score(total_score / total_questions * 100) if total_questions > 0 else 0
+    passed = score >= test.pass_threshold
 
     attempt.finished_at = datetime.utcnow()
     attempt.score = score
     attempt.passed = passed
 
-    consecutive_fails = 0
-    if not passed:
-        previous_attempts_result = await db.execute(
-            select(TestAttempt)
-            .where(
-                and_(
-                    TestAttempt.test_id == test_id,
-                    TestAttempt.user_id == user.id,
-                    TestAttempt.id < attempt_id
-                )
-            )
-            .order_by(TestAttempt.attempt_number.desc())
-        )
-        previous_attempts = list(previous_attempts_result.scalars().all())
-
-        consecutive_fails = 1
-        for prev_attempt in previous_attempts:
-            if prev_attempt.attempt_number == attempt.attempt_number - consecutive_fails and not prev_attempt.passed:
-                consecutive_fails += 1
-            else:
-                break
-
-        if consecutive_fails >= 2:
-            attempt.blocked_until = datetime.utcnow() + timedelta(minutes=5)
-
+    # До блокировки сводки: пересборка при regrade берёт их в том же порядке
+    await lock_test_analytics([test_id], db)
+    summary = await get_attempt_summary_for_update(user.id, test_id, db)
+    consecutive_fails = 0 if passed else summary.fail_streak + 1
+    if consecutive_fails >= 2:
+        attempt.blocked_until = attempt.finished_at + timedelta(minutes=5)
+
+    summary.fail_streak = consecutive_fails
+    summary.blocked_until = attempt.blocked_until
+    summary.best_score = max(score, summary.best_score or 0)
+    if summary.active_attempt_id == attempt.id:
+        summary.active_attempt_id = None
+
+    await db.flush()
+    await record_attempt_analytics([attempt.id], db)
+    await record_material_passes([attempt.id], db)
     await db.commit()
     await db.refresh(attempt)
 
@@ -326,6 +385,7 @@ async def finish_test_attempt(
         "attempt_number": attempt.attempt_number,
         "started_at": attempt.started_at,
         "finished_at": attempt.finished_at,
+        "deadline_at": attempt.deadline_at,
         "blocked_until": attempt.blocked_until,
         "current_question_id": attempt.current_question_id,
         "blocked": attempt.blocked_until is not None,
@@ -336,24 +396,22 @@ async def finish_test_attempt(
 
 async def get_test_result(attempt_id: int, user: User, db: AsyncSession):
     attempt = await get_test_attempt_by_id(
-        attempt_id, user, db,
-        load_test=True, load_questions=True, load_answers=True
+        attempt_id, user, db, load_answers=True
     )
     await validate_attempt_finished(attempt)
+    test = await get_test_snapshot_or_404(attempt.test_id, db)
     answers_map = {qa.question_id: qa for qa in attempt.question_attempts}
     questions_results = []
-    for question in attempt.test.questions:
+    for question in test.questions:
         correct_option_ids = [opt.id for opt in question.options if opt.is_correct]
         student_answer = answers_map.get(question.id)
 
-        partial_score = 0.0
-        if student_answer and student_answer.answer:
-            partial_score = student_answer.answer.get("partial_score", 0.0)
+        partial_score = student_answer.partial_score if student_answer else 0.0
 
         question_result = {
             "question_id": question.id,
             "question_text": question.text,
-            "student_answer": student_answer.answer if student_answer else None,
+            "student_answer": student_answer.answer_data if student_answer else None,
             "correct_option_ids": correct_option_ids,
             "is_correct": student_answer.is_correct if student_answer else False,
             "hint_used": student_answer.hint_used if student_answer else False,
@@ -364,11 +422,11 @@ async def get_test_result(attempt_id: int, user: User, db: AsyncSession):
     return {
         "attempt_id": attempt.id,
         "test_id": attempt.test_id,
-        "test_title": attempt.test.title,
+        "test_title": test.title,
         "attempt_number": attempt.attempt_number,
         "started_at": attempt.started_at,
         "finished_at": attempt.finished_at,
-        "total_questions": len(attempt.test.questions),
+        "total_questions": len(test.questions),
         "correct_answers": sum(1 for qa in attempt.question_attempts if qa.is_correct),
         "score": attempt.score,
         "passed": attempt.passed,
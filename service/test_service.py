@@ -1,15 +1,40 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from typing import List
+from sqlalchemy import select, insert, update, delete, and_, or_, func, values, column
+from sqlalchemy import Integer, Text, Boolean
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
-from models import Test, Question, AnswerOption, Material, User, Module
+from models import Test, Question, AnswerOption, QuestionAttempt, Material, User, Module
 from models.Enums import QuestionType
 from schemas.tests import (
     TestCreateRequest, TestUpdateRequest,
     QuestionCreateRequest, QuestionUpdateRequest,
-    AnswerOptionCreate, AnswerOptionUpdate
+    AnswerOptionCreate, AnswerOptionUpdate,
+    QuestionDocument, TestDocumentRequest
 )
 from service.course_service import check_course_access
+from service.funnel_service import rebuild_material_funnel
+from helpers.test_snapshot import invalidate_test_snapshot
+
+
+def validate_question_options(question_type: QuestionType, options: list) -> None:
+    if question_type in [QuestionType.single, QuestionType.multiple]:
+        if not options or len(options) < 2:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Question type '{question_type}' requires at least 2 options"
+            )
+        correct_count = sum(1 for opt in options if opt.is_correct)
+        if question_type == QuestionType.single and correct_count != 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Single choice question must have exactly 1 correct answer"
+            )
+        if question_type == QuestionType.multiple and correct_count < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Multiple choice question must have at least 1 correct answer"
+            )
 
 
 # TESTS
@@ -86,8 +111,6 @@ async def get_test_detail(
             detail="Test not found"
         )
 
-    test.questions.sort(key=lambda q: q.position)
-
     return test
 
 
@@ -134,6 +157,7 @@ async def update_test(
             )
         test.status = data.status
 
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
     await db.refresh(test)
 
@@ -167,6 +191,9 @@ async def delete_test(
         )
 
     await db.delete(test)
+    await db.flush()
+    # Сдачи удалённого теста больше не учитываются в воронке материала
+    await rebuild_material_funnel([material_id], db)
     await db.commit()
 
 
@@ -199,23 +226,7 @@ async def create_question(
             detail="Test not found"
         )
 
-    if data.type in [QuestionType.single, QuestionType.multiple]:
-        if not data.options or len(data.options) < 2:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Question type '{data.type}' requires at least 2 options"
-            )
-        correct_count = sum(1 for opt in data.options if opt.is_correct)
-        if data.type == QuestionType.single and correct_count != 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Single choice question must have exactly 1 correct answer"
-            )
-        if data.type == QuestionType.multiple and correct_count < 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Multiple choice question must have at least 1 correct answer"
-            )
+    validate_question_options(data.type, data.options)
 
     question = Question(
         test_id=test_id,
@@ -237,6 +248,7 @@ async def create_question(
             )
             db.add(option)
 
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
     await db.refresh(question)
 
@@ -305,6 +317,7 @@ async def update_question(
     if data.hint_text is not None:
         question.hint_text = data.hint_text
 
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
     await db.refresh(question)
 
@@ -341,6 +354,7 @@ async def delete_question(
         )
 
     await db.delete(question)
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
 
 
@@ -391,6 +405,7 @@ async def add_answer_option(
     )
 
     db.add(option)
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
     await db.refresh(option)
 
@@ -449,6 +464,7 @@ async def update_answer_option(
     if data.is_correct is not None:
         option.is_correct = data.is_correct
 
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
     await db.refresh(option)
 
@@ -487,4 +503,224 @@ async def delete_answer_option(
         )
 
     await db.delete(option)
+    await invalidate_test_snapshot(test_id, db)
     await db.commit()
+
+
+# WHOLE TEST
+
+async def apply_test_document(
+        test_id: int, questions: List[QuestionDocument],
+        db: AsyncSession
+) -> bool:
+    """
+    Приведение вопросов и вариантов теста к документу.
+
+    Документ сравнивается с сохранёнными строками, после чего изменения
+    применяются пачками: DELETE ... IN, UPDATE ... FROM (VALUES ...)
+    и множественный INSERT ... RETURNING. Коммит - на вызывающем.
+    Возвращает True, если изменился ключ ответов: состав вопросов
+    и вариантов, тип вопроса или правильность варианта.
+    """
+    questions_result = await db.execute(
+        select(
+            Question.id, Question.text, Question.type,
+            Question.position, Question.hint_text
+        )
+        .where(Question.test_id == test_id)
+    )
+    stored_questions = {row.id: row for row in questions_result.all()}
+    options_result = await db.execute(
+        select(
+            AnswerOption.id, AnswerOption.question_id,
+            AnswerOption.content, AnswerOption.is_correct
+        )
+        .join(Question)
+        .where(Question.test_id == test_id)
+    )
+    stored_options = {row.id: row for row in options_result.all()}
+
+    kept_question_ids = set()
+    kept_option_ids = set()
+    for question in questions:
+        if question.id is not None:
+            if question.id not in stored_questions or question.id in kept_question_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Question {question.id} does not belong to this test"
+                )
+            kept_question_ids.add(question.id)
+        for option in question.options:
+            if option.id is None:
+                continue
+            stored_option = stored_options.get(option.id)
+            if not stored_option or question.id is None or \
+                    stored_option.question_id != question.id or option.id in kept_option_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Answer option {option.id} does not belong to this question"
+                )
+            kept_option_ids.add(option.id)
+
+    removed_question_ids = set(stored_questions) - kept_question_ids
+    if removed_question_ids:
+        answered_result = await db.execute(
+            select(QuestionAttempt.question_id)
+            .where(QuestionAttempt.question_id.in_(removed_question_ids))
+            .limit(1)
+        )
+        answered_question_id = answered_result.scalar_one_or_none()
+        if answered_question_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot delete question {answered_question_id}: students have already answered it"
+            )
+        await db.execute(delete(Question).where(Question.id.in_(removed_question_ids)))
+
+    # Варианты удалённых вопросов удаляются каскадом в БД
+    removed_option_ids = [
+        option_id for option_id, row in stored_options.items()
+        if option_id not in kept_option_ids and row.question_id in kept_question_ids
+    ]
+    if removed_option_ids:
+        await db.execute(delete(AnswerOption).where(AnswerOption.id.in_(removed_option_ids)))
+
+    # Текст, позиция, подсказка и содержимое вариантов на оценку не влияют
+    key_changed = bool(removed_question_ids or removed_option_ids)
+    changed_questions = []
+    changed_options = []
+    for question in questions:
+        if question.id is not None:
+            stored = stored_questions[question.id]
+            row = (question.id, question.text, question.type, question.position, question.hint_text)
+            if row != (stored.id, stored.text, stored.type, stored.position, stored.hint_text):
+                changed_questions.append(row)
+                key_changed = key_changed or question.type != stored.type
+        for option in question.options:
+            if option.id is None:
+                key_changed = True
+                continue
+            stored = stored_options[option.id]
+            if (option.content, option.is_correct) != (stored.content, stored.is_correct):
+                changed_options.append((option.id, option.content, option.is_correct))
+                key_changed = key_changed or option.is_correct != stored.is_correct
+
+    if changed_questions:
+        changed = values(
+            column("id", Integer),
+            column("text", Text),
+            column("type", Question.__table__.c.type.type),
+            column("position", Integer),
+            column("hint_text", Text),
+            name="changed"
+        ).data(changed_questions)
+        await db.execute(
+            update(Question)
+            .where(Question.id == changed.c.id)
+            .values(
+                text=changed.c.text,
+                type=changed.c.type,
+                position=changed.c.position,
+                hint_text=changed.c.hint_text
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if changed_options:
+        changed = values(
+            column("id", Integer),
+            column("content", Text),
+            column("is_correct", Boolean),
+            name="changed"
+        ).data(changed_options)
+        await db.execute(
+            update(AnswerOption)
+            .where(AnswerOption.id == changed.c.id)
+            .values(content=changed.c.content, is_correct=changed.c.is_correct)
+            .execution_options(synchronize_session=False)
+        )
+
+    new_questions = [q for q in questions if q.id is None]
+    new_question_ids = []
+    if new_questions:
+        key_changed = True
+        inserted = await db.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [
+                {
+                    "test_id": test_id,
+                    "text": q.text,
+                    "type": q.type,
+                    "position": q.position,
+                    "hint_text": q.hint_text
+                }
+                for q in new_questions
+            ]
+        )
+        new_question_ids = inserted.all()
+
+    new_options = []
+    for question, question_id in zip(new_questions, new_question_ids):
+        new_options.extend(
+            {"question_id": question_id, "content": o.content, "is_correct": o.is_correct}
+            for o in question.options
+        )
+    for question in questions:
+        if question.id is not None:
+            new_options.extend(
+                {"question_id": question.id, "content": o.content, "is_correct": o.is_correct}
+                for o in question.options if o.id is None
+            )
+    if new_options:
+        await db.execute(insert(AnswerOption), new_options)
+
+    return key_changed
+
+
+async def save_test_document(
+        course_id: int, module_id: int,
+        material_id: int, test_id: int,
+        data: TestDocumentRequest,
+        user: User, db: AsyncSession
+):
+    """Возвращает (тест с вопросами, изменился ли ключ ответов)"""
+    await check_course_access(course_id, user, db)
+    result = await db.execute(
+        select(Test)
+        .join(Material)
+        .join(Module)
+        .where(
+            and_(
+                Test.id == test_id,
+                Material.id == material_id,
+                Module.id == module_id,
+                Module.course_id == course_id
+            )
+        )
+        .with_for_update(of=Test)
+    )
+    test = result.scalar_one_or_none()
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+
+    for question in data.questions:
+        validate_question_options(question.type, question.options)
+
+    key_changed = await apply_test_document(test_id, data.questions, db)
+
+    test.title = data.title
+    test.time_limit_seconds = data.time_limit_seconds
+    test.pass_threshold = data.pass_threshold
+    test.status = data.status
+    test.num_questions = len(data.questions)
+
+    await invalidate_test_snapshot(test_id, db)
+    await db.commit()
+
+    test_detail = await get_test_detail(
+        course_id, module_id, material_id,
+        test_id, user, db
+    )
+    return test_detail, key_changed
@@ -0,0 +1,282 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+from uuid import uuid4
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from models import User, File
+from schemas.file import UploadSessionCreateRequest, FileLookupRequest
+from service.file_service import (
+    validate_extension, store_uploaded_file, find_file_by_hash, UPLOAD_CHUNK_SIZE
+)
+
+# Состояние SHA-256 по уже принятой части: (offset, hasher). Объект hashlib
+# не сериализуется - после рестарта или на другом воркере хеш досчитывается по файлу
+session_hashers: Dict[str, tuple] = {}
+
+
+def session_dir() -> Path:
+    return Path(settings.UPLOAD_SESSION_DIR)
+
+
+def session_paths(upload_id: str) -> Tuple[Path, Path]:
+    """(данные, метаданные) сессии загрузки"""
+    return session_dir() / f"{upload_id}.part", session_dir() / f"{upload_id}.json"
+
+
+def hash_prefix(part_path: Path, length: int):
+    hasher = hashlib.sha256()
+    with open(part_path, "rb") as file:
+        remaining = length
+        while remaining and (chunk := file.read(min(UPLOAD_CHUNK_SIZE, remaining))):
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+def session_hasher(upload_id: str, part_path: Path, offset: int):
+    cached = session_hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+    return hash_prefix(part_path, offset)
+
+
+def session_response(upload_id: str, meta: dict, offset: int) -> dict:
+    return {
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "offset": offset,
+        "chunk_size": settings.UPLOAD_SESSION_CHUNK_SIZE,
+        "created_at": meta["created_at"]
+    }
+
+
+def load_session(upload_id: str, user: User) -> Tuple[Path, dict]:
+    part_path, meta_path = session_paths(upload_id)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (FileNotFoundError, ValueError):
+        meta = None
+
+    # Чужая сессия неотличима от несуществующей
+    if meta is None or meta["user_id"] != user.id or not part_path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    return part_path, meta
+
+
+def create_session_files(upload_id: str, meta: dict) -> None:
+    part_path, meta_path = session_paths(upload_id)
+    session_dir().mkdir(parents=True, exist_ok=True)
+    part_path.touch()
+    with open(meta_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+
+
+async def create_upload_session(data: UploadSessionCreateRequest, user: User) -> dict:
+    """Начало возобновляемой загрузки: пустой .part и метаданные в UPLOAD_SESSION_DIR"""
+    validate_extension(data.filename)
+    if data.size > settings.UPLOAD_SESSION_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size exceeds maximum allowed size of {settings.UPLOAD_SESSION_MAX_FILE_SIZE / (1024 * 1024)} MB"
+        )
+
+    upload_id = uuid4().hex
+    meta = {
+        "user_id": user.id,
+        "filename": data.filename,
+        "size": data.size,
+        "mime_type": data.mime_type,
+        "sha256": data.sha256.lower() if data.sha256 else None,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    await run_in_threadpool(create_session_files, upload_id, meta)
+    print(f"📤 Upload session {upload_id}: {data.filename} ({data.size} bytes)")
+
+    return session_response(upload_id, meta, 0)
+
+
+async def negotiate_upload(data: FileLookupRequest, user: User, db: AsyncSession) -> dict:
+    """
+    Хеш до загрузки: существующий File возвращается сразу,
+    иначе открывается возобновляемая загрузка с этим хешем для сверки.
+    """
+    existing_file = await find_file_by_hash(data.sha256, data.size, data.filename, db)
+    if existing_file:
+        print(f"♻️ Upload skipped, file {existing_file.id} already exists")
+        return {"exists": True, "file": existing_file, "upload": None}
+
+    upload = await create_upload_session(
+        UploadSessionCreateRequest(
+            filename=data.filename, size=data.size,
+            mime_type=data.mime_type, sha256=data.sha256
+        ),
+        user
+    )
+    return {"exists": False, "file": None, "upload": upload}
+
+
+async def get_upload_session(upload_id: str, user: User) -> dict:
+    part_path, meta = await run_in_threadpool(load_session, upload_id, user)
+    return session_response(upload_id, meta, part_path.stat().st_size)
+
+
+def write_chunk(upload_id: str, part_path: Path, meta: dict, offset: int, chunk: bytes) -> int:
+    """
+    Дозапись куска под flock: параллельные запросы к одной сессии
+    (в т.ч. с разных воркеров) не перемешивают данные и хеш.
+    """
+    with open(part_path, "r+b") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        current = os.fstat(file.fileno()).st_size
+        if offset != current:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Offset mismatch, expected {current}"
+            )
+        if current + len(chunk) > meta["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chunk exceeds declared file size"
+            )
+
+        hasher = session_hasher(upload_id, part_path, current)
+        file.seek(current)
+        try:
+            file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            file.truncate(current)
+            raise
+        hasher.update(chunk)
+        session_hashers[upload_id] = (current + len(chunk), hasher)
+
+        return current + len(chunk)
+
+
+async def append_upload_chunk(
+        upload_id: str, offset: int,
+        body: AsyncIterator[bytes], user: User
+) -> dict:
+    """
+    Приём куска тела запроса с позиции offset. Позиция должна совпадать
+    с уже принятым размером, иначе 409 - клиент узнаёт offset через GET.
+    """
+    part_path, meta = await run_in_threadpool(load_session, upload_id, user)
+
+    chunk = bytearray()
+    async for data in body:
+        chunk.extend(data)
+        if len(chunk) > settings.UPLOAD_SESSION_CHUNK_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunk exceeds {settings.UPLOAD_SESSION_CHUNK_SIZE} bytes"
+            )
+
+    new_offset = await run_in_threadpool(
+        write_chunk, upload_id, part_path, meta, offset, bytes(chunk)
+    )
+    return session_response(upload_id, meta, new_offset)
+
+
+def finish_part(upload_id: str, part_path: Path, meta: dict) -> Tuple[str, str]:
+    """Проверка полноты и хеша; .part переименовывается, чтобы дозапись больше не прошла"""
+    with open(part_path, "rb") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        received = os.fstat(file.fileno()).st_size
+        if received != meta["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload is incomplete: {received} of {meta['size']} bytes received"
+            )
+
+        file_hash = session_hasher(upload_id, part_path, received).hexdigest()
+        if meta["sha256"] and meta["sha256"] != file_hash:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="SHA-256 mismatch, upload the file again"
+            )
+
+        complete_path = part_path.with_suffix(".complete")
+        os.replace(part_path, complete_path)
+
+    return str(complete_path), file_hash
+
+
+async def complete_upload_session(upload_id: str, user: User, db: AsyncSession) -> File:
+    """Завершение загрузки: дальше как в save_file - дедупликация по хешу и запись в хранилище"""
+    part_path, meta = await run_in_threadpool(load_session, upload_id, user)
+    complete_path, file_hash = await run_in_threadpool(finish_part, upload_id, part_path, meta)
+
+    try:
+        db_file = await store_uploaded_file(
+            complete_path, file_hash, meta["size"],
+            meta["filename"], meta["mime_type"], db
+        )
+    except BaseException:
+        # Файл принят полностью - возвращаем сессию, чтобы завершение можно было повторить
+        if os.path.exists(complete_path):
+            os.replace(complete_path, part_path)
+        raise
+
+    await run_in_threadpool(remove_session, upload_id)
+    print(f"✅ Upload session {upload_id} completed as file {db_file.id}")
+
+    return db_file
+
+
+def remove_session(upload_id: str) -> None:
+    session_hashers.pop(upload_id, None)
+    part_path, meta_path = session_paths(upload_id)
+    for path in (part_path, part_path.with_suffix(".complete"), meta_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def abort_upload_session(upload_id: str, user: User) -> None:
+    await run_in_threadpool(load_session, upload_id, user)
+    await run_in_threadpool(remove_session, upload_id)
+
+
+def remove_expired_sessions(max_age: Optional[int] = None) -> int:
+    max_age = max_age or settings.UPLOAD_SESSION_TTL_SECONDS
+    deadline = time.time() - max_age
+    removed = 0
+    if not session_dir().exists():
+        session_hashers.clear()
+        return removed
+
+    for meta_path in session_dir().glob("*.json"):
+        part_path = meta_path.with_suffix(".part")
+        # Возраст - по последней дозаписи, активные загрузки не трогаем
+        last_write = part_path.stat().st_mtime if part_path.exists() else meta_path.stat().st_mtime
+        if last_write < deadline:
+            remove_session(meta_path.stem)
+            removed += 1
+
+    # Сессию могли завершить или удалить на другом воркере - её хеш здесь больше не нужен
+    for upload_id in list(session_hashers):
+        if not session_paths(upload_id)[1].exists():
+            session_hashers.pop(upload_id, None)
+    return removed
+
+
+async def run_upload_session_cleanup() -> None:
+    removed = await run_in_threadpool(remove_expired_sessions)
+    if removed:
+        print(f"🧹 Removed {removed} expired upload sessions")
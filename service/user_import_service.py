@@ -0,0 +1,228 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, MetaData, Table, Column, Integer, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID
+from sqlalchemy.schema import CreateTable
+from core.config import settings
+from core.database import AsyncSessionLocal
+from core.security import hash_passwords
+from helpers.files.upload_stream_helper import (
+    STREAM_CHUNK_SIZE, iter_csv_rows, iter_jsonl_rows
+)
+from models import User, Role
+from models.Enums import RoleType
+from schemas.admin import CreateUserRequest
+
+IMPORT_EXTENSIONS = (".csv", ".jsonl")
+
+# Пачка сначала копируется сюда через COPY, затем переносится в users
+import_metadata = MetaData()
+user_import_table = Table(
+    "user_import", import_metadata,
+    Column("uuid", UUID(as_uuid=True)),
+    Column("email", String(255)),
+    Column("password_hash", String(255)),
+    Column("first_name", String(100)),
+    Column("last_name", String(100)),
+    Column("patronymic", String(100)),
+    Column("group_name", String(100)),
+    Column("role_id", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP"
+)
+IMPORT_COLUMNS = [c.name for c in user_import_table.columns]
+
+
+async def store_import_file(file: UploadFile) -> str:
+    """
+    Копирование загрузки в USER_IMPORT_DIR - каталог виден и API, и worker.py.
+    Файл удаляется после успешного импорта; файл упавшей задачи остаётся
+    для повторов и /jobs/{id}/retry и удаляется по USER_IMPORT_TTL_SECONDS.
+    """
+    ext = Path(file.filename or "").suffix.lower()
+    if ext not in IMPORT_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File extension {ext} is not allowed. Allowed: {', '.join(IMPORT_EXTENSIONS)}"
+        )
+
+    # Запись - в пуле потоков, event loop не блокируется
+    return await run_in_threadpool(write_import_file, file.file, ext)
+
+
+def write_import_file(source: BinaryIO, ext: str) -> str:
+    os.makedirs(settings.USER_IMPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="user_import_", suffix=ext, dir=settings.USER_IMPORT_DIR)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            source.seek(0)
+            shutil.copyfileobj(source, target, STREAM_CHUNK_SIZE)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return path
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+async def copy_users(records: List[tuple], db: AsyncSession) -> Set[str]:
+    """COPY пачки во временную таблицу и INSERT ... SELECT в users с пропуском занятых email"""
+    await db.execute(CreateTable(user_import_table))
+
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        user_import_table.name, records=records, columns=IMPORT_COLUMNS
+    )
+
+    result = await db.execute(
+        pg_insert(User)
+        .from_select(IMPORT_COLUMNS, select(user_import_table))
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.email)
+    )
+    return set(result.scalars().all())
+
+
+async def import_users_batch(
+        rows: List[Tuple[int, Optional[dict]]],
+        roles: Dict[RoleType, int], seen: Set[str],
+        db: AsyncSession, report: dict
+) -> None:
+    valid: List[Tuple[int, CreateUserRequest]] = []
+    for line, data in rows:
+        if data is None:
+            report["errors"].append({"row": line, "error": "Row is not a JSON object"})
+            continue
+
+        try:
+            request = CreateUserRequest(
+                **{key: value for key, value in data.items() if value not in ("", None)}
+            )
+        except ValidationError as e:
+            report["errors"].append({
+                "row": line, "email": data.get("email"),
+                "error": format_validation_error(e)
+            })
+            continue
+
+        if request.email in seen:
+            report["errors"].append({
+                "row": line, "email": request.email,
+                "error": "Duplicate email in file"
+            })
+            continue
+        if request.role not in roles:
+            report["errors"].append({
+                "row": line, "email": request.email,
+                "error": f"Role {request.role} not found"
+            })
+            continue
+
+        seen.add(request.email)
+        valid.append((line, request))
+
+    if not valid:
+        return
+
+    # Уже существующие email пропускаются - повторный запуск продолжает импорт
+    existing_result = await db.execute(
+        select(User.email).where(User.email.in_([r.email for _, r in valid]))
+    )
+    existing = set(existing_result.scalars().all())
+    new_users = [r for _, r in valid if r.email not in existing]
+    report["existing"] += len(valid) - len(new_users)
+    if not new_users:
+        return
+
+    password_hashes = await hash_passwords([r.password for r in new_users])
+    created = await copy_users(
+        [
+            (
+                uuid4(), r.email, password_hash, r.first_name, r.last_name,
+                r.patronymic, r.group_name, roles[r.role]
+            )
+            for r, password_hash in zip(new_users, password_hashes)
+        ],
+        db
+    )
+    await db.commit()
+
+    report["created"] += len(created)
+    report["existing"] += len(new_users) - len(created)
+
+
+async def run_import_users_job(payload: dict, progress) -> dict:
+    """
+    Массовое создание пользователей из CSV или JSONL.
+    Файл читается потоково, каждая пачка коммитится отдельно.
+    """
+    path = payload["path"]
+    report = {"created": 0, "existing": 0, "errors": []}
+    seen: Set[str] = set()
+
+    if not os.path.exists(path):
+        raise RuntimeError("Import file is no longer available, upload it again")
+
+    async with AsyncSessionLocal() as db:
+        roles_result = await db.execute(select(Role.name, Role.id))
+        roles = dict(roles_result.all())
+
+        with open(path, "rb") as raw_file:
+            size = os.fstat(raw_file.fileno()).st_size or 1
+            file = UploadFile(raw_file, filename=os.path.basename(path))
+            rows = iter_jsonl_rows(file) if path.endswith(".jsonl") else iter_csv_rows(file)
+
+            batch = []
+            async for line, data in rows:
+                batch.append((line, data))
+                if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+                    await import_users_batch(batch, roles, seen, db, report)
+                    batch = []
+                    await progress(min(99, raw_file.tell() * 100 // size))
+
+            if batch:
+                await import_users_batch(batch, roles, seen, db, report)
+
+    # Повтор уже успешной задачи невозможен - файл больше не нужен
+    os.remove(path)
+
+    print(
+        f"👥 User import: {report['created']} created, "
+        f"{report['existing']} existing, {len(report['errors'])} errors"
+    )
+    return report
+
+
+def remove_expired_import_files() -> int:
+    deadline = time.time() - settings.USER_IMPORT_TTL_SECONDS
+    removed = 0
+    if not os.path.isdir(settings.USER_IMPORT_DIR):
+        return removed
+
+    for path in Path(settings.USER_IMPORT_DIR).glob("user_import_*"):
+        if path.stat().st_mtime < deadline:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+async def run_import_file_cleanup() -> None:
+    removed = await run_in_threadpool(remove_expired_import_files)
+    if removed:
+        print(f"🧹 Removed {removed} expired user import files")
@@ -0,0 +1,79 @@
+"""
+Отдельный процесс фоновых задач (таблица jobs).
+
+Задачи захватываются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+воркеров может быть несколько. API при этом запускается с JOB_WORKER_ENABLED=true.
+
+Запуск:
+    python worker.py [--concurrency 2]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+from dotenv import load_dotenv
+from core.config import settings
+from core.database import engine
+from core.security import shutdown_hash_pool
+from AI.document_processor import document_processor
+from helpers.files.blob_store import storage
+from service.job_service import claim_job, execute_job, requeue_stale_jobs
+
+load_dotenv()
+
+
+async def work(worker_id: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        job = await claim_job(worker_id=worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        print(f"▶️ {worker_id}: job {job.id} ({job.type}), attempt {job.attempts}/{job.max_attempts}")
+        await execute_job(job)
+
+
+async def requeue_loop(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await requeue_stale_jobs()
+        except Exception as e:
+            print(f"❌ Stale job check failed: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.JOB_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await storage.prepare()
+    worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Job worker {worker_prefix} started with concurrency {concurrency}")
+
+    # Текущие задачи дорабатывают до конца, новые после сигнала не берутся
+    await asyncio.gather(
+        requeue_loop(stop),
+        *[work(f"{worker_prefix}-{i}", stop) for i in range(concurrency)]
+    )
+
+    shutdown_hash_pool()
+    document_processor.shutdown()
+    await engine.dispose()
+    print("Job worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.concurrency))